@@ -7,9 +7,20 @@ import pandas as pd
 import numpy as np
 from .io_utils import human_bytes
 from .security import world_writable, world_readable
+from .sketches import HyperLogLog, build_inventory_sketches, sketch_freq_table
+from . import sqlstore
+from .sqlstore import InventoryDB
+from .topn import top_n, top_n_per_group
+from .timecube import build_time_cube
+
+# Los analizadores con versión SQL aceptan también un `sqlstore.InventoryDB`
+# (inventario ingerido en SQLite/DuckDB): la agregación se resuelve en el motor.
 
 # ---------------- KPIs básicos ----------------
-def overview_metrics(df: pd.DataFrame):
+def overview_metrics(df: pd.DataFrame, sketch: bool = False):
+    """`sketch=True` estima 'extensiones_unicas' con HyperLogLog (error ≈ 0.8 %)."""
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_overview_metrics(df)
     met = {"filas": len(df), "columnas": df.shape[1]}
     if "TamanoBytes" in df.columns:
         s = pd.to_numeric(df["TamanoBytes"], errors="coerce")
@@ -21,7 +32,10 @@ def overview_metrics(df: pd.DataFrame):
             "archivos_cero_bytes": int((s == 0).sum())
         })
     if "Extension" in df.columns:
-        met["extensiones_unicas"] = int(df["Extension"].astype(str).nunique(dropna=True))
+        if sketch:
+            met["extensiones_unicas"] = HyperLogLog().update(df["Extension"].dropna()).count()
+        else:
+            met["extensiones_unicas"] = int(df["Extension"].astype(str).nunique(dropna=True))
     if "Hash" in df.columns:
         met["hash_nulos"] = int(df["Hash"].isna().sum())
     if "Oculto" in df.columns:
@@ -32,22 +46,40 @@ def overview_metrics(df: pd.DataFrame):
 
 
 def top_n_by_size(df: pd.DataFrame, n: int = 50) -> pd.DataFrame:
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_top_n_by_size(df, n)
     if "TamanoBytes" not in df.columns:
         return pd.DataFrame()
-    t = df.copy()
-    t["TamanoBytes"] = pd.to_numeric(t["TamanoBytes"], errors="coerce")
-    return t.sort_values("TamanoBytes", ascending=False).head(n)
+    return top_n(df.assign(TamanoBytes=pd.to_numeric(df["TamanoBytes"], errors="coerce")), n, "TamanoBytes")
+
+
+def top_n_per_group_by_size(df: pd.DataFrame, by: str = "Propietario", n: int = 20) -> pd.DataFrame:
+    """Los `n` archivos más grandes de cada valor de `by` (columna `Rango`, 1 = el mayor)."""
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_top_n_per_group_by_size(df, by, n)
+    if "TamanoBytes" not in df.columns or by not in df.columns:
+        return pd.DataFrame()
+    t = df.assign(TamanoBytes=pd.to_numeric(df["TamanoBytes"], errors="coerce"))
+    out = top_n_per_group(t, n, "TamanoBytes", group=by, rank_col="Rango")
+    return out[[by, "Rango"] + [c for c in out.columns if c not in (by, "Rango")]]
 
 
 def missingness(df: pd.DataFrame) -> pd.DataFrame:
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_missingness(df)
     m = df.isna().sum().to_frame("faltantes")
     m["porcentaje"] = 0.0 if len(df) == 0 else (m["faltantes"] / len(df) * 100).round(2)
     return m.sort_values("porcentaje", ascending=False)
 
 
-def freq_table(df: pd.DataFrame, col: str, n: int = 30) -> pd.DataFrame:
+def freq_table(df: pd.DataFrame, col: str, n: int = 30, sketch: bool = False) -> pd.DataFrame:
+    """`sketch=True` usa SpaceSaving + Count-Min (añade la cota 'error_max')."""
+    if isinstance(df, InventoryDB):  # conteo exacto en el motor; el sketch no aporta aquí
+        return sqlstore.sql_freq_table(df, col, n)
     if col not in df.columns:
         return pd.DataFrame()
+    if sketch:
+        return sketch_freq_table(build_inventory_sketches([df], cols=(col,)), col, n)
     s = df[col].astype("string")
     tab = s.value_counts(dropna=False).to_frame("conteo")
     tab["porcentaje"] = 0.0 if len(s) == 0 else (tab["conteo"] / len(s) * 100).round(2)
@@ -60,6 +92,8 @@ def duplicates_by_hash(df: pd.DataFrame):
     Devuelve (tabla_de_duplicados, espacio_potencial_recuperable_en_bytes)
     Si no hay 'Hash', usa un PseudoHash con (Nombre|TamanoBytes).
     """
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_duplicates_by_hash(df)
     t = df.copy()
     use_col = None
 
@@ -86,34 +120,31 @@ def duplicates_by_hash(df: pd.DataFrame):
 
 # ---------------- Temporal ----------------
 def timeline_counts(df: pd.DataFrame, date_col: str, freq: str = "M") -> pd.DataFrame:
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_timeline_counts(df, date_col, freq)
     if date_col not in df.columns:
         return pd.DataFrame()
-    s = pd.to_datetime(df[date_col], errors="coerce")
-    try:
-        s = s.dt.tz_localize(None)
-    except Exception:
-        pass
-    gr = s.dt.to_period(freq).value_counts().sort_index()
-    out = gr.rename_axis("periodo").reset_index(name="conteo")
-    out["periodo"] = out["periodo"].astype(str)
-    return out
+    return build_time_cube(df, cols=[date_col], dims=()).timeline(date_col, freq)
 
 
 # ---------------- Agregaciones ----------------
 def agg_by(df: pd.DataFrame, base_col: str, top: int = 50) -> pd.DataFrame:
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_agg_by(df, base_col, top)
     if base_col not in df.columns:
         return pd.DataFrame()
-    t = df.copy()
-    t["TamanoBytes"] = pd.to_numeric(t.get("TamanoBytes"), errors="coerce")
+    t = df.assign(TamanoBytes=pd.to_numeric(df.get("TamanoBytes"), errors="coerce"))
     g = t.groupby(base_col, dropna=False).agg(
         archivos=("Nombre", "size"),
         tam_total=("TamanoBytes", "sum")
     ).reset_index().rename(columns={base_col: "Categoria"})
     g["tam_total_humano"] = g["tam_total"].map(human_bytes)
-    return g.sort_values(["tam_total", "archivos"], ascending=[False, False]).head(top)
+    return top_n(g, top, ["tam_total", "archivos"])
 
 
 def agg_by_folder(df: pd.DataFrame, top: int = 50) -> pd.DataFrame:
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_agg_by_folder(df, top)
     base_col = "CarpetaPadre" if "CarpetaPadre" in df.columns else None
     if not base_col:
         niveles = sorted([c for c in df.columns if c.startswith("Nivel_")],
@@ -156,6 +187,8 @@ def size_buckets(df: pd.DataFrame, col: str = "TamanoBytes") -> pd.DataFrame:
     Devuelve SIEMPRE columnas ['rango','conteo'] en orden lógico,
     aun si no existe la columna o no hay datos (evita KeyError).
     """
+    if isinstance(df, InventoryDB):
+        return sqlstore.sql_size_buckets(df, col)
     labels = ["0–10 MB", "10–100 MB", "100 MB–1 GB", "1–10 GB", "10+ GB"]
     if col not in df.columns:
         return pd.DataFrame({"rango": labels, "conteo": [0] * len(labels)})
@@ -171,7 +204,8 @@ def size_buckets(df: pd.DataFrame, col: str = "TamanoBytes") -> pd.DataFrame:
 
 
 # ---------------- KPIs avanzados ----------------
-def kpi_advanced(df: pd.DataFrame) -> pd.DataFrame:
+def kpi_advanced(df: pd.DataFrame, cube=None) -> pd.DataFrame:
+    """`cube`: `timecube.TimeCube` ya calculado (la antigüedad se lee de él en lugar de re-parsear fechas)."""
     out = []
     n = len(df)
 
@@ -187,18 +221,11 @@ def kpi_advanced(df: pd.DataFrame) -> pd.DataFrame:
     add("Rutas largas (>255)", long_r)
     add("Rutas profundas (>20 niveles)", deep)
 
-    base = None
-    for col in ["FechaAcceso", "FechaModificacion", "FechaCreacion"]:
-        if col in df.columns:
-            base = pd.to_datetime(df[col], errors="coerce")
-            try:
-                base = base.tz_localize(None)
-            except Exception:
-                pass
-            break
+    base = next((c for c in ["FechaAcceso", "FechaModificacion", "FechaCreacion"] if c in df.columns), None)
     if base is not None:
-        stale = (pd.Timestamp.now().tz_localize(None) - base).dt.days > 365
-        add("Antiguos (>365d)", int(stale.fillna(False).sum()))
+        if cube is None or base not in cube.columns():
+            cube = build_time_cube(df, cols=[base], dims=())
+        add("Antiguos (>365d)", cube.stale(base, 365))
 
     if "Propietario" in df.columns:
         add("Sin propietario", int(df["Propietario"].isna().sum()))
@@ -211,6 +238,7 @@ def kpi_advanced(df: pd.DataFrame) -> pd.DataFrame:
 __all__ = [
     "overview_metrics",
     "top_n_by_size",
+    "top_n_per_group_by_size",
     "missingness",
     "freq_table",
     "duplicates_by_hash",
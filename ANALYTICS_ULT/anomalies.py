@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de anomalías de tamaño por grupo (Extension, Categoria, CarpetaPadre...).
+
+Los límites se calculan por grupo con dos métodos:
+- "iqr": [Q1 - k·IQR, Q3 + k·IQR] (vallas de Tukey, k configurable).
+- "robust_z": |0.6745·(x - mediana) / MAD| > z, expresado como límites.
+
+Modo exacto (DataFrame en memoria) o streaming: una pasada construye un
+KLLSketch por grupo (mergeable) y una segunda pasada marca los atípicos.
+Con `log=True` los límites se calculan sobre log1p(bytes), más adecuado para
+distribuciones de tamaño de cola pesada; siempre se devuelven en bytes.
+"""
+import pandas as pd
+import numpy as np
+from .sketches import KLLSketch
+
+GLOBAL_GROUP = "(global)"
+FENCE_COLS = ["n", "q1", "mediana", "q3", "inferior", "superior"]
+
+
+def _sizes(df: pd.DataFrame, col: str, log: bool) -> pd.Series:
+    s = df[col]
+    if not pd.api.types.is_numeric_dtype(s):
+        s = pd.to_numeric(s, errors="coerce")
+    s = s.astype(float)
+    return np.log1p(s.clip(lower=0)) if log else s
+
+
+def _group_keys(df: pd.DataFrame, by):
+    if by is None:
+        return pd.Series(GLOBAL_GROUP, index=df.index)
+    return df[by].astype("string").fillna("<NA>")
+
+
+def _to_fences(stats: pd.DataFrame, method, k, z, log, min_count) -> pd.DataFrame:
+    if method == "iqr":
+        iqr = stats["q3"] - stats["q1"]
+        lo, hi = stats["q1"] - k * iqr, stats["q3"] + k * iqr
+    elif method == "robust_z":
+        width = z * stats["mad"] / 0.6745
+        lo, hi = stats["mediana"] - width, stats["mediana"] + width
+    else:
+        raise ValueError(f"Método no soportado: {method} (use 'iqr' o 'robust_z')")
+    out = stats[["n", "q1", "mediana", "q3"]].copy()
+    out["inferior"], out["superior"] = lo, hi
+    if log:
+        out[["q1", "mediana", "q3", "inferior", "superior"]] = np.expm1(out[["q1", "mediana", "q3", "inferior", "superior"]])
+    out["inferior"] = out["inferior"].clip(lower=0)
+    # Grupos pequeños no tienen estadística fiable: sin límites, no se marcan.
+    out.loc[out["n"] < min_count, ["inferior", "superior"]] = np.nan
+    out.index.name = "Grupo"
+    return out[FENCE_COLS]
+
+
+def size_fences(df: pd.DataFrame, by=None, method="iqr", k=1.5, z=3.5, log=False,
+                min_count=20, col="TamanoBytes") -> pd.DataFrame:
+    """Límites exactos por grupo. Índice 'Grupo'; columnas n, q1, mediana, q3, inferior, superior."""
+    if col not in df.columns or (by is not None and by not in df.columns):
+        return pd.DataFrame(columns=FENCE_COLS)
+    s = _sizes(df, col, log)
+    g = _group_keys(df, by)
+    valid = s.notna()
+    s, g = s[valid], g[valid]
+    grp = s.groupby(g, sort=False)
+    stats = grp.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "mediana", "q3"]
+    stats["n"] = grp.size()
+    if method == "robust_z":
+        med = grp.transform("median")
+        stats["mad"] = (s - med).abs().groupby(g, sort=False).median()
+    return _to_fences(stats, method, k, z, log, min_count)
+
+
+def size_sketches(chunks, by=None, k=200, log=False, col="TamanoBytes") -> dict:
+    """Una pasada sobre los chunks: {grupo: KLLSketch}. Mergeable con `merge_sketches`."""
+    sketches = {}
+    for chunk in chunks:
+        if col not in chunk.columns or (by is not None and by not in chunk.columns):
+            continue
+        s = _sizes(chunk, col, log).to_numpy()
+        g = _group_keys(chunk, by)
+        for key, idx in g.groupby(g, sort=False).indices.items():
+            sketches.setdefault(key, KLLSketch(k=k)).update(s[idx])
+    return sketches
+
+
+def merge_sketches(*parts: dict) -> dict:
+    out = {}
+    for part in parts:
+        for key, sk in part.items():
+            if key in out:
+                out[key].merge(sk)
+            else:
+                out[key] = KLLSketch.from_dict(sk.to_dict())
+    return out
+
+
+def fences_from_sketches(sketches: dict, method="iqr", k=1.5, z=3.5, log=False, min_count=20) -> pd.DataFrame:
+    """Límites aproximados desde sketches. Para robust_z, MAD ≈ IQR/2 (exacto si la distribución es simétrica)."""
+    if not sketches:
+        return pd.DataFrame(columns=FENCE_COLS)
+    rows = {key: [sk.n] + sk.quantile([0.25, 0.5, 0.75]) for key, sk in sketches.items()}
+    stats = pd.DataFrame.from_dict(rows, orient="index", columns=["n", "q1", "mediana", "q3"])
+    stats["mad"] = (stats["q3"] - stats["q1"]) / 2
+    return _to_fences(stats, method, k, z, log, min_count)
+
+
+def outlier_mask(df: pd.DataFrame, fences: pd.DataFrame, by=None, col="TamanoBytes") -> np.ndarray:
+    """Máscara booleana de filas fuera de los límites de su grupo."""
+    if col not in df.columns or fences.empty or (by is not None and by not in df.columns):
+        return np.zeros(len(df), dtype=bool)
+    s = _sizes(df, col, log=False)
+    g = _group_keys(df, by)
+    lo = g.map(fences["inferior"]).astype(float)
+    hi = g.map(fences["superior"]).astype(float)
+    return ((s < lo) | (s > hi)).fillna(False).to_numpy(dtype=bool)
+
+
+def _with_fences(rows: pd.DataFrame, fences: pd.DataFrame, by) -> pd.DataFrame:
+    g = _group_keys(rows, by)
+    rows = rows.copy()
+    rows["Grupo"] = g
+    rows["LimiteInferior"] = g.map(fences["inferior"]).astype(float)
+    rows["LimiteSuperior"] = g.map(fences["superior"]).astype(float)
+    return rows
+
+
+def anomalies_size_grouped(df: pd.DataFrame, by=None, method="iqr", k=1.5, z=3.5, log=False, min_count=20):
+    """Retorna (filas_atipicas con Grupo y límites, tabla_de_limites)."""
+    fences = size_fences(df, by=by, method=method, k=k, z=z, log=log, min_count=min_count)
+    mask = outlier_mask(df, fences, by)
+    return _with_fences(df[mask], fences, by), fences.reset_index()
+
+
+def anomalies_size_stream(chunk_factory, by=None, method="iqr", k=1.5, z=3.5, log=False,
+                          min_count=20, sketch_k=200, columns=None):
+    """
+    Streaming en dos pasadas: `chunk_factory()` debe devolver un iterable nuevo de
+    chunks en cada llamada (p.ej. ``lambda: pd.read_csv(path, chunksize=500_000)``).
+    Retorna (filas_atipicas, tabla_de_limites).
+    """
+    fences = fences_from_sketches(size_sketches(chunk_factory(), by=by, k=sketch_k, log=log),
+                                  method=method, k=k, z=z, log=log, min_count=min_count)
+    rows = []
+    for chunk in chunk_factory():
+        mask = outlier_mask(chunk, fences, by)
+        if mask.any():
+            cols = chunk.columns if columns is None else [c for c in dict.fromkeys(list(columns) + [by]) if c in chunk.columns]
+            sel = chunk.loc[mask, cols]
+            rows.append(_with_fences(sel, fences, by))
+    out = pd.concat(rows, axis=0, ignore_index=True) if rows else pd.DataFrame()
+    return out, fences.reset_index()
+
+
+__all__ = [
+    "size_fences",
+    "size_sketches",
+    "merge_sketches",
+    "fences_from_sketches",
+    "outlier_mask",
+    "anomalies_size_grouped",
+    "anomalies_size_stream",
+]
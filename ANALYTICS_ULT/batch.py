@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Reporte por lotes: muchos inventarios en un solo proceso padre.
+
+Cada inventario (ingesta -> análisis -> exportación) se agenda en un pool
+acotado de procesos. Las tablas y figuras calculadas se guardan en una caché
+en disco indexada por el hash del contenido del archivo (más las opciones del
+reporte), de modo que un inventario que no cambió entre corridas, o que aparece
+dos veces en el lote, solo se re-exporta. Las bases de `ingest` (.sqlite/.duckdb)
+se aceptan como entrada y se analizan en SQL. Un fallo en una entrada queda
+registrado en el consolidado y no aborta el resto.
+
+    res = run_batch(["./inv/*.xlsx"], out_dir="./reportes", workers=4, cache_dir="./.cache_batch")
+"""
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import pickle
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from .pipeline import prepare_inventory, report_tables, summary_row
+
+CACHE_VERSION = 1
+SUMMARY_COLS = ["inventario", "estado", "cache", "segundos", "filas", "tamano_total_bytes", "tamano_total_humano",
+                "extensiones_unicas", "archivos_cero_bytes", "grupos_duplicados", "riesgo_max", "salida", "error"]
+
+
+# ---------------- Entradas ----------------
+def expand_inputs(patterns=(), manifest: str = "") -> list:
+    """Rutas de inventarios desde patrones glob y/o un manifiesto.
+
+    Manifiesto: .json (lista de rutas) o texto con una ruta por línea (`#` comenta).
+    Las rutas relativas del manifiesto se resuelven contra su carpeta. Sin duplicados,
+    en el orden de aparición.
+    """
+    paths = []
+    for p in patterns or ():
+        hits = sorted(h for h in glob.glob(p, recursive=True) if os.path.isfile(h))
+        paths.extend(hits if hits else [p])  # una ruta sin coincidencias se reporta como error, no se ignora
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding="utf-8") as f:
+            if manifest.lower().endswith(".json"):
+                items = json.load(f)
+            else:
+                items = [ln.strip() for ln in f if ln.strip() and not ln.lstrip().startswith("#")]
+        paths.extend(p if os.path.isabs(p) else os.path.join(base, p) for p in items)
+    seen, out = set(), []
+    for p in paths:
+        k = os.path.abspath(p)
+        if k not in seen:
+            seen.add(k); out.append(p)
+    return out
+
+
+def _base_name(path: str, used: set) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"Reporte_{stem}"
+    if name in used:  # mismo nombre en carpetas distintas
+        name = f"{name}_{hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]}"
+    used.add(name)
+    return name
+
+
+# ---------------- Caché ----------------
+def content_key(path: str, **options) -> str:
+    """sha1 del contenido del archivo + opciones del reporte + versión de la caché."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    h.update(json.dumps({"v": CACHE_VERSION, **options}, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _cache_load(cache_dir: str, key: str):
+    entry = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(entry, "resultado.pkl"), "rb") as f:
+            res = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    figs = {k: os.path.join(entry, p) for k, p in res["figuras"].items()}
+    if not all(os.path.exists(p) for p in figs.values()):
+        return None
+    return res["tablas"], res["resumen"], figs
+
+
+def _cache_store(cache_dir: str, key: str, tables: dict, summary: dict, figures: dict) -> dict:
+    """Guarda tablas y PNGs; retorna {clave_figura: ruta_png}. Escritura atómica (tmp + replace)."""
+    import matplotlib.pyplot as plt
+    entry = os.path.join(cache_dir, key)
+    os.makedirs(entry, exist_ok=True)
+    paths = {}
+    for k, fig in figures.items():
+        p = os.path.join(entry, f"{k}.png")
+        tmp = f"{p}.{os.getpid()}.tmp"
+        fig.savefig(tmp, dpi=150, bbox_inches="tight", format="png")
+        plt.close(fig)
+        os.replace(tmp, p)
+        paths[k] = p
+    tmp = os.path.join(entry, f"resultado.pkl.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({"tablas": tables, "resumen": summary, "figuras": {k: os.path.basename(p) for k, p in paths.items()}},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, os.path.join(entry, "resultado.pkl"))
+    return paths
+
+
+# ---------------- Un inventario ----------------
+def _figures(df: pd.DataFrame, tables: dict) -> dict:
+    from .viz import hist_log_sizes, bar_top
+    figs = {}
+    if "TamanoBytes" in df.columns:
+        fig = hist_log_sizes(df["TamanoBytes"] if isinstance(df, pd.DataFrame) else df.column("TamanoBytes"))
+        if fig is not None:
+            figs["hist_tamanos"] = fig
+    ext = tables.get("TopExtensiones")
+    if ext is not None and not ext.empty and {"Extension", "conteo"}.issubset(ext.columns):
+        figs["top_extensiones"] = bar_top(ext, "Extension", "conteo", "Top extensiones", top=20)
+    return figs
+
+
+def report_inventory(path: str, out_dir: str, base_name: str, cache_dir: str = "", sketch: bool = False,
+                     figures: bool = True, policies=None) -> dict:
+    """Reporte completo de un inventario. Nunca lanza: los errores van en la fila de resumen."""
+    t0 = time.perf_counter()
+    rec = {"inventario": path, "estado": "ok", "cache": False, "salida": None, "error": None}
+    try:
+        from .exporters import export_excel_with_figs
+        key = content_key(path, sketch=sketch, figures=figures, policies=policies) if cache_dir else None
+        cached = _cache_load(cache_dir, key) if key else None
+        if cached is not None:
+            tables, summary, figs = cached
+            rec["cache"] = True
+        else:
+            df = prepare_inventory(path)
+            tables = report_tables(df, sketch=sketch, policies=policies)
+            summary = summary_row(df, tables)
+            figs = _figures(df, tables) if figures else {}
+            if not isinstance(df, pd.DataFrame):
+                df.close()  # InventoryDB (base de `ingest`)
+            del df
+            if key:
+                figs = _cache_store(cache_dir, key, tables, summary, figs)
+        rec.update(summary)
+        rec["salida"] = export_excel_with_figs(tables, figs, out_dir=out_dir, base_name=base_name)
+    except Exception as e:
+        rec.update(estado="error", error=f"{type(e).__name__}: {e}", traza=traceback.format_exc(limit=5))
+    rec["segundos"] = round(time.perf_counter() - t0, 3)
+    return rec
+
+
+# ---------------- Lote ----------------
+def run_batch(patterns=(), manifest: str = "", out_dir: str = "./reportes", workers: int = 2, cache_dir: str = "",
+              sketch: bool = False, figures: bool = True, policies=None, summary_name: str = "Resumen_Batch_ULTIMATE",
+              progress=None) -> dict:
+    """Ejecuta el lote; retorna {"resumen": DataFrame, "salida": ruta del consolidado}.
+
+    `progress(rec, hechos, total)` se llama al terminar cada inventario.
+    """
+    paths = expand_inputs(patterns, manifest)
+    os.makedirs(out_dir, exist_ok=True)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    used = set()
+    jobs = [(p, _base_name(p, used)) for p in paths]
+    kw = {"cache_dir": cache_dir, "sketch": sketch, "figures": figures, "policies": policies}
+    recs = {}
+    if workers <= 1 or len(jobs) <= 1:
+        for i, (p, name) in enumerate(jobs):
+            recs[i] = report_inventory(p, out_dir, name, **kw)
+            if progress:
+                progress(recs[i], len(recs), len(jobs))
+    else:
+        ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        # con fork los workers heredan los módulos ya importados: sin costo de arranque por inventario
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as ex:
+            futs = {ex.submit(report_inventory, p, out_dir, name, **kw): i for i, (p, name) in enumerate(jobs)}
+            for fut in as_completed(futs):
+                i = futs[fut]
+                try:
+                    recs[i] = fut.result()
+                except Exception as e:  # el proceso murió (p. ej. sin memoria): se registra y se sigue
+                    recs[i] = {"inventario": jobs[i][0], "estado": "error", "cache": False,
+                               "error": f"{type(e).__name__}: {e}"}
+                if progress:
+                    progress(recs[i], len(recs), len(jobs))
+    rows = [recs[i] for i in range(len(jobs))]
+    res = pd.DataFrame(rows, columns=SUMMARY_COLS) if rows else pd.DataFrame(columns=SUMMARY_COLS)
+    err_cols = ["inventario", "error", "traza"]
+    errs = pd.DataFrame([r for r in rows if r.get("estado") != "ok"], columns=err_cols)
+    ok = res[res["estado"] == "ok"]
+    tot = pd.DataFrame({"KPI": ["inventarios", "ok", "errores", "desde_cache", "filas", "tamano_total_bytes", "segundos"],
+                        "Valor": [len(res), len(ok), len(res) - len(ok), int(res["cache"].fillna(False).astype(bool).sum()),
+                                  ok["filas"].sum(), ok["tamano_total_bytes"].sum(), res["segundos"].sum()]})
+    from .exporters import export_excel_with_figs
+    out = export_excel_with_figs({"Totales": tot, "Inventarios": res, "Errores": errs}, figures={}, out_dir=out_dir,
+                                 base_name=summary_name)
+    return {"resumen": res, "salida": out}
+
+
+__all__ = ["expand_inputs", "content_key", "report_inventory", "run_batch"]
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de dialecto/encoding de CSV sobre una muestra y lectura en una pasada.
+
+`sniff_csv` lee solo los primeros `SAMPLE_BYTES`: BOM -> utf-8 estricto ->
+cp1252 -> charset-normalizer (opcional) -> latin-1 para el encoding, y para el
+separador puntúa cada candidato por coincidencias del encabezado con las
+columnas del inventario y por filas con el mismo ancho que el encabezado
+(`csv.Sniffer` desempata). Un separador equivocado que "funciona" y deja una
+sola columna pierde frente a cualquiera que reconozca columnas.
+
+El resultado se reporta (CLI y app) para fijarlo en corridas siguientes con
+`--sep/--encoding`. `read_csv_fast` parsea una vez con el motor multihilo de
+pyarrow si está instalado y cae al motor C si pyarrow no acepta el archivo.
+
+La muestra no garantiza el encoding del resto: un export cp1252 que es ASCII
+en los primeros 256 KB se detecta como utf-8. Los bytes inválidos posteriores
+se decodifican como cp1252 (latin-1 si cp1252 no los define) con el manejador
+`DECODE_ERRORS`; pyarrow no falla con ellos sino que deja la columna en
+`bytes`, así que esa lectura se repite con el motor C.
+
+    info = sniff_csv("inventario.csv")   # {"sep": ";", "encoding": "cp1252", ...}
+    df = read_csv_fast("inventario.csv", info["sep"], info["encoding"])
+"""
+import codecs
+import csv
+import os
+import pandas as pd
+from .schema import INVENTORY_COLUMNS
+
+try:
+    import pyarrow as pa
+except ImportError:  # opcional
+    pa = None
+try:
+    from charset_normalizer import from_bytes as _detect_charset
+except ImportError:  # opcional
+    _detect_charset = None
+
+SAMPLE_BYTES = 256 * 1024
+SAMPLE_LINES = 500
+DELIMITERS = [",", ";", "\t", "|"]
+DECODE_ERRORS = "inventario-cp1252"  # manejador de codecs.register_error (encoding_errors de pandas)
+_BOMS = [(codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16")]
+
+
+def _decode_fallback(exc):
+    if not isinstance(exc, UnicodeDecodeError):
+        raise exc
+    bad = exc.object[exc.start:exc.end]
+    return "".join(bytes([b]).decode("cp1252", errors="ignore") or chr(b) for b in bad), exc.end
+
+
+codecs.register_error(DECODE_ERRORS, _decode_fallback)
+
+
+def read_sample(src, n: int = SAMPLE_BYTES) -> bytes:
+    """Primeros `n` bytes de una ruta o de un buffer (el buffer queda rebobinado)."""
+    if isinstance(src, (str, os.PathLike)):
+        with open(src, "rb") as f:
+            return f.read(n)
+    src.seek(0)
+    raw = src.read(n)
+    src.seek(0)
+    return raw if isinstance(raw, bytes) else raw.encode("utf-8")
+
+
+def detect_encoding(raw: bytes):
+    """(encoding, fuente) de la muestra."""
+    for bom, enc in _BOMS:
+        if raw.startswith(bom):
+            return enc, "bom"
+    cut = raw[: raw.rfind(b"\n") + 1] or raw  # la muestra puede cortar un carácter multibyte
+    try:
+        cut.decode("utf-8")
+        return "utf-8", "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        # exportaciones de Windows; antes que la heurística, que en muestras cortas confunde cp1252 con cp1250
+        cut.decode("cp1252")
+        return "cp1252", "cp1252"
+    except UnicodeDecodeError:
+        pass
+    if _detect_charset is not None:  # bytes sin definir en cp1252 (p. ej. cp850 de consola)
+        best = _detect_charset(cut).best()
+        if best is not None and best.encoding:
+            return codecs.lookup(best.encoding).name, "charset-normalizer"
+    return "latin-1", "latin-1"  # decodifica cualquier byte
+
+
+def _score(lines, sep, expected):
+    rows = list(csv.reader(lines, delimiter=sep))
+    if not rows:
+        return (0, 0, 0.0, 0)
+    header = [h.strip().lstrip("\ufeff") for h in rows[0]]
+    body = rows[1:] or rows
+    same = sum(len(r) == len(header) for r in body) / len(body)
+    return (len(expected & set(header)), int(len(header) > 1), same, len(header))
+
+
+def sniff_csv(src, sample_bytes: int = SAMPLE_BYTES, expected=INVENTORY_COLUMNS, sep=None, encoding=None) -> dict:
+    """Separador, encoding y comillas a partir de una muestra. `sep`/`encoding` dados se respetan (fijados).
+
+    Retorna {"sep", "encoding", "quotechar", "columnas", "coincidencias", "filas_consistentes", "fuente"}.
+    """
+    raw = read_sample(src, sample_bytes)
+    enc_src = "fijado"
+    if not encoding:
+        encoding, enc_src = detect_encoding(raw)
+    text = raw.decode(encoding, errors="replace")
+    if len(raw) >= sample_bytes and "\n" in text:
+        text = text[: text.rfind("\n") + 1]  # sin la última línea cortada
+    lines = text.splitlines()[:SAMPLE_LINES]
+    expected = set(expected or ())
+    try:
+        dialect = csv.Sniffer().sniff("\n".join(lines[:50]), delimiters="".join(DELIMITERS))
+        guess, quote = dialect.delimiter, dialect.quotechar or '"'
+    except csv.Error:
+        guess, quote = None, '"'
+    cands = [sep] if sep else DELIMITERS
+    scored = {d: _score(lines, d, expected) for d in cands}
+    best = max(cands, key=lambda d: (scored[d], d == guess))
+    m, _, same, ncols = scored[best]
+    return {"sep": best, "encoding": encoding, "quotechar": quote, "columnas": ncols, "coincidencias": m,
+            "filas_consistentes": round(same, 3),
+            "fuente": {"sep": "fijado" if sep else ("sniffer" if best == guess else "columnas"), "encoding": enc_src}}
+
+
+def sep_label(sep: str) -> str:
+    return {"\t": "\\t"}.get(sep, sep)
+
+
+def parse_sep(text):
+    """Inverso de `sep_label` para lo que escribe el usuario ('\\t' -> tabulador); vacío -> None (detectar)."""
+    return {"\\t": "\t", "tab": "\t"}.get(text, text) or None
+
+
+def describe_sniff(info: dict) -> str:
+    """Resumen legible del resultado de `sniff_csv`."""
+    return (f"CSV detectado: separador '{sep_label(info['sep'])}', encoding {info['encoding']}, "
+            f"{info['columnas']} columnas ({info['coincidencias']} del inventario)")
+
+
+def _binary_columns(df: pd.DataFrame) -> list:
+    """Columnas que pyarrow dejó como `bytes` (una columna arrow tiene un solo tipo: basta el primer valor)."""
+    out = []
+    for c in df.columns:
+        if df[c].dtype == object:
+            i = df[c].first_valid_index()
+            if i is not None and isinstance(df[c].loc[i], bytes):
+                out.append(c)
+    return out
+
+
+def read_csv_fast(src, sep=",", encoding="utf-8", nrows=None, quotechar='"') -> pd.DataFrame:
+    """Un solo parseo: motor pyarrow (multihilo) si está disponible, si no (o si falla) el motor C."""
+    if hasattr(src, "seek"):
+        src.seek(0)
+    if pa is not None and nrows is None and len(sep) == 1:
+        try:
+            df = pd.read_csv(src, sep=sep, encoding=encoding, quotechar=quotechar, engine="pyarrow")
+            if not _binary_columns(df):
+                for c in df.columns:
+                    if df[c].dtype.kind == "M":  # pyarrow infiere timestamp[s]; mismo tipo que coerce_datetimes
+                        df[c] = df[c].astype("datetime64[us]")
+                return df
+            del df  # bytes inválidos para `encoding` fuera de la muestra: el motor C los decodifica con DECODE_ERRORS
+        except (pa.ArrowInvalid, ValueError, UnicodeDecodeError):
+            pass  # p. ej. saltos de línea dentro de comillas: el motor C los acepta
+        if hasattr(src, "seek"):
+            src.seek(0)
+    return pd.read_csv(src, sep=sep, encoding=encoding, quotechar=quotechar, nrows=nrows, encoding_errors=DECODE_ERRORS)
+
+
+__all__ = ["INVENTORY_COLUMNS", "DECODE_ERRORS", "read_sample", "detect_encoding", "sniff_csv", "sep_label", "parse_sep", "describe_sniff", "read_csv_fast"]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Delta entre dos cortes del inventario (agregados, removidos y cambiados de tamaño).
+"""
+import pandas as pd
+
+
+def delta_key(df: pd.DataFrame, base: pd.DataFrame):
+    """Clave común para el delta: Hash, o RutaCompleta; None si no hay."""
+    key = "Hash" if "Hash" in df.columns else ("RutaCompleta" if "RutaCompleta" in df.columns else None)
+    return key if key is not None and key in base.columns else None
+
+
+def delta_tables(df: pd.DataFrame, base: pd.DataFrame, key: str):
+    """(agregados, removidos, cambiados) por `key`; cambiados = mismo key con distinto TamanoBytes."""
+    cur = df.drop_duplicates(subset=[key]).set_index(key)
+    bs = base.drop_duplicates(subset=[key]).set_index(key)
+    add_keys = cur.index.difference(bs.index); rem_keys = bs.index.difference(cur.index); common = cur.index.intersection(bs.index)
+    add = cur.loc[add_keys].reset_index(); rem = bs.loc[rem_keys].reset_index()
+    chg = pd.DataFrame({"key": common, "TamanoBytes_cur": pd.to_numeric(cur.loc[common]["TamanoBytes"], errors="coerce"),
+                        "TamanoBytes_base": pd.to_numeric(bs.loc[common]["TamanoBytes"], errors="coerce")})
+    chg = chg[chg["TamanoBytes_cur"] != chg["TamanoBytes_base"]]
+    return add, rem, chg
+
+
+__all__ = ["delta_key", "delta_tables"]
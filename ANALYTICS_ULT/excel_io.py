@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Lectura de Excel por streaming: una sola hoja (la pedida o la primera) y
+filas en chunks de DataFrame, con el motor más rápido disponible por formato.
+
+    calamine (python-calamine, Rust)  .xlsx .xlsm .xlsb .xls
+    pyxlsb                            .xlsb
+    openpyxl read_only                .xlsx .xlsm
+    pandas (xlrd)                     .xls
+
+Los motores son opcionales salvo openpyxl (requirements.txt). Los números
+enteros que el motor entrega como float (calamine, pyxlsb) vuelven a int64 si
+la columna no tiene vacíos, como hace `pd.read_excel`.
+
+    for chunk in iter_excel_chunks("inventario.xlsx", chunksize=250_000): ...
+"""
+import os
+from itertools import islice
+import numpy as np
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:  # opcional
+    python_calamine = None
+try:
+    import pyxlsb
+except ImportError:  # opcional
+    pyxlsb = None
+
+EXCEL_ENGINES = ("calamine", "pyxlsb", "openpyxl", "pandas")
+_FORMATS = {
+    "calamine": {".xlsx", ".xlsm", ".xlsb", ".xls"},
+    "pyxlsb": {".xlsb"},
+    "openpyxl": {".xlsx", ".xlsm"},
+    "pandas": {".xls"},
+}
+# textos que `pd.read_excel` interpreta como nulos por defecto
+NA_STRINGS = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>",
+              "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+SERIAL_DATE_PREFIX = "Fecha"  # .xlsb guarda fechas como serial de Excel: columnas Fecha* se convierten
+
+
+def _installed(engine: str) -> bool:
+    if engine == "calamine":
+        return python_calamine is not None
+    if engine == "pyxlsb":
+        return pyxlsb is not None
+    return True
+
+
+def excel_engine(ext: str, engine=None) -> str:
+    """Motor para la extensión `ext`: `engine` si se pide explícito, si no el primero disponible de `EXCEL_ENGINES`."""
+    ext = ext.lower()
+    if engine:
+        if ext not in _FORMATS.get(engine, ()):
+            raise ValueError(f"El motor '{engine}' no lee archivos {ext}.")
+        if not _installed(engine):
+            raise ImportError(f"El motor Excel '{engine}' no está instalado (pip install "
+                              f"{'python-calamine' if engine == 'calamine' else engine}).")
+        return engine
+    for e in EXCEL_ENGINES:
+        if ext in _FORMATS[e] and _installed(e):
+            return e
+    raise ImportError(f"Para leer {ext} instale 'python-calamine'" + (" o 'pyxlsb'." if ext == ".xlsb" else "."))
+
+
+# ---------------- Filas por motor ----------------
+def _rows_calamine(src, sheet_name):
+    wb = (python_calamine.CalamineWorkbook.from_path(os.fspath(src)) if isinstance(src, (str, os.PathLike))
+          else python_calamine.CalamineWorkbook.from_filelike(src))
+    try:
+        sh = wb.get_sheet_by_name(sheet_name) if isinstance(sheet_name, str) else wb.get_sheet_by_index(sheet_name or 0)
+        yield from sh.iter_rows()
+    finally:
+        wb.close()
+
+
+def _rows_openpyxl(src, sheet_name):
+    from openpyxl import load_workbook
+    wb = load_workbook(src, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name or 0]
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()  # read_only mantiene el archivo abierto hasta cerrar
+
+
+def _rows_pyxlsb(src, sheet_name):
+    with pyxlsb.open_workbook(src) as wb:
+        with wb.get_sheet(sheet_name if isinstance(sheet_name, str) else (sheet_name or 0) + 1) as ws:
+            for row in ws.rows():
+                yield [c.v for c in row]
+
+
+def _rows_pandas(src, sheet_name):
+    df = pd.read_excel(src, sheet_name=sheet_name or 0, header=None)
+    yield from df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+_ROWS = {"calamine": _rows_calamine, "openpyxl": _rows_openpyxl, "pyxlsb": _rows_pyxlsb, "pandas": _rows_pandas}
+
+
+# ---------------- Filas -> DataFrame ----------------
+def _blank(v) -> bool:
+    return v is None or v == ""  # calamine entrega "" en celdas vacías
+
+
+def _header(row) -> list:
+    """Encabezados como `pd.read_excel`: vacíos -> 'Unnamed: i', repetidos -> 'X.1', 'X.2'."""
+    cols, seen = [], {}
+    for i, v in enumerate(row):
+        name = f"Unnamed: {i}" if _blank(v) else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        cols.append(name)
+    while cols and cols[-1].startswith("Unnamed: "):  # celdas vacías a la derecha del encabezado
+        cols.pop()
+    return cols
+
+
+def _frame(rows: list, cols: list, serial_dates: bool) -> pd.DataFrame:
+    n = len(cols)
+    df = pd.DataFrame.from_records([r[:n] if len(r) >= n else list(r) + [None] * (n - len(r)) for r in rows],
+                                   columns=cols)
+    for c in df.columns:
+        s = df[c]
+        if serial_dates and c.startswith(SERIAL_DATE_PREFIX) and s.dtype.kind in "fi":
+            df[c] = pd.to_datetime(s, unit="D", origin="1899-12-30", errors="coerce").dt.round("ms")
+        elif s.dtype.kind == "f" and len(s) and not s.isna().any():
+            v = s.to_numpy()
+            if np.array_equal(v, np.floor(v)) and np.abs(v).max() < 2 ** 53:
+                df[c] = v.astype(np.int64)
+        elif s.dtype.kind in "OT":
+            df[c] = s.where(~s.isin(NA_STRINGS), None)
+    return df
+
+
+def iter_excel_chunks(src, sheet_name=None, chunksize: int = 250_000, engine=None, name=None):
+    """Chunks de `chunksize` filas de una hoja (`sheet_name`: nombre, índice 0-based o None = primera).
+    `src` es ruta o buffer binario; `name` da la extensión de un buffer sin `.name`."""
+    label = src if isinstance(src, (str, os.PathLike)) else (name or getattr(src, "name", "") or "")
+    eng = excel_engine(os.path.splitext(str(label))[1], engine)
+    if hasattr(src, "seek"):
+        src.seek(0)
+    raw = _ROWS[eng](src, sheet_name)
+    try:
+        rows = (r for r in raw if not all(_blank(v) for v in r))
+        first = next(rows, None)
+        if first is None:
+            yield pd.DataFrame()
+            return
+        cols = _header(first)
+        serial = eng == "pyxlsb"
+        emitted = False
+        while True:
+            block = list(islice(rows, chunksize))
+            if not block:
+                break
+            emitted = True
+            yield _frame(block, cols, serial)
+        if not emitted:
+            yield pd.DataFrame(columns=cols)
+    finally:
+        raw.close()  # cierra el libro aunque el consumidor corte antes (p. ej. `nrows`)
+
+
+def read_excel_sheet(src, sheet_name=None, engine=None, name=None, nrows=None) -> pd.DataFrame:
+    """Una hoja completa (concatenación de `iter_excel_chunks`); `nrows` corta la lectura."""
+    size = nrows if nrows else 250_000
+    parts = []
+    for chunk in iter_excel_chunks(src, sheet_name=sheet_name, chunksize=size, engine=engine, name=name):
+        parts.append(chunk)
+        if nrows:
+            break
+    return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+
+__all__ = ["EXCEL_ENGINES", "excel_engine", "iter_excel_chunks", "read_excel_sheet"]
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 import os, zipfile
 import pandas as pd
-import matplotlib.pyplot as plt
+from .profiling import NULL_PROFILER
 
 def _sanitize_tz(df: pd.DataFrame):
     for col in df.columns:
@@ -10,7 +10,8 @@ def _sanitize_tz(df: pd.DataFrame):
             except Exception: pass
     return df
 
-def export_excel_with_figs(tables: dict, figures: dict, out_dir: str, base_name="Reporte_Analitica_ULTIMATE"):
+def export_excel_with_figs(tables: dict, figures: dict, out_dir: str, base_name="Reporte_Analitica_ULTIMATE", profiler=None):
+    prof = profiler or NULL_PROFILER
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, f"{base_name}.xlsx")
     with pd.ExcelWriter(out_path, engine="xlsxwriter") as writer:
@@ -18,22 +19,28 @@ def export_excel_with_figs(tables: dict, figures: dict, out_dir: str, base_name=
         for sheet, df in tables.items():
             if df is None or (hasattr(df, "empty") and df.empty): continue
             name = (sheet[:28]+"...") if len(sheet)>31 else sheet
-            df = _sanitize_tz(df.copy())
-            df.to_excel(writer, sheet_name=name, index=False)
-            ws = writer.sheets[name]; ws.set_zoom(110); ws.set_column(0,0,26); ws.set_column(1,50,18)
-            if "RiskScore" in df.columns:
-                ws.conditional_format(1, df.columns.get_loc("RiskScore"), min(1000,len(df)+1), df.columns.get_loc("RiskScore"), {"type":"3_color_scale"})
-            if "conteo" in df.columns:
-                ws.conditional_format(1, df.columns.get_loc("conteo"), min(1000,len(df)+1), df.columns.get_loc("conteo"), {"type":"3_color_scale"})
+            with prof.step(f"export.hoja.{sheet}", rows_in=len(df)):
+                df = _sanitize_tz(df.copy())
+                df.to_excel(writer, sheet_name=name, index=False)
+                ws = writer.sheets[name]; ws.set_zoom(110); ws.set_column(0,0,26); ws.set_column(1,50,18)
+                if "RiskScore" in df.columns:
+                    ws.conditional_format(1, df.columns.get_loc("RiskScore"), min(1000,len(df)+1), df.columns.get_loc("RiskScore"), {"type":"3_color_scale"})
+                if "conteo" in df.columns:
+                    ws.conditional_format(1, df.columns.get_loc("conteo"), min(1000,len(df)+1), df.columns.get_loc("conteo"), {"type":"3_color_scale"})
         if figures:
+            import matplotlib.pyplot as plt  # solo con figuras: los reportes del CLI no cargan matplotlib
             ws = wb.add_worksheet("ResumenVisual")
             r=1; c=1
             for key, fig in figures.items():
                 img_path = os.path.join(out_dir, f"{base_name}_{key}.png")
                 try:
-                    fig.savefig(img_path, dpi=150, bbox_inches="tight")
-                    plt.close(fig)
-                    ws.insert_image(r, c, img_path, {"x_scale":1.0, "y_scale":1.0})
+                    with prof.step(f"export.figura.{key}"):
+                        if isinstance(fig, str):  # PNG ya renderizado (caché del modo batch)
+                            img_path = fig
+                        else:
+                            fig.savefig(img_path, dpi=150, bbox_inches="tight")
+                            plt.close(fig)
+                        ws.insert_image(r, c, img_path, {"x_scale":1.0, "y_scale":1.0})
                     r += 22
                 except Exception:
                     pass
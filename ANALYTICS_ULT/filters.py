@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Filtros globales sobre índices construidos una vez por dataset.
+
+- Columnas categóricas (Propietario, Extension, Categoria, Raiz, RiskBand,
+  RangoTamano): código entero por fila + posiciones agrupadas por valor (orden
+  estable, así cada tramo ya viene ordenado). Como en roaring, un valor escaso
+  se resuelve juntando sus posiciones (contenedor "array") y uno frecuente con
+  una tabla de búsqueda sobre los códigos (contenedor "bitmap").
+- Rangos (TamanoBytes y fechas): valores ordenados + permutación; un rango es
+  un par de `searchsorted` y un tramo contiguo de la permutación.
+
+`select` ordena las condiciones por filas estimadas, materializa solo la más
+selectiva y verifica las demás sobre esas posiciones: el costo sigue a las
+filas que sobreviven, no al total, y nunca se re-escanean columnas de texto.
+
+La definición del filtro es un dict JSON (se guarda en los bookmarks):
+
+    {"Extension": ["pdf", "docx"], "TamanoBytes": [1048576, null],
+     "FechaModificacion": ["2020-01-01", "2021-12-31"]}
+
+Categóricas: lista de valores (`NULL_LABEL` = vacío). Rangos: [mín, máx]
+inclusivos, `null` = abierto; las fechas se comparan por día completo.
+
+    idx = FilterIndex(df, extra={"RiskBand": scored["RiskBand"]})
+    pos = idx.select(spec)              # None = sin filtros
+    vista = df if pos is None else df.take(pos)
+"""
+import json
+import numpy as np
+import pandas as pd
+from .sqlstore import SIZE_BUCKETS
+
+CATEGORICAL = ["Propietario", "Extension", "Categoria", "Raiz", "RiskBand", "RangoTamano"]
+RANGES = ["TamanoBytes", "FechaCreacion", "FechaModificacion", "FechaAcceso"]
+SIZE_BUCKET_COLUMN = "RangoTamano"
+NULL_LABEL = "(vacío)"
+SPARSE_FRACTION = 1 / 16  # por debajo, juntar posiciones; por encima, recorrer los códigos
+
+
+def _pos_dtype(n: int):
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def size_bucket(size: pd.Series) -> pd.Series:
+    """Rango de tamaño (mismos cortes que `size_buckets`) como categórica ordenada."""
+    labels = [b[0] for b in SIZE_BUCKETS]
+    bins = [b[1] for b in SIZE_BUCKETS] + [np.inf]
+    return pd.cut(pd.to_numeric(size, errors="coerce"), bins=bins, labels=labels, right=False, ordered=True)
+
+
+# ---------------- Índices ----------------
+class _CategoryIndex:
+    def __init__(self, s: pd.Series):
+        if isinstance(s.dtype, pd.CategoricalDtype):  # orden natural (RiskBand, RangoTamano)
+            codes = s.cat.codes.to_numpy(dtype=np.int64)
+            labels = [str(c) for c in s.cat.categories]
+            self.ordered = True
+        else:
+            codes, uniq = pd.factorize(s)
+            labels = [str(u) for u in uniq]
+            self.ordered = False
+        if (codes < 0).any():
+            codes = np.where(codes < 0, len(labels), codes)
+            labels.append(NULL_LABEL)
+        n = len(codes)
+        self.codes = codes.astype(np.int8 if len(labels) < 2 ** 7 else np.int16 if len(labels) < 2 ** 15 else np.int32)
+        self.labels = labels
+        self.ids = {lab: i for i, lab in enumerate(labels)}
+        self.counts = np.bincount(codes, minlength=len(labels)).astype(np.int64)
+        self.order = np.argsort(self.codes, kind="stable").astype(_pos_dtype(n))
+        self.offsets = np.r_[0, np.cumsum(self.counts)]
+
+    def options(self):
+        """Valores con su conteo: orden natural si la columna es categórica, si no por frecuencia."""
+        idx = np.arange(len(self.labels)) if self.ordered else np.argsort(-self.counts, kind="stable")
+        return {self.labels[i]: int(self.counts[i]) for i in idx if self.counts[i] > 0}
+
+    def plan(self, values, n: int):
+        ids = np.array(sorted({self.ids[v] for v in values if v in self.ids}), dtype=np.int64)
+        lut = np.zeros(len(self.labels), dtype=bool)
+        lut[ids] = True
+        est = int(self.counts[ids].sum())
+
+        def positions():
+            if est >= n * SPARSE_FRACTION:
+                return np.flatnonzero(lut[self.codes])
+            parts = [self.order[self.offsets[i]:self.offsets[i + 1]] for i in ids]
+            return parts[0].astype(np.int64) if len(parts) == 1 else np.sort(np.concatenate(parts or [np.empty(0, np.int64)]))
+
+        return est, positions, lambda pos: lut[self.codes[pos]]
+
+
+class _RangeIndex:
+    def __init__(self, s: pd.Series):
+        self.is_date = s.dtype.kind == "M"
+        if self.is_date:
+            v = s.to_numpy(dtype="datetime64[us]").view(np.int64).astype(np.float64)
+            v[s.isna().to_numpy()] = np.nan
+        else:
+            v = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(v))
+        self.values = v
+        self.order = valid[np.argsort(v[valid], kind="stable")].astype(_pos_dtype(len(v)))
+        self.sorted = v[self.order]
+
+    def _to_value(self, x, upper: bool):
+        if x is None or x == "":
+            return None
+        if not self.is_date:
+            return float(x)
+        t = pd.Timestamp(x).floor("D")
+        if upper:
+            t = t + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)  # día completo
+        return float(np.datetime64(t, "us").astype(np.int64))
+
+    def _from_value(self, x):
+        return pd.Timestamp(int(x), unit="us") if self.is_date else x
+
+    def bounds(self):
+        if not len(self.sorted):
+            return None, None
+        return self._from_value(self.sorted[0]), self._from_value(self.sorted[-1])
+
+    def plan(self, rng, n: int):
+        lo, hi = (list(rng) + [None, None])[:2]
+        lo, hi = self._to_value(lo, False), self._to_value(hi, True)
+        lo = -np.inf if lo is None else lo
+        hi = np.inf if hi is None else hi
+        i, j = np.searchsorted(self.sorted, lo, "left"), np.searchsorted(self.sorted, hi, "right")
+        est = int(max(0, j - i))
+
+        def positions():
+            if est >= n * SPARSE_FRACTION:
+                return np.flatnonzero((self.values >= lo) & (self.values <= hi))
+            return np.sort(self.order[i:j]).astype(np.int64)
+
+        return est, positions, lambda pos: (self.values[pos] >= lo) & (self.values[pos] <= hi)
+
+
+class FilterIndex:
+    """Índices de filtro de un DataFrame. `extra`: columnas alineadas por índice que no están en `df`
+    (p. ej. RiskBand del puntaje de riesgo)."""
+
+    def __init__(self, df: pd.DataFrame, extra=None, categorical=CATEGORICAL, ranges=RANGES):
+        self.n = len(df)
+        cols = {c: df[c] for c in categorical if c in df.columns}
+        for c, s in (extra or {}).items():
+            if c in categorical:
+                cols[c] = s.reindex(df.index)
+        if SIZE_BUCKET_COLUMN in categorical and SIZE_BUCKET_COLUMN not in cols and "TamanoBytes" in df.columns:
+            cols[SIZE_BUCKET_COLUMN] = size_bucket(df["TamanoBytes"])
+        self.categorical = {c: _CategoryIndex(s) for c, s in cols.items()}
+        self.ranges = {c: _RangeIndex(df[c]) for c in ranges if c in df.columns}
+
+    def columns(self):
+        return list(self.categorical) + list(self.ranges)
+
+    def options(self, col: str) -> dict:
+        return self.categorical[col].options() if col in self.categorical else {}
+
+    def bounds(self, col: str):
+        return self.ranges[col].bounds() if col in self.ranges else (None, None)
+
+    def clean(self, spec) -> dict:
+        """Solo las condiciones que aplican a este índice (columnas presentes, listas no vacías)."""
+        out = {}
+        for c, cond in (spec or {}).items():
+            if c in self.categorical and cond:
+                out[c] = list(cond)
+            elif c in self.ranges and cond and any(x not in (None, "") for x in cond):
+                out[c] = list(cond)
+        return out
+
+    def select(self, spec):
+        """Posiciones (ordenadas) de las filas que cumplen todas las condiciones; None si no hay ninguna."""
+        spec = self.clean(spec)
+        if not spec:
+            return None
+        plans = sorted((self.categorical[c].plan(cond, self.n) if c in self.categorical
+                        else self.ranges[c].plan(cond, self.n) for c, cond in spec.items()), key=lambda p: p[0])
+        # la más selectiva se materializa, el resto se verifica solo sobre sus posiciones
+        pos = plans[0][1]()
+        for _, _, test in plans[1:]:
+            if not len(pos):
+                break
+            pos = pos[test(pos)]
+        return pos
+
+
+def spec_key(spec) -> str:
+    """Clave estable de una definición de filtro (caché de vistas)."""
+    return json.dumps(spec or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def describe_filters(spec) -> str:
+    parts = []
+    for c, cond in (spec or {}).items():
+        if c in RANGES:
+            lo, hi = (list(cond) + [None, None])[:2]
+            parts.append(f"{c} {'≥ ' + str(lo) if lo not in (None, '') else ''}{' y ' if lo not in (None, '') and hi not in (None, '') else ''}"
+                         f"{'≤ ' + str(hi) if hi not in (None, '') else ''}")
+        else:
+            shown = ", ".join(map(str, cond[:3])) + (f" (+{len(cond) - 3})" if len(cond) > 3 else "")
+            parts.append(f"{c} ∈ {shown}")
+    return "; ".join(parts)
+
+
+__all__ = ["CATEGORICAL", "RANGES", "SIZE_BUCKET_COLUMN", "NULL_LABEL", "size_bucket", "FilterIndex",
+           "spec_key", "describe_filters"]
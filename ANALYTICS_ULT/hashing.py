@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""Hashes deterministas vectorizados (uint64) compartidos por el análisis y el generador sintético."""
+import numpy as np
+
+
+def mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64: hash determinista uint64 → uint64."""
+    with np.errstate(over="ignore"):
+        z = x.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+__all__ = ["mix64"]
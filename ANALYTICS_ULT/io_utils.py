@@ -2,31 +2,47 @@
 import os
 import pandas as pd
 import numpy as np
+from .excel_io import read_excel_sheet, iter_excel_chunks
+from .csv_io import sniff_csv, read_csv_fast, DECODE_ERRORS
 
 SUPPORTED_EXCEL = {".xlsx", ".xlsm", ".xls", ".xlsb"}
 SUPPORTED_CSV = {".csv", ".txt"}
 
-def load_table(path: str, sheet_name=None, sep=",", encoding="utf-8", nrows=None) -> pd.DataFrame:
-    if not os.path.exists(path):
+def _source_ext(src, name=None):
+    """Extensión de una ruta o de un buffer (por `name` o por su atributo `.name`, p. ej. UploadedFile)."""
+    label = src if isinstance(src, (str, os.PathLike)) else (name or getattr(src, "name", "") or "")
+    return os.path.splitext(str(label))[1].lower()
+
+def _rewind(src):
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return src
+
+def load_table(path, sheet_name=None, sep=None, encoding=None, nrows=None, name=None) -> pd.DataFrame:
+    """`path` puede ser una ruta o un buffer binario con posición (BytesIO, UploadedFile): se parsea sin copiarlo a disco.
+    CSV: `sep`/`encoding` en None se detectan sobre una muestra (ver csv_io.sniff_csv) y se parsea una sola vez."""
+    if isinstance(path, (str, os.PathLike)) and not os.path.exists(path):
         raise FileNotFoundError(f"No existe el archivo: {path}")
-    ext = os.path.splitext(path)[1].lower()
+    ext = _source_ext(path, name)
     if ext in SUPPORTED_EXCEL:
-        _df = pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl")
-        if isinstance(_df, dict):
-            first_key = list(_df.keys())[0]
-            return _df[first_key]
-        return _df
+        # solo la hoja pedida (o la primera), con el motor más rápido instalado (ver excel_io)
+        return read_excel_sheet(path, sheet_name=sheet_name, name=name, nrows=nrows)
     elif ext in SUPPORTED_CSV:
-        try:
-            return pd.read_csv(path, sep=sep, encoding=encoding, nrows=nrows)
-        except Exception:
-            for sep_try in [";", ",", "\t", "|"]:
-                for enc_try in ["utf-8", "latin-1", "cp1252"]:
-                    try:
-                        return pd.read_csv(path, sep=sep_try, encoding=enc_try, nrows=nrows)
-                    except Exception:
-                        continue
-            raise
+        info = sniff_csv(path, sep=sep, encoding=encoding)
+        return read_csv_fast(path, info["sep"], info["encoding"], nrows=nrows, quotechar=info["quotechar"])
+    else:
+        raise ValueError(f"Extensión no soportada: {ext}")
+
+def iter_table_chunks(path, chunksize=500_000, sheet_name=None, sep=None, encoding=None, name=None):
+    """Itera el inventario en chunks de `chunksize` filas (CSV y Excel en streaming).
+    Acepta ruta o buffer, como `load_table`; el dialecto CSV se detecta igual."""
+    ext = _source_ext(path, name)
+    if ext in SUPPORTED_CSV:
+        info = sniff_csv(path, sep=sep, encoding=encoding)
+        yield from pd.read_csv(_rewind(path), sep=info["sep"], encoding=info["encoding"], quotechar=info["quotechar"],
+                               chunksize=chunksize, encoding_errors=DECODE_ERRORS)
+    elif ext in SUPPORTED_EXCEL:
+        yield from iter_excel_chunks(path, sheet_name=sheet_name, chunksize=chunksize, name=name)
     else:
         raise ValueError(f"Extensión no soportada: {ext}")
 
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Casi duplicados por nombre: MinHash + LSH.
+
+"informe_final (copia 3).docx", "Copy of informe_final.docx" o un video
+re-exportado con otro nombre y casi el mismo tamaño no comparten `Hash`. Aquí:
+
+1. El nombre se normaliza (minúsculas, sin acentos ni extensión, sin marcas de
+   copia como "copia", "copy of", "(3)") y se parte en n-gramas de caracteres.
+2. Cada nombre distinto recibe una firma MinHash de `num_perm` valores; la
+   fracción de valores iguales entre dos firmas estima su Jaccard.
+3. LSH: la firma se corta en `bands` bandas; dos archivos son candidatos si
+   coinciden en alguna banda y en el bloque (Extension, números del nombre y
+   banda de tamaño logarítmica de ancho `size_tol`). Cada cubeta se une en estrella a su
+   primer miembro y la arista se verifica con la similitud estimada, así el
+   costo es O(n · bands) y no O(n²).
+4. Las aristas aceptadas forman clusters (componentes conexas).
+5. Como los clusters son transitivos, un miembro solo se da por copia del
+   representante (`Verificado`, lo único que cuenta como recuperable y que
+   usa el simulador para borrar) si coincide en Hash o tamaño, o si su nombre
+   sin quitar las marcas de copia también supera `threshold`.
+
+Solo se quitan marcas de copia reales ("copia", "copy of", "(3)"): sufijos como
+"_final", "_v2" u "_old" distinguen versiones y se comparan como texto.
+
+El umbral efectivo de LSH es ≈ (1/bands)^(1/(num_perm/bands)); con 64/16 ≈ 0.5,
+por debajo del `threshold` de verificación (0.7 por defecto). Las bandas de
+tamaño se evalúan en dos rejillas desplazadas media banda, así dos tamaños a
+menos de `size_tol/2` siempre comparten bloque.
+
+    members, clusters = near_duplicates(df, threshold=0.7)
+    plan, ahorro = simulate_dedupe(df, near=members)
+"""
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE = 3
+_MERSENNE = np.uint64((1 << 61) - 1)
+# marcas de copia que se quitan antes de comparar (el resto del nombre decide)
+COPY_MARKERS = [
+    r"^(copia de|copy of|copia|copy)\s+",
+    r"\s*[-_ ]\s*(copia|copy)(\s*\(?\d+\)?)?$",
+    r"\s*\((copia|copy)?\s*\d*\)$",
+]
+_MARKER_RE = re.compile("|".join(f"(?:{p})" for p in COPY_MARKERS))
+_DIGITS = re.compile(r"\d+")
+
+
+# ---------------- Normalización ----------------
+def _strip_accents(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", s) if not unicodedata.combining(c))
+
+
+def normalize_names(names: pd.Series, markers: bool = True):
+    """(nombre normalizado, tenía marca de copia) para una serie de nombres de archivo.
+    `markers=False` conserva las marcas de copia (verificación de `near_duplicates`)."""
+    s = names.astype("string").fillna("").str.lower().str.strip()
+    s = s.str.replace(r"\.[0-9a-z]{1,8}$", "", regex=True)  # extensión
+    acc = s.str.contains(r"[^\x00-\x7f]", regex=True).to_numpy(dtype=bool)
+    if acc.any():
+        s = s.copy()
+        s[acc] = [_strip_accents(x) for x in s[acc].tolist()]
+    base = s
+    for _ in range(3 if markers else 0):  # "informe (copia 2) - copy" -> varias pasadas
+        s = s.str.replace(_MARKER_RE.pattern, "", regex=True).str.strip()  # texto: RE2 de pyarrow
+    had = (s != base).to_numpy(dtype=bool)
+    s = s.str.replace(r"[^0-9a-z]+", " ", regex=True).str.strip()
+    return s, had
+
+
+def _shingles(text: str, k: int):
+    t = f" {text} "
+    return {t[i:i + k] for i in range(max(1, len(t) - k + 1))}
+
+
+# ---------------- MinHash ----------------
+def _perm_params(num_perm: int, seed: int):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(texts, num_perm: int = NUM_PERM, k: int = SHINGLE, seed: int = 1) -> np.ndarray:
+    """Firmas uint64 (len(texts) × num_perm) sobre n-gramas de `k` caracteres."""
+    texts = list(texts)
+    rows, grams = [], []
+    for i, t in enumerate(texts):
+        g = _shingles(t, k)
+        grams.extend(g)
+        rows.extend([i] * len(g))
+    rows = np.asarray(rows, dtype=np.int64)
+    h = pd.util.hash_array(np.asarray(grams, dtype=object)) if grams else np.empty(0, dtype=np.uint64)
+    order = np.argsort(rows, kind="stable")
+    rows, h = rows[order], h[order] & _MERSENNE
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+    sig = np.full((len(texts), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    a, b = _perm_params(num_perm, seed)
+    with np.errstate(over="ignore"):
+        for j in range(num_perm):  # (a·x + b) mod 2^64: hash universal multiplicativo, sin desbordes costosos
+            hv = h * a[j] + b[j]
+            sig[rows[starts], j] = np.minimum.reduceat(hv, starts) if len(starts) else hv
+    return sig
+
+
+# ---------------- LSH + componentes ----------------
+def _combine(h: np.ndarray, v: np.ndarray) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        return (h ^ v) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(0x632BE59BD9B4E019)
+
+
+def components(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Etiqueta de componente conexa (mínimo índice del componente) de n nodos con aristas (u, v)."""
+    lab = np.arange(n, dtype=np.int64)
+    if len(u) == 0:
+        return lab
+    while True:  # propagación del mínimo + saltos de puntero: pocas iteraciones en grafos de clusters
+        m = np.minimum(lab[u], lab[v])
+        new = lab.copy()
+        np.minimum.at(new, u, m)
+        np.minimum.at(new, v, m)
+        while True:
+            nxt = new[new]
+            if np.array_equal(nxt, new):
+                break
+            new = nxt
+        if np.array_equal(new, lab):
+            return lab
+        lab = new
+
+
+def _size_bands(size, size_tol, n: int):
+    """Bandas de tamaño logarítmicas: una rejilla y otra desplazada media banda, para que dos tamaños
+    cercanos a un lado y otro de un borde coincidan al menos en una."""
+    if size_tol is None or size is None:
+        return [np.zeros(n, dtype=np.uint64)]
+    v = pd.to_numeric(size, errors="coerce").to_numpy(dtype=float)
+    x = np.log1p(np.clip(np.nan_to_num(v, nan=0.0), 0, None)) / np.log1p(size_tol)
+    return [np.floor(x + off).astype(np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(i)
+            for i, off in enumerate((0.0, 0.5))]
+
+
+def _number_keys(texts) -> np.ndarray:
+    """Hash de los números del nombre: 'factura 0012' y 'factura 0013' no son copias entre sí."""
+    return pd.util.hash_array(np.asarray([" ".join(_DIGITS.findall(t)) for t in texts], dtype=object))
+
+
+def near_duplicates(df: pd.DataFrame, on: str = "Nombre", threshold: float = 0.7, num_perm: int = NUM_PERM,
+                    bands: int = BANDS, block_ext: bool = True, size_tol=0.1, same_numbers: bool = True,
+                    k: int = SHINGLE, seed: int = 1):
+    """Clusters de casi duplicados. Retorna (miembros, clusters).
+
+    miembros: filas de `df` en algún cluster (índice original) + ClusterId, Similitud (vs. el representante),
+              EsRepresentante, Verificado, NombreNormalizado.
+    clusters: ClusterId, archivos, verificados, bytes, bytes_recuperables (solo verificados), similitud_min,
+              Representante.
+    `size_tol=None` desactiva el bloqueo por tamaño; `block_ext=False` compara entre extensiones;
+    `same_numbers=False` permite enlazar nombres que difieren en sus números.
+    """
+    if on not in df.columns or len(df) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    if num_perm % bands:
+        raise ValueError("num_perm debe ser múltiplo de bands")
+    raw_codes, raw_uniq = pd.factorize(df[on].astype("string").fillna(""))
+    norm_u, had_u = normalize_names(pd.Series(raw_uniq))  # cada nombre distinto una vez
+    norm_codes, uniq = pd.factorize(norm_u)
+    codes, had = norm_codes[raw_codes], had_u[raw_codes]
+    valid = (uniq.str.len() > 0)[codes] if len(uniq) else np.zeros(len(df), dtype=bool)
+    sig = minhash_signatures(uniq.tolist(), num_perm=num_perm, k=k, seed=seed)
+
+    blocks = _size_bands(df["TamanoBytes"] if "TamanoBytes" in df.columns else None, size_tol, len(df))
+    extra = np.zeros(len(df), dtype=np.uint64)
+    if block_ext and "Extension" in df.columns:
+        extra = pd.util.hash_array(df["Extension"].astype("string").fillna("").str.lower().to_numpy(dtype=object))
+    if same_numbers:
+        extra = _combine(extra, _number_keys(uniq.tolist())[codes])
+    n, r = len(df), num_perm // bands
+    pos = np.flatnonzero(valid)
+    if len(pos) < 2:  # sin nombres que comparar
+        return pd.DataFrame(), pd.DataFrame()
+    us, vs = [], []
+    for block, bnd in ((_combine(b, extra), bnd) for b in blocks for bnd in range(bands)):
+        key = block[pos].copy()
+        for j in range(bnd * r, (bnd + 1) * r):
+            key = _combine(key, sig[codes[pos], j])
+        order = np.argsort(key, kind="stable")
+        ks, ps = key[order], pos[order]
+        first = np.r_[True, ks[1:] != ks[:-1]]
+        head = ps[np.maximum.accumulate(np.where(first, np.arange(len(ks)), 0))]  # primer miembro de la cubeta
+        m = ~first
+        u, v = head[m], ps[m]
+        same = (sig[codes[u]] == sig[codes[v]]).mean(axis=1) >= threshold
+        us.append(u[same]); vs.append(v[same])
+    u = np.concatenate(us)
+    v = np.concatenate(vs)
+    if len(u) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    lab = components(n, u, v)
+    sizes = np.bincount(lab, minlength=n)
+    in_cl = sizes[lab] > 1
+
+    t = df.loc[in_cl].copy()
+    t["ClusterId"] = pd.factorize(lab[in_cl])[0] + 1
+    t["NombreNormalizado"] = np.asarray(uniq, dtype=object)[codes[in_cl]]
+    t["_marca"] = had[in_cl]
+    t["_code"] = codes[in_cl]
+    t["_pos"] = np.arange(len(t))
+    # representante: sin marca de copia, luego el más antiguo, luego el nombre más corto
+    keys = ["ClusterId", "_marca"] + (["FechaCreacion"] if "FechaCreacion" in t.columns else []) + ["_len"]
+    t["_len"] = t[on].astype("string").str.len()
+    rep = t.sort_values(keys, kind="stable", na_position="last").drop_duplicates("ClusterId")
+    rep_pos = t["ClusterId"].map(rep.set_index("ClusterId")["_pos"]).to_numpy()
+    is_rep = rep_pos == t["_pos"].to_numpy()
+    t["Similitud"] = (sig[t["_code"].to_numpy()] == sig[t["_code"].to_numpy()[rep_pos]]).mean(axis=1).round(3)
+    t["EsRepresentante"] = is_rep
+    # verificado: mismo Hash o tamaño que el representante, o nombre parecido sin quitar marcas de copia
+    ok = is_rep.copy()
+    for col in ("Hash", "TamanoBytes"):
+        if col in t.columns:
+            v = t[col].astype("string").to_numpy(dtype=object, na_value=None)
+            ok |= np.array([a is not None and a == b for a, b in zip(v, v[rep_pos])], dtype=bool)
+    raw_codes_t, raw_t = pd.factorize(normalize_names(t[on], markers=False)[0])
+    raw_sig = minhash_signatures(raw_t.tolist(), num_perm=num_perm, k=k, seed=seed)
+    ok |= (raw_sig[raw_codes_t] == raw_sig[raw_codes_t[rep_pos]]).mean(axis=1) >= threshold
+    t["Verificado"] = ok
+    t = t.drop(columns=["_marca", "_code", "_len", "_pos"]).sort_values(["ClusterId", "EsRepresentante", "Similitud"],
+                                                                         ascending=[True, False, False], kind="stable")
+
+    size = pd.to_numeric(t["TamanoBytes"], errors="coerce") if "TamanoBytes" in t.columns else pd.Series(0, index=t.index)
+    g = t.assign(_b=size, _rb=size.where(~t["EsRepresentante"] & t["Verificado"], 0)).groupby("ClusterId")
+    clusters = pd.DataFrame({"archivos": g.size(), "verificados": g["Verificado"].sum(), "bytes": g["_b"].sum(),
+                             "bytes_recuperables": g["_rb"].sum(), "similitud_min": g["Similitud"].min()})
+    clusters["Representante"] = rep.set_index("ClusterId")[on]
+    clusters = clusters.reset_index().sort_values("bytes_recuperables", ascending=False, kind="stable")
+    return t, clusters.reset_index(drop=True)
+
+
+__all__ = ["normalize_names", "minhash_signatures", "components", "near_duplicates", "COPY_MARKERS"]
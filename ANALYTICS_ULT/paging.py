@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Vistas paginadas de resultados grandes (lado servidor).
+
+El filtro y el orden se resuelven sobre el DataFrame completo y producen un
+array de posiciones; la página visible es un `iloc` de ese array, y es lo único
+que se serializa al navegador. La descarga completa se escribe por chunks en un
+archivo temporal (memoria hasta `SPOOL_MAX_MEMORY`, luego disco) en lugar de
+armar el CSV entero en memoria.
+"""
+import tempfile
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [25, 50, 100, 250, 500]
+CSV_CHUNK_ROWS = 100_000
+SPOOL_MAX_MEMORY = 32 * 2 ** 20
+
+
+def filter_positions(df: pd.DataFrame, text: str = "", columns=None) -> np.ndarray:
+    """Posiciones de las filas que contienen `text` (literal, sin distinguir mayúsculas) en alguna de `columns`."""
+    n = len(df)
+    if not text:
+        return np.arange(n)
+    cols = list(columns or df.columns)
+    mask = np.zeros(n, dtype=bool)
+    for c in cols:
+        hit = df[c].astype("string").str.contains(text, case=False, regex=False, na=False)
+        mask |= hit.to_numpy(dtype=bool)
+    return np.flatnonzero(mask)
+
+
+def sort_positions(df: pd.DataFrame, pos: np.ndarray, by=None, ascending: bool = True) -> np.ndarray:
+    """Reordena `pos` por la columna `by` (estable, nulos al final)."""
+    if not by or by not in df.columns or len(pos) == 0:
+        return pos
+    s = df[by].iloc[pos]
+    try:
+        order = s.reset_index(drop=True).sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+    except TypeError:  # tipos mezclados: orden por texto
+        order = s.astype("string").reset_index(drop=True).sort_values(ascending=ascending, kind="stable",
+                                                                        na_position="last").index.to_numpy()
+    return pos[order]
+
+
+def n_pages(n_rows: int, page_size: int) -> int:
+    return max(1, -(-int(n_rows) // int(page_size)))
+
+
+def page_slice(df: pd.DataFrame, pos: np.ndarray, page: int, page_size: int, columns=None) -> pd.DataFrame:
+    """Página `page` (1..n) de las filas en `pos`; `columns` limita las columnas enviadas."""
+    page = min(max(1, int(page)), n_pages(len(pos), page_size))
+    sel = pos[(page - 1) * page_size: page * page_size]
+    out = df.iloc[sel]
+    return out[columns] if columns else out
+
+
+def write_csv_chunks(df: pd.DataFrame, f, pos=None, columns=None, chunksize: int = CSV_CHUNK_ROWS):
+    """Escribe `df` (filas `pos`, columnas `columns`) como CSV UTF-8 en el archivo binario `f`, por chunks."""
+    pos = np.arange(len(df)) if pos is None else pos
+    cols = columns or list(df.columns)
+    f.write(df.iloc[:0][cols].to_csv(index=False).encode("utf-8"))
+    for i in range(0, len(pos), chunksize):
+        f.write(df.iloc[pos[i:i + chunksize]][cols].to_csv(index=False, header=False).encode("utf-8"))
+    return f
+
+
+def csv_spool(df: pd.DataFrame, pos=None, columns=None, chunksize: int = CSV_CHUNK_ROWS):
+    """CSV del resultado completo en un archivo temporal rebobinado (se borra al cerrarlo)."""
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+b")
+    write_csv_chunks(df, f, pos=pos, columns=columns, chunksize=chunksize)
+    f.seek(0)
+    return f
+
+
+__all__ = ["PAGE_SIZES", "filter_positions", "sort_positions", "n_pages", "page_slice", "write_csv_chunks", "csv_spool"]
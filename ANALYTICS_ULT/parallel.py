@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Ejecución particionada multi-proceso del reporte.
+
+El inventario preparado se divide en fragmentos por `Raiz` o por hash de
+`CarpetaPadre`; cada proceso calcula resultados parciales mergeables (conteos,
+sumas de bytes, candidatos top-N, grupos por Hash, buckets temporales) y
+`merge_partials` los combina en las mismas tablas que el reporte secuencial.
+
+En Linux los workers se crean con `fork` y leen el DataFrame y los conteos
+globales por Hash heredados del proceso padre (solo viajan índices); en otras
+plataformas se envía cada fragmento serializado y los conteos una vez por
+worker (initializer).
+"""
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from .analyzers import top_n_by_size
+from .io_utils import human_bytes
+from .mismatch import mime_ext_mismatch
+from .risk import risk_scoring, DEFAULT_POLICIES
+from .sketches import build_inventory_sketches, merge_inventory_sketches, sketch_freq_table
+from .topn import RISK_ORDER, top_n
+
+FREQ_COLS = ["Extension", "MimeType", "Propietario"]
+DATE_COLS = ["FechaCreacion", "FechaModificacion", "FechaAcceso"]
+
+_DF = None  # DataFrame heredado por los workers (fork)
+_HASH_COUNTS = None  # conteos globales por Hash: heredados (fork) o recibidos una vez por worker
+
+
+# ---------------- Particionado ----------------
+def shard_indices(df: pd.DataFrame, n_shards: int, by: str = "auto"):
+    """Lista de arrays de posiciones por fragmento. by: auto | raiz | carpeta."""
+    n_shards = max(1, int(n_shards))
+    if by == "auto":
+        by = "raiz" if "Raiz" in df.columns and df["Raiz"].nunique(dropna=False) >= n_shards else "carpeta"
+    if by == "raiz" and "Raiz" in df.columns:
+        codes = pd.factorize(df["Raiz"], use_na_sentinel=False)[0]
+        # reparto greedy de raíces (de mayor a menor) al fragmento menos cargado
+        sizes = np.bincount(codes)
+        load = np.zeros(n_shards, dtype=np.int64)
+        assign = np.empty(len(sizes), dtype=np.int64)
+        for c in np.argsort(-sizes):
+            assign[c] = int(load.argmin()); load[assign[c]] += sizes[c]
+        shard_of = assign[codes]
+    else:
+        key = df["CarpetaPadre"] if "CarpetaPadre" in df.columns else pd.Series(np.arange(len(df)), index=df.index)
+        shard_of = (pd.util.hash_pandas_object(key, index=False).to_numpy() % np.uint64(n_shards)).astype(np.int64)
+    order = np.argsort(shard_of, kind="stable")
+    bounds = np.searchsorted(shard_of[order], np.arange(n_shards + 1))
+    return [order[bounds[i]:bounds[i + 1]] for i in range(n_shards) if bounds[i + 1] > bounds[i]]
+
+
+# ---------------- Parciales ----------------
+def _folder_col(df):
+    if "CarpetaPadre" in df.columns:
+        return "CarpetaPadre"
+    niveles = sorted([c for c in df.columns if c.startswith("Nivel_")], key=lambda x: int(x.split("_")[1]))
+    return niveles[-1] if niveles else None
+
+
+def _dup_key(df):
+    if "Hash" in df.columns:
+        return df["Hash"]
+    if {"Nombre", "TamanoBytes"}.issubset(df.columns):
+        return df["Nombre"].astype(str) + "|" + df["TamanoBytes"].astype(str)
+    return None
+
+
+def partial_report(t: pd.DataFrame, policies=None, hash_counts=None, sketch=False, top=50, risk_top=1000) -> dict:
+    """Resultados parciales mergeables de un fragmento."""
+    t = t.reset_index(drop=True)
+    size = pd.to_numeric(t["TamanoBytes"], errors="coerce") if "TamanoBytes" in t.columns else pd.Series(np.nan, index=t.index)
+    part = {
+        "filas": len(t),
+        "faltantes": t.isna().sum(),
+        "top": top_n_by_size(t, n=top),
+        # con sketch las frecuencias salen de los sketches: no se guardan los value_counts completos
+        "freq": {} if sketch else {c: t[c].astype("string").value_counts(dropna=False) for c in FREQ_COLS if c in t.columns},
+        "timeline": {},
+        "mismatch": mime_ext_mismatch(t),
+        "risk": risk_scoring(t, policies or DEFAULT_POLICIES, hash_counts=hash_counts, top=risk_top),
+    }
+    if sketch:
+        part["sketch"] = build_inventory_sketches([t], cols=[c for c in FREQ_COLS if c in t.columns])
+    fcol = _folder_col(t)
+    if fcol:
+        part["folders"] = pd.DataFrame({"k": t[fcol], "s": size}).groupby("k", dropna=False).agg(
+            archivos=("s", "size"), tam_total=("s", "sum"))
+    key = _dup_key(t)
+    if key is not None:
+        d = pd.DataFrame({"k": key, "s": size})
+        part["dups"] = d.groupby("k", dropna=True, sort=False).agg(conteo=("s", "size"), tam_total=("s", "sum"))
+        part["dup_col"] = "Hash" if "Hash" in t.columns else "__PseudoHash__"
+    for c in DATE_COLS:
+        if c in t.columns:
+            s = pd.to_datetime(t[c], errors="coerce")
+            if getattr(s.dt, "tz", None) is not None:
+                s = s.dt.tz_localize(None)
+            part["timeline"][c] = s.dt.to_period("M").value_counts()
+    return part
+
+
+def _sum_series(parts):
+    return pd.concat(parts, axis=1).fillna(0).sum(axis=1) if parts else pd.Series(dtype=float)
+
+
+def merge_partials(parts, top=50, risk_top=1000, freq_n=50) -> dict:
+    """Combina los parciales en las tablas del reporte (mismo formato que el secuencial)."""
+    n = sum(p["filas"] for p in parts)
+    tables = {}
+
+    cand = pd.concat([p["top"] for p in parts if not p["top"].empty], ignore_index=True) if parts else pd.DataFrame()
+    tables["ResumenTop"] = top_n(cand, top, "TamanoBytes") if not cand.empty else pd.DataFrame()
+
+    falt = _sum_series([p["faltantes"] for p in parts]).astype("int64").to_frame("faltantes")
+    falt["porcentaje"] = 0.0 if n == 0 else (falt["faltantes"] / n * 100).round(2)
+    tables["CalidadDatos"] = falt.sort_values("porcentaje", ascending=False)
+
+    for col, sheet in zip(FREQ_COLS, ["TopExtensiones", "TopMIME", "TopPropietario"]):
+        if parts and "sketch" in parts[0]:
+            tables[sheet] = sketch_freq_table(merge_inventory_sketches([p["sketch"] for p in parts]), col, n=freq_n)
+            continue
+        vc = _sum_series([p["freq"][col] for p in parts if col in p["freq"]])
+        if vc.empty:
+            tables[sheet] = pd.DataFrame(); continue
+        tab = top_n(vc.astype("int64"), freq_n).to_frame("conteo")
+        tab["porcentaje"] = 0.0 if n == 0 else (tab["conteo"] / n * 100).round(2)
+        tables[sheet] = tab.rename_axis(col).reset_index()
+
+    dups = [p["dups"] for p in parts if "dups" in p]
+    if dups:
+        g = pd.concat(dups).groupby(level=0, sort=False).sum()
+        use_col = next(p["dup_col"] for p in parts if "dup_col" in p)
+        dup = g[g["conteo"] > 1].rename_axis(use_col).reset_index()
+        tables["Duplicados"] = dup.sort_values(["conteo", "tam_total"], ascending=[False, False])
+    else:
+        tables["Duplicados"] = pd.DataFrame()
+
+    folders = [p["folders"] for p in parts if "folders" in p]
+    if folders:
+        g = pd.concat(folders).groupby(level=0, dropna=False).sum()
+        g = g.rename_axis("Categoria").reset_index()
+        g["tam_total_humano"] = g["tam_total"].map(human_bytes)
+        tables["Carpetas"] = top_n(g, top, ["tam_total", "archivos"])
+    else:
+        tables["Carpetas"] = pd.DataFrame()
+
+    for c, sheet in zip(DATE_COLS, ["TimelineCreacion", "TimelineModificacion", "TimelineAcceso"]):
+        vc = [p["timeline"][c] for p in parts if c in p["timeline"]]
+        if not vc:
+            tables[sheet] = pd.DataFrame(); continue
+        gr = _sum_series(vc).astype("int64").sort_index()
+        out = gr.rename_axis("periodo").reset_index(name="conteo")
+        out["periodo"] = out["periodo"].astype(str)
+        tables[sheet] = out
+
+    mm = [p["mismatch"] for p in parts if not p["mismatch"].empty]
+    tables["MIME_Ext_Mismatch"] = pd.concat(mm, ignore_index=True) if mm else pd.DataFrame()
+
+    risk = pd.concat([p["risk"] for p in parts], ignore_index=True) if parts else pd.DataFrame()
+    tables["RiskTop"] = top_n(risk, risk_top, RISK_ORDER) if not risk.empty else risk
+    return tables
+
+
+# ---------------- Ejecución ----------------
+def _init_worker(hash_counts):
+    global _HASH_COUNTS
+    _HASH_COUNTS = hash_counts
+
+
+def _run_shard(idx, policies, sketch, shard=None):
+    t = _DF.iloc[idx] if shard is None else shard
+    return partial_report(t, policies, _HASH_COUNTS, sketch)
+
+
+def parallel_report(df: pd.DataFrame, workers: int = 4, shard_by: str = "auto", policies=None, sketch=False) -> dict:
+    """Calcula las tablas del reporte en `workers` procesos. Retorna el dict de tablas."""
+    global _DF, _HASH_COUNTS
+    hash_counts = df["Hash"].value_counts() if "Hash" in df.columns else None
+    shards = shard_indices(df, n_shards=max(1, workers) * 2, by=shard_by)
+    if workers <= 1:
+        return merge_partials([partial_report(df.iloc[i], policies, hash_counts, sketch) for i in shards])
+    use_fork = "fork" in mp.get_all_start_methods()
+    ctx = mp.get_context("fork") if use_fork else mp.get_context()
+    _DF, _HASH_COUNTS = (df, hash_counts) if use_fork else (None, None)
+    init = {} if use_fork else {"initializer": _init_worker, "initargs": (hash_counts,)}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, **init) as ex:
+            futs = [ex.submit(_run_shard, i, policies, sketch, None if use_fork else df.iloc[i]) for i in shards]
+            parts = [f.result() for f in futs]
+    finally:
+        _DF = _HASH_COUNTS = None
+    return merge_partials(parts)
+
+
+__all__ = ["shard_indices", "partial_report", "merge_partials", "parallel_report"]
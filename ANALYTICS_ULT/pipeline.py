@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline compartido por el CLI y el modo batch: preparación del inventario y
+tablas del reporte estándar.
+"""
+import pandas as pd
+from .io_utils import load_table, iter_table_chunks, coerce_booleans, coerce_datetimes, coerce_numeric
+from .path_utils import split_path_to_levels
+from .analyzers import (overview_metrics, top_n_by_size, missingness, freq_table, duplicates_by_hash,
+                        agg_by_folder)
+from .mismatch import mime_ext_mismatch
+from .categorize import add_category_column
+from .risk import risk_scoring, DEFAULT_POLICIES
+from .topn import RISK_ORDER, top_n
+from .timecube import build_time_cube
+from .profiling import NULL_PROFILER
+from .sqlstore import InventoryDB, is_db_path
+
+DATE_COLS = ["FechaCreacion", "FechaModificacion", "FechaAcceso"]
+DERIVED_COLUMNS = {"Categoria": add_category_column}  # columnas que no vienen en el inventario
+
+
+def normalize_inventory(df: pd.DataFrame, prof=NULL_PROFILER) -> pd.DataFrame:
+    """Fechas, números, booleanos y niveles de ruta (también por chunk en `sqlstore.ingest`)."""
+    df = prof.call("coerce_datetimes", coerce_datetimes, df, DATE_COLS)
+    df = prof.call("coerce_numeric", coerce_numeric, df, ["TamanoBytes"])
+    df = prof.call("coerce_booleans", coerce_booleans, df, ["Oculto", "SoloLectura"])
+    if not any(c.startswith("Nivel_") for c in df.columns):
+        if "RutaRelativa" in df.columns:
+            levels = prof.call("split_path_to_levels", split_path_to_levels, df["RutaRelativa"])
+            df = pd.concat([df.reset_index(drop=True), levels.reset_index(drop=True)], axis=1)
+    return df
+
+
+def add_derived_columns(df: pd.DataFrame, cols=()) -> pd.DataFrame:
+    """Agrega las columnas derivadas pedidas en `cols` (p. ej. Categoria) si faltan; fila a fila, vale por chunk."""
+    for c in cols or ():
+        if c in DERIVED_COLUMNS and c not in df.columns:
+            df = DERIVED_COLUMNS[c](df)
+    return df
+
+
+def iter_inventory_chunks(path, chunksize: int = 500_000, derived=(), **load_kwargs):
+    """Chunks normalizados y con las columnas derivadas `derived`, como el inventario completo de `prepare_inventory`."""
+    for chunk in iter_table_chunks(path, chunksize=chunksize, **load_kwargs):
+        yield add_derived_columns(normalize_inventory(chunk), derived)
+
+
+def prepare_inventory(path: str, prof=NULL_PROFILER, **load_kwargs):
+    """Carga y normaliza un inventario. Una base de `ingest` (.sqlite/.duckdb) se abre como `InventoryDB`."""
+    if is_db_path(path):
+        return InventoryDB(path)
+    df = prof.call("load_table", load_table, path, sheet_name=load_kwargs.pop("sheet_name", None), **load_kwargs)
+    return normalize_inventory(df, prof)
+
+
+def _risk_top_sql(db: InventoryDB, policies, top=1000) -> pd.DataFrame:
+    hash_counts = db.value_counts("Hash") if db.has("Hash") else None
+    parts = [risk_scoring(c, policies, hash_counts=hash_counts, top=top) for c in db.iter_chunks()]
+    risk = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    return top_n(risk, top, RISK_ORDER) if not risk.empty else risk
+
+
+def _mismatch_sql(db: InventoryDB) -> pd.DataFrame:
+    cols = [c for c in db.columns if not c.startswith("Nivel_")]
+    parts = [m for m in (mime_ext_mismatch(c) for c in db.iter_chunks(columns=cols)) if not m.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+def report_tables(df, prof=NULL_PROFILER, sketch=False, policies=None) -> dict:
+    """Hojas del reporte estándar (`cli_ultimate.py report`). `df` puede ser un `InventoryDB`:
+    los analizadores se resuelven en SQL y riesgo/mismatch recorren la base por chunks."""
+    P = prof
+    sql = isinstance(df, InventoryDB)
+    cube = P.call("build_time_cube", build_time_cube, df, dims=())  # las tres líneas de tiempo salen de un cubo
+    return {
+        "ResumenTop": P.call("top_n_by_size", top_n_by_size, df, n=50),
+        "CalidadDatos": P.call("missingness", missingness, df),
+        "TopExtensiones": P.call("freq_table.Extension", freq_table, df, "Extension", n=50, sketch=sketch),
+        "TopMIME": P.call("freq_table.MimeType", freq_table, df, "MimeType", n=50, sketch=sketch),
+        "TopPropietario": P.call("freq_table.Propietario", freq_table, df, "Propietario", n=50, sketch=sketch),
+        "Duplicados": P.call("duplicates_by_hash", duplicates_by_hash, df)[0],
+        "Carpetas": P.call("agg_by_folder", agg_by_folder, df, top=50),
+        "TimelineCreacion": cube.timeline("FechaCreacion"),
+        "TimelineModificacion": cube.timeline("FechaModificacion"),
+        "TimelineAcceso": cube.timeline("FechaAcceso"),
+        "MIME_Ext_Mismatch": P.call("mime_ext_mismatch", _mismatch_sql if sql else mime_ext_mismatch, df),
+        "RiskTop": (P.call("risk_scoring", _risk_top_sql, df, policies or DEFAULT_POLICIES) if sql else
+                    P.call("risk_scoring", risk_scoring, df, policies or DEFAULT_POLICIES, top=1000)),
+    }
+
+
+def report_tables_stream(path, prof=NULL_PROFILER, chunksize: int = 500_000, policies=None, **load_kwargs) -> dict:
+    """Reporte estándar sin cargar el inventario completo (`report --sketch`): una pasada cuenta los Hash
+    (el riesgo por duplicado es global) y otra reduce cada chunk a parciales mergeables
+    (`parallel.partial_report`, frecuencias con sketches) que `parallel.merge_partials` combina."""
+    from .parallel import partial_report, merge_partials
+    hash_counts = None
+    with prof.step("report_stream.hash_counts"):
+        for chunk in iter_table_chunks(path, chunksize=chunksize, **load_kwargs):
+            if "Hash" in chunk.columns:
+                vc = chunk["Hash"].value_counts()
+                hash_counts = vc if hash_counts is None else hash_counts.add(vc, fill_value=0)
+    hash_counts = None if hash_counts is None else hash_counts.astype("int64")
+    parts = []
+    with prof.step("report_stream.partials") as rec:
+        for chunk in iter_inventory_chunks(path, chunksize=chunksize, **load_kwargs):
+            parts.append(partial_report(chunk, policies or DEFAULT_POLICIES, hash_counts, sketch=True))
+        rec["filas_salida"] = sum(p["filas"] for p in parts)
+    return prof.call("merge_partials", merge_partials, parts)
+
+
+def summary_row(df, tables: dict) -> dict:
+    """Fila de resumen de un inventario para el consolidado."""
+    met = overview_metrics(df)
+    dup = tables.get("Duplicados")
+    return {
+        "filas": met.get("filas"),
+        "tamano_total_bytes": met.get("tamano_total_bytes"),
+        "tamano_total_humano": met.get("tamano_total_humano"),
+        "extensiones_unicas": met.get("extensiones_unicas"),
+        "archivos_cero_bytes": met.get("archivos_cero_bytes"),
+        "grupos_duplicados": 0 if dup is None else len(dup),
+        "riesgo_max": None if tables.get("RiskTop") is None or tables["RiskTop"].empty else int(tables["RiskTop"]["RiskScore"].max()),
+    }
+
+
+__all__ = ["normalize_inventory", "add_derived_columns", "iter_inventory_chunks", "prepare_inventory", "report_tables", "report_tables_stream", "summary_row"]
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación de pasos (ingesta, analizadores, exportación).
+
+Por cada paso registra: tiempo de pared, tiempo de CPU, delta del pico de RSS
+del proceso, filas de entrada y de salida. En modo profundo además activa
+cProfile y tracemalloc mientras dura cada paso de primer nivel (las
+estadísticas de cProfile se acumulan entre pasos) y mide el pico de
+tracemalloc de cada paso. Ambos se desactivan en el ``finally`` del paso: una
+excepción o ``st.stop()`` no los deja encendidos.
+
+    prof = Profiler()
+    df = prof.call("load_table", load_table, path)
+    with prof.step("export", rows_in=len(df)) as rec:
+        ...
+        rec["filas_salida"] = 12
+    prof.save("perfil.json")   # o .csv
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    if resource is not None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024 / (1024 if sys.platform == "darwin" else 1)
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 2 ** 20
+    except Exception:
+        return None
+
+
+def _rows(obj):
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    pd = sys.modules.get("pandas")  # sin pandas cargado no hay DataFrame que contar (el CLI lo importa tarde)
+    if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    return None
+
+
+class Profiler:
+    """Registro de pasos instrumentados. `enabled=False` lo convierte en no-op."""
+
+    def __init__(self, enabled: bool = True, deep: bool = False):
+        self.enabled = enabled
+        self.deep = deep and enabled
+        self.records = []
+        self._depth = 0
+        self._cprofile = cProfile.Profile() if self.deep else None
+        self._tracing = False  # tracemalloc iniciado por este perfilador (no por otro código)
+
+    def _start_deep(self):
+        self._cprofile.enable()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+
+    @contextmanager
+    def step(self, name: str, rows_in=None):
+        rec = {"paso": name, "nivel": self._depth, "filas_entrada": rows_in, "filas_salida": None}
+        if not self.enabled:
+            yield rec
+            return
+        outer = self._depth == 0
+        self._depth += 1
+        try:
+            if self.deep and outer:
+                self._start_deep()
+            rss0 = _peak_rss_mb()
+            if self.deep:
+                tracemalloc.reset_peak()
+            w0, c0 = time.perf_counter(), time.process_time()
+            try:
+                yield rec
+            finally:
+                rec["wall_s"] = round(time.perf_counter() - w0, 4)
+                rec["cpu_s"] = round(time.process_time() - c0, 4)
+                rss1 = _peak_rss_mb()
+                rec["pico_rss_delta_mb"] = None if rss0 is None or rss1 is None else round(rss1 - rss0, 2)
+                if self.deep and tracemalloc.is_tracing():
+                    rec["pico_tracemalloc_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+                self.records.append(rec)
+        finally:
+            self._depth -= 1
+            if outer:
+                self.stop()
+
+    def call(self, name: str, fn, *args, **kwargs):
+        """Ejecuta `fn(*args, **kwargs)` como un paso; filas de entrada = primer argumento."""
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        with self.step(name, rows_in=_rows(args[0]) if args else None) as rec:
+            out = fn(*args, **kwargs)
+            rec["filas_salida"] = _rows(out)
+        return out
+
+    # ---- resultados ----
+    def to_frame(self):
+        import pandas as pd
+        cols = ["paso", "nivel", "wall_s", "cpu_s", "pico_rss_delta_mb", "filas_entrada", "filas_salida"]
+        if self.deep:
+            cols.append("pico_tracemalloc_mb")
+        df = pd.DataFrame(self.records, columns=cols)
+        # porcentaje sobre los pasos de primer nivel (los anidados ya están incluidos en su padre)
+        total = df.loc[df["nivel"] == 0, "wall_s"].sum()
+        df["porc_tiempo"] = 0.0 if not total else (df["wall_s"] / total * 100).round(1)
+        return df
+
+    def stop(self):
+        """Desactiva cProfile y detiene tracemalloc si lo inició este perfilador. Idempotente."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def hotspots(self, n: int = 30) -> str:
+        """Top-n funciones por tiempo acumulado (solo modo profundo)."""
+        if self._cprofile is None:
+            return ""
+        self.stop()
+        buf = io.StringIO()
+        pstats.Stats(self._cprofile, stream=buf).sort_stats("cumulative").print_stats(n)
+        return buf.getvalue()
+
+    def save(self, path: str) -> str:
+        """Guarda los pasos en JSON o CSV (por extensión). En modo profundo añade <path>.prof."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        df = self.to_frame()
+        if path.lower().endswith(".csv"):
+            df.to_csv(path, index=False, encoding="utf-8")
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"pasos": json.loads(df.to_json(orient="records")),
+                           "total_wall_s": round(float(df.loc[df["nivel"] == 0, "wall_s"].sum()), 4)}, f, indent=2, ensure_ascii=False)
+        if self._cprofile is not None:
+            self.stop()
+            self._cprofile.dump_stats(os.path.splitext(path)[0] + ".prof")
+        return path
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+__all__ = ["Profiler", "NULL_PROFILER"]
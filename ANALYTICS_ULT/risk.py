@@ -2,6 +2,7 @@
 import pandas as pd, numpy as np
 from .path_utils import path_depth_from_levels
 from .security import world_writable, world_readable
+from .topn import RISK_ORDER, top_n
 
 DEFAULT_POLICIES = {
     "stale_days": 365, "long_path": 255, "deep_levels": 20, "big_bytes": 2*1024**3,
@@ -10,7 +11,12 @@ DEFAULT_POLICIES = {
     "risk_bins": [-1,1,3,6,100], "risk_labels":["Bajo","Medio","Alto","Crítico"]
 }
 
-def risk_scoring(df, policies=None):
+def risk_scoring(df, policies=None, hash_counts=None, top=None):
+    """
+    Puntaje de riesgo por archivo. `hash_counts` (value_counts de Hash del inventario
+    completo) permite puntuar un fragmento sin perder duplicados entre fragmentos.
+    `top`: solo las `top` filas de mayor riesgo (selección parcial, sin ordenar todo).
+    """
     if policies is None: policies = DEFAULT_POLICIES
     t = df.copy()
     t["TamanoBytes"] = pd.to_numeric(t.get("TamanoBytes"), errors="coerce")
@@ -32,12 +38,12 @@ def risk_scoring(df, policies=None):
     # precalculo de duplicados por hash si existe
     dup_mask = pd.Series([False]*len(t))
     if "Hash" in t.columns:
-        counts = t["Hash"].value_counts()
+        counts = t["Hash"].value_counts() if hash_counts is None else hash_counts
         dup_mask = t["Hash"].map(lambda h: counts.get(h,0)>1)
 
     pts = []
     reasons = []
-    for i, row in t.iterrows():
+    for i, (_, row) in enumerate(t.iterrows()):
         p = 0; why = []
         if not pd.isna(row.get("TamanoBytes")) and row["TamanoBytes"] >= big_bytes: p += w.get("big_file",3); why.append("big_file")
         if "Hash" in t.columns and bool(dup_mask.iloc[i]): p += w.get("duplicate_hash",4); why.append("duplicate_hash")
@@ -58,4 +64,4 @@ def risk_scoring(df, policies=None):
     bins = policies.get("risk_bins", [-1,1,3,6,100])
     labels = policies.get("risk_labels", ["Bajo","Medio","Alto","Crítico"])
     t["RiskBand"] = pd.cut(t["RiskScore"], bins=bins, labels=labels)
-    return t.sort_values(["RiskScore","TamanoBytes"], ascending=[False, False])
+    return top_n(t, len(t) if top is None else top, RISK_ORDER)
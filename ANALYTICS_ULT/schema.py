@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+Esquema del inventario: columnas que exporta el escáner de archivos.
+
+Lo comparten la detección de dialecto CSV (`csv_io.sniff_csv` puntúa los
+encabezados contra esta lista) y el generador sintético (`synth`).
+"""
+INVENTORY_COLUMNS = ["Nombre", "Extension", "MimeType", "TamanoBytes", "RutaCompleta", "RutaRelativa", "CarpetaPadre",
+                     "Raiz", "Propietario", "Hash", "FechaCreacion", "FechaModificacion", "FechaAcceso",
+                     "Oculto", "SoloLectura", "PermOctal"]
+
+__all__ = ["INVENTORY_COLUMNS"]
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio local de análisis: inventarios preparados en memoria + API JSON.
+
+Cada llamada al CLI paga el arranque del intérprete, los imports y la ingesta
+completa. `serve` carga los inventarios una vez y responde consultas JSON por
+HTTP/1.1 (TCP local o socket Unix) con asyncio: cada conexión es una corrutina
+y el cómputo va a un pool de workers. Con `fork` los workers son procesos que
+heredan los DataFrames del padre (como `parallel.py`, sin serializar filas);
+al cargar un inventario el pool se recrea para que lo vean. Sin `fork`, hilos.
+
+Las respuestas se cachean por (dataset, operación, parámetros) y las consultas
+idénticas simultáneas comparten un solo cómputo.
+
+    POST /load   {"name": "hoy", "path": "inventario.csv"}
+    POST /query  {"dataset": "hoy", "op": "agg_by", "params": {"col": "Extension", "top": 20}}
+    GET  /datasets  ·  GET /ops  ·  GET /health
+
+`params.filters` acepta la misma definición que los filtros de la app
+(ver `filters.py`); `params.limit` corta las tablas (por defecto `DEFAULT_LIMIT`).
+"""
+import asyncio
+import http.client
+import ipaddress
+import json
+import multiprocessing as mp
+import os
+import socket
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .analyzers import (overview_metrics, freq_table, duplicates_by_hash, timeline_counts, agg_by, agg_by_folder,
+                        size_buckets, top_n_by_size, top_n_per_group_by_size, missingness)
+from .delta import delta_key, delta_tables
+from .filters import FilterIndex, spec_key
+from .pipeline import prepare_inventory
+from .risk import risk_scoring, DEFAULT_POLICIES
+from .timecube import build_time_cube
+from . import shared
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 1000
+CACHE_ENTRIES = 256
+MAX_BODY = 8 * 2 ** 20
+RISK_COLUMNS = ["Nombre", "RutaCompleta", "TamanoBytes", "Propietario", "RiskScore", "RiskBand", "RiskWhy"]
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+_DATASETS = {}  # nombre -> Dataset; heredado por los workers (fork)
+
+
+class QueryError(ValueError):
+    """Consulta inválida (dataset u operación desconocidos, parámetros faltantes): HTTP 400/404."""
+
+    def __init__(self, msg, status=400):
+        super().__init__(msg)
+        self.status = status
+
+    def __reduce__(self):  # viaja intacto desde un worker de proceso
+        return QueryError, (str(self), self.status)
+
+
+class Dataset:
+    def __init__(self, name: str, path: str, df: pd.DataFrame, key: str):
+        self.name, self.path, self.df, self.key = name, path, df, key
+        self.loaded_at = time.time()
+        self.index = FilterIndex(df)  # filtros en ms; RiskBand no (requiere el puntaje)
+
+    def view(self, spec):
+        pos = self.index.select(spec)
+        return self.df if pos is None else self.df.take(pos)
+
+    def info(self) -> dict:
+        return {"name": self.name, "path": self.path, "rows": len(self.df), "columns": self.df.shape[1],
+                "key": self.key, "loaded_at": pd.Timestamp(self.loaded_at, unit="s").isoformat()}
+
+
+# ---------------- Serialización ----------------
+def _jsonable(obj, limit: int = DEFAULT_LIMIT):
+    if isinstance(obj, pd.DataFrame):
+        t = obj.head(limit) if limit else obj
+        return {"rows_total": len(obj), "columns": [str(c) for c in t.columns],
+                "data": json.loads(t.to_json(orient="values", date_format="iso", default_handler=str))}
+    if isinstance(obj, pd.Series):
+        return _jsonable(obj.reset_index(), limit)
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v, limit) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v, limit) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+
+# ---------------- Operaciones ----------------
+def _col(p, name="col"):
+    if not p.get(name):
+        raise QueryError(f"Falta el parámetro '{name}'.")
+    return p[name]
+
+
+def _op_duplicates(df, p):
+    dup, espacio = duplicates_by_hash(df)
+    return {"espacio_recuperable": espacio, "grupos": len(dup), "tabla": dup}
+
+
+def _op_risk_top(df, p):
+    n, band = int(p.get("n", 100)), p.get("band")
+    scored = risk_scoring(df, p.get("policies") or DEFAULT_POLICIES, top=None if band else n)
+    if band:
+        scored = scored[scored["RiskBand"].astype("string").isin([band] if isinstance(band, str) else band)]
+    cols = [c for c in RISK_COLUMNS if c in scored.columns]
+    return scored[cols].head(n)
+
+
+def _cube(df, p):
+    col, dim = _col(p), p.get("dim") or None
+    cube = build_time_cube(df, cols=[col], dims=[dim] if dim else ())
+    if (col, dim) not in cube.daily:
+        raise QueryError(f"Columna '{col}'" + (f" o dimensión '{dim}'" if dim else "") + " no disponible.")
+    return cube, col, dim
+
+
+def _op_time_series(df, p):
+    cube, col, dim = _cube(df, p)
+    return cube.series(col, p.get("freq", "M"), dim=dim)
+
+
+def _op_age_profile(df, p):
+    cube, col, dim = _cube(df, p)
+    return cube.age_profile(col, dim=dim)
+
+
+def _op_delta(df, p):
+    base_name = _col(p, "baseline")
+    if base_name not in _DATASETS:
+        raise QueryError(f"Dataset base '{base_name}' no cargado.", 404)
+    base = _DATASETS[base_name].view(p.get("filters"))
+    key = delta_key(df, base)
+    if key is None:
+        raise QueryError("No hay columna clave común (Hash o RutaCompleta) para delta.")
+    add, rem, chg = delta_tables(df, base, key)
+    return {"clave": key, "agregados": len(add), "removidos": len(rem), "cambiados": len(chg),
+            "tabla_agregados": add, "tabla_removidos": rem, "tabla_cambiados": chg}
+
+
+OPS = {
+    "overview": lambda df, p: overview_metrics(df, sketch=bool(p.get("sketch"))),
+    "agg_by": lambda df, p: agg_by(df, _col(p), top=int(p.get("top", 50))),
+    "agg_by_folder": lambda df, p: agg_by_folder(df, top=int(p.get("top", 50))),
+    "freq": lambda df, p: freq_table(df, _col(p), n=int(p.get("n", 30)), sketch=bool(p.get("sketch"))),
+    "top_size": lambda df, p: top_n_by_size(df, n=int(p.get("n", 50))),
+    "top_per_group": lambda df, p: top_n_per_group_by_size(df, by=_col(p, "by"), n=int(p.get("n", 20))),
+    "size_buckets": lambda df, p: size_buckets(df),
+    "timeline": lambda df, p: timeline_counts(df, _col(p), p.get("freq", "M")),
+    "time_series": _op_time_series,
+    "age_profile": _op_age_profile,
+    "missingness": lambda df, p: missingness(df),
+    "duplicates": _op_duplicates,
+    "risk_top": _op_risk_top,
+    "delta": _op_delta,
+}
+
+
+def execute(dataset: str, op: str, params=None):
+    """Ejecuta `op` sobre el dataset cargado (en el proceso actual o en un worker) y retorna JSON nativo."""
+    params = params or {}
+    if dataset not in _DATASETS:
+        raise QueryError(f"Dataset '{dataset}' no cargado.", 404)
+    if op not in OPS:
+        raise QueryError(f"Operación '{op}' desconocida. Disponibles: {', '.join(OPS)}.", 404)
+    df = _DATASETS[dataset].view(params.get("filters"))
+    return _jsonable(OPS[op](df, params), int(params.get("limit", DEFAULT_LIMIT)))
+
+
+# ---------------- Servicio ----------------
+class AnalysisService:
+    """Inventarios en memoria, pool de workers y caché de respuestas. `workers=0`: hilos en el proceso."""
+
+    def __init__(self, workers: int = 4, cache_entries: int = CACHE_ENTRIES, **load_kwargs):
+        self.workers = max(0, int(workers))
+        self.use_fork = self.workers > 0 and "fork" in mp.get_all_start_methods()
+        self.load_kwargs = load_kwargs
+        self.cache = OrderedDict()
+        self.cache_entries = cache_entries
+        self.inflight = {}
+        self.pool = None
+        self.started = time.time()
+        self.served = 0
+        self._restart_pool()
+
+    def _restart_pool(self):
+        old = self.pool
+        if self.use_fork:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("fork"))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=max(2, self.workers or os.cpu_count() or 2))
+        if old is not None:
+            old.shutdown(wait=False)  # las consultas en curso terminan en el pool anterior
+
+    def _prepare(self, name: str, path: str, **load_kwargs):
+        """Parsea e indexa el inventario sin tocar el estado compartido (con /load corre en un hilo aparte).
+        None si `name` ya está cargado con el mismo archivo y opciones."""
+        if not os.path.exists(path):
+            raise QueryError(f"No existe: {path}", 404)
+        opts = {k: v for k, v in self.load_kwargs.items() if v}
+        opts.update({k: v for k, v in load_kwargs.items() if v})
+        st_ = os.stat(path)
+        key = shared.content_key(f"{os.path.abspath(path)}|{st_.st_size}|{st_.st_mtime_ns}".encode("utf-8"),
+                                 **{k: str(v) for k, v in opts.items()})
+        cur = _DATASETS.get(name)
+        if cur is not None and cur.key == key:
+            return None
+        df = prepare_inventory(path, **opts)
+        if not isinstance(df, pd.DataFrame):
+            df = df.to_frame()  # base de `ingest`: los workers no comparten conexiones SQLite
+        return Dataset(name, path, df, key)
+
+    def _install(self, ds: Dataset) -> dict:
+        """Publica el dataset: `_DATASETS`, caché y pool. Solo en el hilo del event loop (o antes de iniciarlo),
+        el mismo que usa `query`."""
+        _DATASETS[ds.name] = ds
+        for k in [k for k in self.cache if k[0] == ds.name]:
+            del self.cache[k]
+        self._restart_pool()
+        return ds.info()
+
+    def load(self, name: str, path: str, **load_kwargs) -> dict:
+        """Prepara el inventario en el proceso principal (los workers lo heredan al recrear el pool)."""
+        ds = self._prepare(name, path, **load_kwargs)
+        return _DATASETS[name].info() if ds is None else self._install(ds)
+
+    def unload(self, name: str):
+        if _DATASETS.pop(name, None) is None:
+            raise QueryError(f"Dataset '{name}' no cargado.", 404)
+        self._restart_pool()
+        return {"unloaded": name}
+
+    async def query(self, dataset: str, op: str, params=None):
+        """(resultado, cacheado). Las consultas iguales en vuelo esperan el mismo futuro."""
+        params = params or {}
+        if dataset not in _DATASETS:
+            raise QueryError(f"Dataset '{dataset}' no cargado.", 404)
+        deps = [dataset] + ([params["baseline"]] if op == "delta" and params.get("baseline") in _DATASETS else [])
+        ckey = (dataset, op, "|".join(_DATASETS[d].key for d in deps), spec_key(params))
+        if ckey in self.cache:
+            self.cache.move_to_end(ckey)
+            return self.cache[ckey], True
+        fut = self.inflight.get(ckey)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = asyncio.ensure_future(loop.run_in_executor(self.pool, execute, dataset, op, params))
+            self.inflight[ckey] = fut
+            try:
+                result = await fut
+            finally:
+                self.inflight.pop(ckey, None)
+            self.cache[ckey] = result
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+            return result, False
+        return await asyncio.shield(fut), True
+
+    # ---------------- HTTP ----------------
+    async def dispatch(self, method: str, path: str, body: bytes):
+        if path == "/health":
+            return 200, {"ok": True, "datasets": len(_DATASETS), "uptime_s": round(time.time() - self.started, 1),
+                         "served": self.served, "workers": self.workers, "mode": "process" if self.use_fork else "thread"}
+        if path == "/datasets":
+            return 200, {"ok": True, "datasets": [d.info() for d in _DATASETS.values()]}
+        if path == "/ops":
+            return 200, {"ok": True, "ops": list(OPS)}
+        if path not in ("/query", "/load", "/unload"):
+            return 404, {"ok": False, "error": f"Ruta desconocida: {path}"}
+        if method != "POST":
+            return 405, {"ok": False, "error": "Use POST con un cuerpo JSON."}
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, {"ok": False, "error": f"JSON inválido: {e}"}
+        t0 = time.perf_counter()
+        try:
+            if path == "/load":
+                loop = asyncio.get_running_loop()
+                name = req.get("name") or os.path.splitext(os.path.basename(req.get("path", "")))[0]
+                ds = await loop.run_in_executor(None, lambda: self._prepare(  # solo el parseo sale del loop
+                    name, req.get("path", ""), sep=req.get("sep"), encoding=req.get("encoding"),
+                    sheet_name=req.get("sheet_name")))
+                info = _DATASETS[name].info() if ds is None else self._install(ds)
+                return 200, {"ok": True, "dataset": info, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+            if path == "/unload":
+                return 200, {"ok": True, **self.unload(req.get("name", ""))}
+            result, cached = await self.query(req.get("dataset", ""), req.get("op", ""), req.get("params"))
+        except QueryError as e:
+            return e.status, {"ok": False, "error": str(e)}
+        except (KeyError, ValueError, TypeError) as e:
+            return 400, {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        except Exception as e:  # el servicio sigue atendiendo
+            return 500, {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.served += 1
+        return 200, {"ok": True, "op": req.get("op"), "cached": cached,
+                     "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2), "result": result}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Conexión HTTP/1.1 con keep-alive: una petición tras otra hasta que el cliente cierre."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target, version = (line.decode("latin-1").split() + ["", "", ""])[:3]
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                size = int(headers.get("content-length") or 0)
+                if size > MAX_BODY:
+                    status, payload = 413, {"ok": False, "error": "Cuerpo demasiado grande."}
+                    body, keep = b"", False
+                else:
+                    body = await reader.readexactly(size) if size else b""
+                    keep = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                    status, payload = await self.dispatch(method.upper(), target.split("?", 1)[0], body)
+                data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                              "Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n"
+                              ).encode("latin-1") + data)
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = ""):
+        if not socket_path:
+            check_loopback(host)
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            server = await asyncio.start_unix_server(self.handle, path=socket_path)
+            where = f"unix:{socket_path}"
+        else:
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+            where = f"http://{host}:{port}"
+        print(f"Servicio de análisis en {where} ({len(_DATASETS)} datasets, "
+              f"{self.pool._max_workers} workers de {'proceso' if self.use_fork else 'hilo'})", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+def check_loopback(host: str):
+    """Sin autenticación y con /load leyendo rutas locales, el servicio solo escucha en loopback."""
+    try:
+        addrs = {info[4][0] for info in socket.getaddrinfo(host, None)}
+        ok = bool(addrs) and all(ipaddress.ip_address(a.split("%", 1)[0]).is_loopback for a in addrs)
+    except (OSError, ValueError):
+        ok = False
+    if not ok:
+        raise ValueError(f"Host '{host}' no es de loopback: el servicio no tiene autenticación y /load lee cualquier "
+                         "ruta local; use 127.0.0.1, ::1, localhost o --socket.")
+
+
+# ---------------- Cliente ----------------
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def request(path: str, payload=None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = "",
+            timeout: float = 600):
+    """Cliente mínimo (solo biblioteca estándar): GET sin `payload`, POST JSON con él. Retorna (status, dict)."""
+    conn = (_UnixHTTPConnection(socket_path, timeout=timeout) if socket_path
+            else http.client.HTTPConnection(host, port, timeout=timeout))
+    try:
+        if payload is None:
+            conn.request("GET", path)
+        else:
+            conn.request("POST", path, body=json.dumps(payload).encode("utf-8"),
+                         headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read() or b"{}")
+    finally:
+        conn.close()
+
+
+def run_service(inputs=(), names=(), host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = "",
+                workers: int = 4, **load_kwargs):
+    """Carga `inputs` (nombre: `names` o el nombre del archivo) y atiende hasta Ctrl+C."""
+    if not socket_path:
+        check_loopback(host)  # antes de cargar nada
+    svc = AnalysisService(workers=workers, **load_kwargs)
+    for i, path in enumerate(inputs):
+        name = names[i] if i < len(names) else os.path.splitext(os.path.basename(path))[0]
+        t0 = time.perf_counter()
+        info = svc.load(name, path)
+        print(f"Cargado '{name}': {info['rows']:,} filas en {time.perf_counter() - t0:.1f} s", flush=True)
+    try:
+        asyncio.run(svc.serve(host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+
+
+__all__ = ["OPS", "QueryError", "Dataset", "AnalysisService", "execute", "request", "run_service",
+           "check_loopback", "DEFAULT_HOST", "DEFAULT_PORT"]
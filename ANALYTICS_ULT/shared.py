@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Dataset compartido entre sesiones y procesos: el inventario preparado se
+publica una vez como archivo Arrow IPC (sin compresión) y cada lector lo abre
+con memory-map. Las columnas numéricas sin nulos y las de texto (pyarrow) se
+exponen a pandas sin copia: las páginas del archivo viven en el page cache del
+sistema y se comparten entre todos los procesos que lo abren.
+
+pyarrow es opcional: sin él `available()` es False y la app mantiene una sola
+copia por proceso con `st.cache_resource`.
+
+    path = publish_frame(df, dataset_path(store, key))
+    df = open_frame(path)      # solo lectura; mmap
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # opcional
+    pa = None
+
+STORE_DIR = os.path.join(".", "__shared__")
+SUFFIX = ".arrow"
+# nombres que escribe este módulo: "<sha1>.arrow" y su temporal "<sha1>.arrow.<pid>.tmp"
+_OWN_NAME = re.compile(r"^([0-9a-f]{40})\.arrow(?:\.\d+\.tmp)?$")
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def content_key(data, **options) -> str:
+    """sha1 de los bytes (o del archivo en `data` si es ruta) + opciones de lectura."""
+    h = hashlib.sha1()
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        h.update(data)
+    else:
+        with open(data, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    h.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def dataset_path(store_dir: str, key: str) -> str:
+    return os.path.join(store_dir, key + SUFFIX)
+
+
+# ---------------- Escritura ----------------
+def _arrow_column(s: pd.Series):
+    if s.dtype.kind == "f":
+        # NaN como valor (sin bitmap de validez): la lectura vuelve a ser float64 sin copia
+        return pa.array(s.to_numpy(), from_pandas=False)
+    try:
+        return pa.array(s, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):  # objetos mezclados (p. ej. int y str)
+        return pa.array(s.astype("string"), from_pandas=True)
+
+
+def to_arrow_table(df: pd.DataFrame):
+    if pa is None:
+        raise ImportError("El dataset compartido requiere 'pyarrow' (pip install pyarrow).")
+    return pa.table({str(c): _arrow_column(df[c]) for c in df.columns})
+
+
+def publish_frame(df: pd.DataFrame, path: str) -> str:
+    """Escribe `df` como Arrow IPC en `path` (atómico: tmp + replace). Idempotente."""
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    table = to_arrow_table(df)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp, "wb") as f, pa.ipc.new_file(f, table.schema) as w:
+        w.write_table(table, max_chunksize=1 << 20)
+    os.replace(tmp, path)
+    return path
+
+
+# ---------------- Lectura ----------------
+def _string_dtype():
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:  # pandas < 2.3
+        return pd.StringDtype("pyarrow")
+
+
+def open_frame(path: str) -> pd.DataFrame:
+    """DataFrame respaldado por el archivo mapeado en memoria (arrays de solo lectura)."""
+    if pa is None:
+        raise ImportError("El dataset compartido requiere 'pyarrow' (pip install pyarrow).")
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    sdt = _string_dtype()
+    mapper = {pa.string(): sdt, pa.large_string(): sdt}.get
+    # split_blocks evita consolidar columnas (la consolidación copia todo el frame)
+    return table.to_pandas(split_blocks=True, self_destruct=False, types_mapper=mapper)
+
+
+def get_or_publish(store_dir: str, key: str, build):
+    """Abre el dataset `key`; si no existe lo construye con `build()` y lo publica."""
+    path = dataset_path(store_dir, key)
+    if not os.path.exists(path):
+        publish_frame(build(), path)
+    os.utime(path)  # marca de uso para `prune`
+    return open_frame(path)
+
+
+def prune(store_dir: str = STORE_DIR, max_age_s: float = 7 * 86400, keep=()):
+    """Borra datasets no usados en `max_age_s` y temporales huérfanos (los mmap abiertos siguen válidos en POSIX).
+    Solo toca archivos con los nombres que escribe `publish_frame`; el resto del directorio no se modifica."""
+    now = time.time()
+    removed = []
+    try:
+        names = os.listdir(store_dir)
+    except OSError:
+        return removed
+    for name in sorted(names):
+        m = _OWN_NAME.match(name)
+        if m is None or m.group(1) in keep:
+            continue
+        p = os.path.join(store_dir, name)
+        try:
+            if now - os.path.getmtime(p) > max_age_s:
+                os.remove(p); removed.append(p)
+        except OSError:
+            pass
+    return removed
+
+
+__all__ = ["available", "content_key", "dataset_path", "publish_frame", "open_frame", "get_or_publish", "prune",
+           "STORE_DIR"]
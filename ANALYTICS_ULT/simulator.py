@@ -1,42 +1,81 @@
 # -*- coding: utf-8 -*-
 import pandas as pd, numpy as np
+from .neardup import components
+from .topn import top_n_per_group
 
-def simulate_dedupe(df: pd.DataFrame, by="CarpetaPadre", strategy="keep-largest"):
+def _dedupe_keys(t: pd.DataFrame, near) -> np.ndarray:
+    """Clave de duplicado: mismo Hash o mismo cluster de casi duplicados (componentes conexas de ambos)."""
+    hcodes = pd.factorize(t["Hash"], sort=True, use_na_sentinel=False)[0]  # mismo orden que agrupar por Hash
+    if near is None or near.empty:
+        return hcodes
+    if "Verificado" in near.columns:  # solo miembros confirmados (Hash, tamaño o nombre sin quitar marcas)
+        near = near[near["Verificado"].astype(bool)]
+    cid = near["ClusterId"].reindex(t.index).to_numpy(dtype=float)
+    n = len(t)
+    us, vs = [], []
+    for codes in (hcodes, np.where(np.isnan(cid), -1, cid).astype(np.int64)):
+        order = np.argsort(codes, kind="stable")
+        c = codes[order]
+        first = np.r_[True, c[1:] != c[:-1]]
+        head = order[np.maximum.accumulate(np.where(first, np.arange(n), 0))]
+        m = ~first & (c >= 0)
+        us.append(head[m]); vs.append(order[m])
+    return components(n, np.concatenate(us), np.concatenate(vs))
+
+def simulate_dedupe(df: pd.DataFrame, by="CarpetaPadre", strategy="keep-largest", near=None):
     """
     Simula deduplicación por Hash dentro de cada grupo `by`.
     strategy: keep-largest | keep-earliest | keep-latest
+    near: miembros de `neardup.near_duplicates` (opcional). Los miembros verificados de un mismo cluster se
+          tratan como duplicados aunque su Hash difiera (Action = DeleteNearDuplicate).
     Retorna: (plan, ahorro_total_bytes)
     """
     if "Hash" not in df.columns:
         return pd.DataFrame(), 0.0
     t = df.copy()
+    t["_dupkey"] = _dedupe_keys(t, near)
     t["TamanoBytes"] = pd.to_numeric(t.get("TamanoBytes"), errors="coerce")
     # fecha criterio
     for c in ["FechaCreacion","FechaModificacion","FechaAcceso"]:
         if c in t.columns:
             t[c] = pd.to_datetime(t[c], errors="coerce")
-    plans = []
-    ahorro = 0.0
     group_cols = [by] if by in t.columns else [c for c in ["CarpetaPadre","Propietario","Extension","Raiz"] if c in t.columns][:1]
     if not group_cols: group_cols = ["Hash"]  # fallback
-    for (grp, gdf) in t.groupby(group_cols + ["Hash"], dropna=False):
-        if len(gdf) <= 1: 
-            continue
-        if strategy=="keep-largest":
-            keep = gdf.sort_values("TamanoBytes", ascending=False).head(1)
-        elif strategy=="keep-earliest":
-            datecol = "FechaCreacion" if "FechaCreacion" in gdf.columns else ("FechaModificacion" if "FechaModificacion" in gdf.columns else None)
-            keep = gdf.sort_values(datecol, ascending=True).head(1) if datecol else gdf.head(1)
-        elif strategy=="keep-latest":
-            datecol = "FechaModificacion" if "FechaModificacion" in gdf.columns else ("FechaAcceso" if "FechaAcceso" in gdf.columns else None)
-            keep = gdf.sort_values(datecol, ascending=False).head(1) if datecol else gdf.head(1)
-        else:
-            keep = gdf.head(1)
-        drop = gdf.loc[~gdf.index.isin(keep.index)]
-        ahorro += pd.to_numeric(drop["TamanoBytes"], errors="coerce").sum()
-        plan_block = drop.copy()
-        plan_block["Action"] = "DeleteDuplicate"
-        plan_block["Keep_Ref"] = keep.iloc[0].get("RutaCompleta") or keep.iloc[0].get("RutaRelativa")
-        plans.append(plan_block)
-    plan = pd.concat(plans, axis=0, ignore_index=True) if plans else pd.DataFrame()
+    codes = t.groupby(group_cols + ["_dupkey"], dropna=False).ngroup().to_numpy(dtype=np.int64)
+    multi = np.bincount(codes)[codes] > 1
+    t, codes = t[multi], codes[multi]
+    if t.empty:
+        return pd.DataFrame(), 0.0
+    # el conservado de cada grupo: top-1 por el criterio (una sola selección, sin bucle por grupo)
+    if strategy=="keep-largest":
+        crit = ("TamanoBytes", False)
+    elif strategy=="keep-earliest":
+        datecol = "FechaCreacion" if "FechaCreacion" in t.columns else ("FechaModificacion" if "FechaModificacion" in t.columns else None)
+        crit = (datecol, True)
+    elif strategy=="keep-latest":
+        datecol = "FechaModificacion" if "FechaModificacion" in t.columns else ("FechaAcceso" if "FechaAcceso" in t.columns else None)
+        crit = (datecol, False)
+    else:
+        crit = (None, True)
+    pos = np.arange(len(t))
+    sel = top_n_per_group(pd.DataFrame({"_g": codes, "_k": t[crit[0]].reset_index(drop=True) if crit[0] else 0}), 1,
+                          ["_k"] if crit[0] else [], group="_g", ascending=crit[1])
+    keeper = np.empty(codes.max() + 1, dtype=np.int64)
+    keeper[codes[sel.index]] = pos[sel.index]
+    drop = np.flatnonzero(keeper[codes] != pos)
+    drop = drop[np.argsort(codes[drop], kind="stable")]  # grupos en orden, filas en orden original
+    ref = keeper[codes[drop]]
+
+    plan = t.iloc[drop].drop(columns="_dupkey").reset_index(drop=True)
+    ahorro = plan["TamanoBytes"].sum()
+    if near is not None:
+        h = t["Hash"].astype("string")
+        same = h.iloc[drop].reset_index(drop=True).eq(h.iloc[ref].reset_index(drop=True)).fillna(False)
+        plan["Action"] = np.where(same.to_numpy(dtype=bool), "DeleteDuplicate", "DeleteNearDuplicate")
+    else:
+        plan["Action"] = "DeleteDuplicate"
+    none = np.full(len(t), None, dtype=object)
+    full = t["RutaCompleta"].to_numpy(dtype=object) if "RutaCompleta" in t.columns else none
+    rel = t["RutaRelativa"].to_numpy(dtype=object) if "RutaRelativa" in t.columns else none
+    plan["Keep_Ref"] = [a if a is not None and a is not pd.NA and a != "" else b for a, b in zip(full[ref], rel[ref])]
     return plan, float(ahorro)
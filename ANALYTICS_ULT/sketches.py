@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Sketches probabilísticos mergeables para inventarios que no caben en memoria.
+
+- KLLSketch: cuantiles aproximados en una sola pasada (Karnin–Lang–Liberty).
+  Error de rango ≈ 1.65 / k (k=200 → ~0.8 %) con memoria O(k · log(n/k)).
+- HyperLogLog: cardinalidad (valores distintos). Error estándar ≈ 1.04 / sqrt(2^p)
+  (p=14 → ~0.81 %) con 2^p registros de 1 byte.
+- SpaceSaving: heavy hitters (top-N) con m contadores. Cada conteo sobreestima
+  como máximo en `error` ≤ N/m; todo valor con frecuencia > N/m está garantizado.
+- CountMinSketch: frecuencia puntual; sobreestima como máximo eps·N con
+  probabilidad 1-delta (ancho e/eps, profundidad ln(1/delta)).
+
+Todos son mergeables (`merge`) y serializables (`to_dict` / `from_dict`, JSON),
+de modo que los sketches de cada servidor se combinan sin mover filas.
+El hash es `pandas.util.hash_array` (SipHash con clave fija): estable entre
+procesos y máquinas, requisito para poder mergear.
+"""
+import base64
+import json
+import math
+import numpy as np
+import pandas as pd
+from .topn import top_n
+
+
+class KLLSketch:
+    """Sketch de cuantiles KLL con actualización por lotes (arrays numpy)."""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = int(k)
+        self.n = 0
+        self.levels = [np.empty(0, dtype=float)]
+        self._rng = np.random.default_rng(seed)
+
+    # ---- construcción ----
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - 1 - h
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        while sum(len(x) for x in self.levels) > sum(self._capacity(h) for h in range(len(self.levels))):
+            # se compacta el primer nivel lleno (con el total excedido siempre hay uno)
+            h = next(h for h in range(len(self.levels)) if len(self.levels[h]) >= self._capacity(h))
+            buf = np.sort(self.levels[h])
+            keep = buf[-1:] if len(buf) % 2 else buf[:0]
+            pair = buf[: len(buf) - len(keep)]
+            promoted = pair[self._rng.integers(0, 2)::2]
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0, dtype=float))
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+
+    def update(self, values):
+        v = np.asarray(values, dtype=float).ravel()
+        v = v[~np.isnan(v)]
+        if v.size == 0:
+            return self
+        self.n += int(v.size)
+        self.levels[0] = np.concatenate([self.levels[0], v])
+        self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=float))
+        for h, lv in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], lv])
+        self.n += other.n
+        self._compress()
+        return self
+
+    # ---- consultas ----
+    def _weighted(self):
+        vals = np.concatenate(self.levels)
+        w = np.concatenate([np.full(len(lv), 2 ** h, dtype=float) for h, lv in enumerate(self.levels)])
+        order = np.argsort(vals, kind="mergesort")
+        return vals[order], np.cumsum(w[order])
+
+    def quantile(self, q):
+        """Cuantil(es) aproximados; `q` escalar o lista en [0, 1]."""
+        if self.n == 0:
+            return np.nan if np.isscalar(q) else [np.nan] * len(q)
+        vals, cw = self._weighted()
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        idx = np.searchsorted(cw, qs * cw[-1], side="left").clip(0, len(vals) - 1)
+        out = vals[idx]
+        return float(out[0]) if np.isscalar(q) else out.tolist()
+
+    def rank(self, x: float) -> float:
+        """Fracción aproximada de valores <= x."""
+        if self.n == 0:
+            return np.nan
+        vals, cw = self._weighted()
+        i = np.searchsorted(vals, x, side="right")
+        return 0.0 if i == 0 else float(cw[i - 1] / cw[-1])
+
+    # ---- serialización ----
+    def to_dict(self) -> dict:
+        return {"tipo": "kll", "k": self.k, "n": self.n, "levels": [lv.tolist() for lv in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "KLLSketch":
+        sk = cls(k=d["k"])
+        sk.n = int(d["n"])
+        sk.levels = [np.asarray(lv, dtype=float) for lv in d["levels"]] or [np.empty(0, dtype=float)]
+        return sk
+
+    def __len__(self):
+        return self.n
+
+
+def hash_values(values) -> np.ndarray:
+    """Hash uint64 estable de valores arbitrarios (como texto; NA → '<NA>')."""
+    s = pd.Series(values).astype("string").fillna("<NA>")
+    return pd.util.hash_array(s.to_numpy(dtype=object))
+
+
+def _b64(arr: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(arr).tobytes()).decode("ascii")
+
+
+def _unb64(txt: str, dtype) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(txt), dtype=dtype).copy()
+
+
+class HyperLogLog:
+    """Conteo aproximado de distintos (HLL con corrección de rango bajo)."""
+
+    def __init__(self, p: int = 14):
+        self.p = int(p)
+        self.registers = np.zeros(1 << self.p, dtype=np.uint8)
+
+    def update(self, values):
+        h = hash_values(values)
+        if h.size == 0:
+            return self
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        # rho = posición del primer bit 1 en los (64-p) bits restantes
+        bitlen = np.frexp(rest.astype(np.float64))[1]
+        rho = (64 - self.p - bitlen + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rho)
+        return self
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("HyperLogLog con precisión distinta")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        zeros = int((self.registers == 0).sum())
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)
+        return int(round(est))
+
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def to_dict(self) -> dict:
+        return {"tipo": "hll", "p": self.p, "registers": _b64(self.registers)}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "HyperLogLog":
+        sk = cls(p=d["p"])
+        sk.registers = _unb64(d["registers"], np.uint8)
+        return sk
+
+
+class SpaceSaving:
+    """Heavy hitters mergeables: {valor: (conteo, error)} con a lo sumo m contadores."""
+
+    def __init__(self, m: int = 1000):
+        self.m = int(m)
+        self.n = 0
+        self.counts = pd.Series(dtype="int64")
+        self.errors = pd.Series(dtype="int64")
+
+    def _min_count(self) -> int:
+        return int(self.counts.min()) if len(self.counts) >= self.m else 0
+
+    def _combine(self, counts: pd.Series, errors: pd.Series, other_min: int, n: int):
+        # Merge de resúmenes Space-Saving: a las claves ausentes en un lado se les
+        # suma el mínimo de ese lado (cota de lo que pudo haber sido descartado).
+        mine_min = self._min_count()
+        keys = self.counts.index.union(counts.index)
+        c = self.counts.reindex(keys, fill_value=mine_min) + counts.reindex(keys, fill_value=other_min)
+        e = self.errors.reindex(keys, fill_value=mine_min) + errors.reindex(keys, fill_value=other_min)
+        if len(c) > self.m:
+            c = c.nlargest(self.m, keep="first")
+        self.counts, self.errors = c.astype("int64"), e.reindex(c.index).astype("int64")
+        self.n += int(n)
+        return self
+
+    def update(self, values):
+        vc = pd.Series(values).astype("string").fillna("<NA>").value_counts()
+        vc.index = vc.index.astype(object)
+        return self._combine(vc, pd.Series(0, index=vc.index, dtype="int64"), 0, int(vc.sum()))
+
+    def merge(self, other: "SpaceSaving"):
+        return self._combine(other.counts, other.errors, other._min_count(), other.n)
+
+    def top(self, n: int = 30) -> pd.DataFrame:
+        c = top_n(self.counts, n)
+        return pd.DataFrame({"valor": c.index, "conteo": c.to_numpy(), "error_max": self.errors.reindex(c.index).to_numpy()})
+
+    def to_dict(self) -> dict:
+        return {"tipo": "spacesaving", "m": self.m, "n": self.n, "items": [
+            [k, int(c), int(self.errors[k])] for k, c in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "SpaceSaving":
+        sk = cls(m=d["m"])
+        sk.n = int(d["n"])
+        keys = [it[0] for it in d["items"]]
+        sk.counts = pd.Series([it[1] for it in d["items"]], index=pd.Index(keys, dtype=object), dtype="int64")
+        sk.errors = pd.Series([it[2] for it in d["items"]], index=pd.Index(keys, dtype=object), dtype="int64")
+        return sk
+
+
+class CountMinSketch:
+    """Frecuencias (o pesos, p.ej. bytes) aproximadas por valor."""
+
+    def __init__(self, eps: float = 1e-3, delta: float = 1e-3, seed: int = 7):
+        self.eps, self.delta = float(eps), float(delta)
+        self.width = int(math.ceil(math.e / self.eps))
+        self.depth = int(math.ceil(math.log(1 / self.delta)))
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, self.depth, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, self.depth, dtype=np.uint64)
+        self.seed = seed
+        self.table = np.zeros((self.depth, self.width), dtype=np.float64)
+        self.total = 0.0
+
+    def _cols(self, h: np.ndarray) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            mixed = h[None, :] * self._a[:, None] + self._b[:, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, values, weights=None):
+        h = hash_values(values)
+        w = np.ones(h.size) if weights is None else np.nan_to_num(np.asarray(weights, dtype=float))
+        cols = self._cols(h)
+        for r in range(self.depth):
+            self.table[r] += np.bincount(cols[r], weights=w, minlength=self.width)
+        self.total += float(w.sum())
+        return self
+
+    def estimate(self, values) -> np.ndarray:
+        cols = self._cols(hash_values(values))
+        return self.table[np.arange(self.depth)[:, None], cols].min(axis=0)
+
+    def merge(self, other: "CountMinSketch"):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("CountMinSketch con parámetros distintos")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+    def to_dict(self) -> dict:
+        return {"tipo": "countmin", "eps": self.eps, "delta": self.delta, "seed": self.seed,
+                "total": self.total, "table": _b64(self.table)}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CountMinSketch":
+        sk = cls(eps=d["eps"], delta=d["delta"], seed=d["seed"])
+        sk.table = _unb64(d["table"], np.float64).reshape(sk.depth, sk.width)
+        sk.total = float(d["total"])
+        return sk
+
+
+_TYPES = {"kll": KLLSketch, "hll": HyperLogLog, "spacesaving": SpaceSaving, "countmin": CountMinSketch}
+
+
+def sketch_from_dict(d: dict):
+    return _TYPES[d["tipo"]].from_dict(d)
+
+
+# ---------------- Sketches de inventario ----------------
+SKETCH_COLS = ("Extension", "MimeType", "Propietario")
+
+
+def build_inventory_sketches(chunks, cols=SKETCH_COLS, hll_p=14, top_m=1000, cm_eps=1e-3) -> dict:
+    """
+    Una pasada sobre los chunks. Por columna: HLL (distintos), SpaceSaving
+    (top-N) y Count-Min (conteo y bytes por valor). Más filas y bytes totales.
+    """
+    sk = {"filas": 0, "bytes": 0.0, "cols": {}}
+    for chunk in chunks:
+        sk["filas"] += len(chunk)
+        size = pd.to_numeric(chunk["TamanoBytes"], errors="coerce") if "TamanoBytes" in chunk.columns else None
+        if size is not None:
+            sk["bytes"] += float(size.sum())
+        for c in cols:
+            if c not in chunk.columns:
+                continue
+            entry = sk["cols"].setdefault(c, {"hll": HyperLogLog(hll_p), "top": SpaceSaving(top_m),
+                                             "cm_conteo": CountMinSketch(cm_eps), "cm_bytes": CountMinSketch(cm_eps)})
+            entry["hll"].update(chunk[c])
+            entry["top"].update(chunk[c])
+            entry["cm_conteo"].update(chunk[c])
+            if size is not None:
+                entry["cm_bytes"].update(chunk[c], weights=size)
+    return sk
+
+
+def merge_inventory_sketches(parts) -> dict:
+    out = {"filas": 0, "bytes": 0.0, "cols": {}}
+    for part in parts:
+        out["filas"] += part["filas"]
+        out["bytes"] += part["bytes"]
+        for c, entry in part["cols"].items():
+            if c not in out["cols"]:
+                out["cols"][c] = {k: sketch_from_dict(v.to_dict()) for k, v in entry.items()}
+            else:
+                for k, v in entry.items():
+                    out["cols"][c][k].merge(v)
+    return out
+
+
+def dumps_inventory_sketches(sk: dict) -> str:
+    return json.dumps({"filas": sk["filas"], "bytes": sk["bytes"], "cols": {
+        c: {k: v.to_dict() for k, v in entry.items()} for c, entry in sk["cols"].items()}})
+
+
+def loads_inventory_sketches(txt: str) -> dict:
+    d = json.loads(txt)
+    return {"filas": d["filas"], "bytes": d["bytes"], "cols": {
+        c: {k: sketch_from_dict(v) for k, v in entry.items()} for c, entry in d["cols"].items()}}
+
+
+def sketch_freq_table(sk: dict, col: str, n: int = 30) -> pd.DataFrame:
+    """Top-N aproximado con el formato de `analyzers.freq_table` más cotas de error."""
+    entry = sk["cols"].get(col)
+    if entry is None:
+        return pd.DataFrame()
+    top = entry["top"].top(n)
+    # SpaceSaving y Count-Min sobreestiman: el mínimo es la cota más ajustada.
+    cm = entry["cm_conteo"].estimate(top["valor"]) if len(top) else np.array([])
+    top["conteo"] = np.minimum(top["conteo"].to_numpy(), cm).astype("int64")
+    top["error_max"] = np.minimum(top["error_max"].to_numpy(), entry["cm_conteo"].eps * entry["cm_conteo"].total).astype("int64")
+    top["porcentaje"] = 0.0 if sk["filas"] == 0 else (top["conteo"] / sk["filas"] * 100).round(2)
+    top["tam_total"] = entry["cm_bytes"].estimate(top["valor"]) if len(top) else []
+    top = top.sort_values("conteo", ascending=False, kind="mergesort").reset_index(drop=True)
+    return top.rename(columns={"valor": col})[[col, "conteo", "porcentaje", "error_max", "tam_total"]]
+
+
+def sketch_overview(sk: dict) -> dict:
+    met = {"filas": sk["filas"], "tamano_total_bytes": float(sk["bytes"])}
+    for c, entry in sk["cols"].items():
+        met[f"{c.lower()}_unicos_aprox"] = entry["hll"].count()
+        met[f"{c.lower()}_unicos_error_rel"] = round(entry["hll"].relative_error(), 4)
+    if "Extension" in sk["cols"]:
+        met["extensiones_unicas"] = sk["cols"]["Extension"]["hll"].count()
+    return met
+
+
+__all__ = [
+    "KLLSketch",
+    "HyperLogLog",
+    "SpaceSaving",
+    "CountMinSketch",
+    "hash_values",
+    "sketch_from_dict",
+    "build_inventory_sketches",
+    "merge_inventory_sketches",
+    "dumps_inventory_sketches",
+    "loads_inventory_sketches",
+    "sketch_freq_table",
+    "sketch_overview",
+]
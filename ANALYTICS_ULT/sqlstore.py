@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+Backend SQL embebido (SQLite o DuckDB en archivo) para inventarios que no caben en RAM.
+
+`ingest` carga el inventario normalizado por chunks en la tabla `inventario`
+(índices en Hash, CarpetaPadre, Propietario y Extension). Los analizadores de
+`analyzers` reciben indistintamente un DataFrame o un `InventoryDB`; con este
+último la agregación se resuelve en el motor y a Python solo vuelve el
+resultado. Las fechas se guardan como texto ISO y los booleanos como 0/1, así
+el SQL es el mismo en ambos motores.
+
+    info = ingest("inventario.csv", "inventario.sqlite")
+    with InventoryDB("inventario.sqlite") as db:
+        met = overview_metrics(db)          # analyzers.overview_metrics
+"""
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from .io_utils import iter_table_chunks, human_bytes
+from .profiling import NULL_PROFILER
+
+try:
+    import duckdb
+except ImportError:  # opcional
+    duckdb = None
+
+TABLE = "inventario"
+META = "_aa_meta"
+INDEX_COLS = ["Hash", "CarpetaPadre", "Propietario", "Extension"]
+DATE_COLS = ["FechaCreacion", "FechaModificacion", "FechaAcceso"]
+BOOL_COLS = ["Oculto", "SoloLectura"]
+DB_EXTS = {".sqlite", ".sqlite3", ".db", ".duckdb", ".ddb"}
+DATE_FMT = "%Y-%m-%d %H:%M:%S.%f"
+SIZE_BUCKETS = [("0–10 MB", 0, 10 * 1024 ** 2), ("10–100 MB", 10 * 1024 ** 2, 100 * 1024 ** 2),
+                ("100 MB–1 GB", 100 * 1024 ** 2, 1024 ** 3), ("1–10 GB", 1024 ** 3, 10 * 1024 ** 3),
+                ("10+ GB", 10 * 1024 ** 3, None)]
+
+
+def _q(col: str) -> str:
+    return '"' + str(col).replace('"', '""') + '"'
+
+
+def engine_for(path: str, engine=None) -> str:
+    if engine:
+        return engine
+    return "duckdb" if os.path.splitext(path)[1].lower() in {".duckdb", ".ddb"} else "sqlite"
+
+
+def is_db_path(path: str) -> bool:
+    return os.path.splitext(str(path))[1].lower() in DB_EXTS
+
+
+def _connect(path: str, engine: str, read_only=False):
+    if engine == "duckdb":
+        if duckdb is None:
+            raise ImportError("El backend DuckDB requiere 'duckdb' (pip install duckdb); use .sqlite para SQLite.")
+        return duckdb.connect(path, read_only=read_only)
+    if read_only:
+        return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    return sqlite3.connect(path)
+
+
+# ---------------- Elección de backend ----------------
+def available_memory_bytes():
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        try:
+            import psutil
+            return psutil.virtual_memory().available
+        except ImportError:
+            return None
+
+
+def choose_backend(path: str, memory_fraction: float = 0.5) -> str:
+    """'sql' si el archivo ya es una base o si su tamaño en memoria estimado supera
+    `memory_fraction` de la RAM disponible; 'pandas' en otro caso.
+
+    Estimación: ~4x el tamaño del CSV y ~12x el de un xlsx (comprimido).
+    """
+    if is_db_path(path):
+        return "sql"
+    ext = os.path.splitext(path)[1].lower()
+    est = os.path.getsize(path) * (12 if ext in {".xlsx", ".xlsm", ".xlsb"} else 4)
+    avail = available_memory_bytes()
+    return "sql" if avail and est > memory_fraction * avail else "pandas"
+
+
+# ---------------- Ingesta ----------------
+def _to_storage(df: pd.DataFrame) -> dict:
+    """{col: ndarray object} con fechas en texto ISO, booleanos 0/1 y None para nulos
+    (tipos portables entre motores)."""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            v = s.dt.strftime(DATE_FMT)
+        elif c in BOOL_COLS:
+            v = s.map({True: 1, False: 0})
+        else:
+            v = s
+        out[c] = v.to_numpy(dtype=object, na_value=None)
+    return out
+
+
+def _kinds(df: pd.DataFrame) -> dict:
+    k = {}
+    for c in df.columns:
+        if c in DATE_COLS or pd.api.types.is_datetime64_any_dtype(df[c]):
+            k[c] = "fecha"
+        elif c in BOOL_COLS:
+            k[c] = "bool"
+        elif df[c].isna().all():
+            k[c] = "texto"  # sin valores en este chunk: tipo más laxo
+        elif pd.api.types.is_integer_dtype(df[c]):
+            k[c] = "int"  # PermOctal & co.: 777 no debe volver como 777.0
+        elif pd.api.types.is_numeric_dtype(df[c]):
+            k[c] = "num"
+        else:
+            k[c] = "texto"
+    return k
+
+
+_SQL_TYPES = {"fecha": "TEXT", "bool": "INTEGER", "int": "BIGINT", "num": "DOUBLE", "texto": "TEXT"}
+
+
+def ingest(path: str, db_path: str, engine=None, chunksize: int = 250_000, sheet_name=None, sep=None, encoding=None,
+           prof=NULL_PROFILER) -> dict:
+    """Carga `path` normalizado en `db_path` (se reemplaza). Retorna {filas, columnas, engine, db}."""
+    from .pipeline import normalize_inventory
+    engine = engine_for(db_path, engine)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    con = _connect(db_path, engine)
+    kinds, n = {}, 0
+    try:
+        if engine == "sqlite":
+            con.execute("PRAGMA journal_mode=OFF"); con.execute("PRAGMA synchronous=OFF")
+        for chunk in iter_table_chunks(path, chunksize=chunksize, sheet_name=sheet_name, sep=sep, encoding=encoding):
+            with prof.step("ingest.chunk", rows_in=len(chunk)):
+                chunk = normalize_inventory(chunk)
+                new = {c: k for c, k in _kinds(chunk).items() if c not in kinds}
+                if not kinds:
+                    cols = ", ".join(f"{_q(c)} {_SQL_TYPES[k]}" for c, k in new.items())
+                    con.execute(f"CREATE TABLE {TABLE} ({cols})")
+                else:
+                    for c, k in new.items():
+                        con.execute(f"ALTER TABLE {TABLE} ADD COLUMN {_q(c)} {_SQL_TYPES[k]}")
+                kinds.update(new)
+                data = _to_storage(chunk)
+                cols = ", ".join(_q(c) for c in data)
+                if engine == "duckdb":
+                    con.register("_aa_chunk", pd.DataFrame(data))
+                    con.execute(f"INSERT INTO {TABLE} ({cols}) SELECT {cols} FROM _aa_chunk")
+                    con.unregister("_aa_chunk")
+                else:
+                    marks = ", ".join("?" * len(data))
+                    con.executemany(f"INSERT INTO {TABLE} ({cols}) VALUES ({marks})", zip(*data.values()))
+                n += len(chunk)
+        if not kinds:
+            raise ValueError(f"Inventario vacío: {path}")
+        with prof.step("ingest.indices", rows_in=n):
+            for c in INDEX_COLS:
+                if c in kinds:
+                    con.execute(f"CREATE INDEX {_q('ix_' + c)} ON {TABLE} ({_q(c)})")
+        con.execute(f"CREATE TABLE {META} (clave TEXT, valor TEXT)")
+        con.executemany(f"INSERT INTO {META} VALUES (?, ?)",
+                        [("kinds", json.dumps(kinds)), ("filas", str(n)), ("fuente", os.path.abspath(path))])
+        if engine == "sqlite":
+            con.execute("ANALYZE"); con.commit()
+    finally:
+        con.close()
+    return {"filas": n, "columnas": len(kinds), "engine": engine, "db": db_path}
+
+
+# ---------------- Conexión de lectura ----------------
+class InventoryDB:
+    """Inventario ingerido en una base embebida; se pasa a los analizadores en lugar del DataFrame.
+    Una conexión de solo lectura por hilo (`con`): la instancia puede compartirse entre sesiones
+    de la app sin compartir la conexión."""
+
+    def __init__(self, path: str, engine=None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No existe la base: {path}")
+        self.path = path
+        self.engine = engine_for(path, engine)
+        self._local = threading.local()
+        meta = dict(self.con.execute(f"SELECT clave, valor FROM {META}").fetchall())
+        self.kinds = json.loads(meta["kinds"])
+        self.columns = list(self.kinds)
+        self.n = int(meta["filas"])
+        self.source = meta.get("fuente")
+
+    def __len__(self):
+        return self.n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def con(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = _connect(self.path, self.engine, read_only=True)
+        return con
+
+    def close(self):
+        """Cierra la conexión del hilo actual; las de otros hilos se liberan con su `threading.local`."""
+        con = getattr(self._local, "con", None)
+        self._local = threading.local()
+        if con is not None:
+            con.close()
+
+    def has(self, col) -> bool:
+        return col in self.kinds
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        cur = self.con.execute(sql, list(params))
+        if self.engine == "duckdb":
+            return cur.df()
+        cols = [d[0] for d in cur.description]
+        return pd.DataFrame.from_records(cur.fetchall(), columns=cols)
+
+    def scalar(self, sql: str, params=()):
+        return self.con.execute(sql, list(params)).fetchone()[0]
+
+    def restore(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Tipos del pipeline pandas: fechas datetime64, booleanos True/False/NaN."""
+        for c in df.columns:
+            k = self.kinds.get(c)
+            if k == "fecha":
+                df[c] = pd.to_datetime(df[c], errors="coerce", format="ISO8601")
+            elif k == "bool":
+                df[c] = df[c].map({1: True, 0: False}).astype(object).where(df[c].notna(), np.nan)
+            elif k in ("num", "int"):
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+        return df
+
+    def iter_chunks(self, chunksize: int = 250_000, columns=None):
+        """Recorre la tabla en orden de inserción (rangos de rowid) con los tipos restaurados."""
+        cols = ", ".join(_q(c) for c in (columns or self.columns))
+        lo, hi = self.con.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {TABLE}").fetchone()
+        if lo is None:
+            return
+        for start in range(lo, hi + 1, chunksize):
+            yield self.restore(self.query(f"SELECT {cols} FROM {TABLE} WHERE rowid >= ? AND rowid < ? ORDER BY rowid",
+                                          (start, start + chunksize)))
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        parts = list(self.iter_chunks(columns=columns))
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns or self.columns)
+
+    def column(self, col: str) -> pd.Series:
+        return self.restore(self.query(f"SELECT {_q(col)} FROM {TABLE} ORDER BY rowid"))[col]
+
+    def value_counts(self, col: str) -> pd.Series:
+        d = self.query(f"SELECT {_q(col)} AS k, COUNT(*) AS n FROM {TABLE} WHERE {_q(col)} IS NOT NULL GROUP BY {_q(col)}")
+        return pd.Series(d["n"].to_numpy(), index=d["k"].to_numpy(), name="count")
+
+
+# ---------------- Analizadores SQL ----------------
+# Mismo contrato (columnas, orden y redondeo) que las versiones pandas de analyzers.py.
+def _size_expr(db):
+    return "TamanoBytes" if db.has("TamanoBytes") else "NULL"
+
+
+def sql_overview_metrics(db: InventoryDB) -> dict:
+    met = {"filas": len(db), "columnas": len(db.columns)}
+    if db.has("TamanoBytes"):
+        tot, avg, zero = db.con.execute(
+            f"SELECT COALESCE(SUM(TamanoBytes), 0), AVG(TamanoBytes), "
+            f"COALESCE(SUM(CASE WHEN TamanoBytes = 0 THEN 1 ELSE 0 END), 0) FROM {TABLE}").fetchone()
+        met.update({"tamano_total_bytes": float(tot), "tamano_total_humano": human_bytes(tot),
+                    "tamano_promedio": float("nan") if avg is None else float(avg), "archivos_cero_bytes": int(zero)})
+    if db.has("Extension"):
+        met["extensiones_unicas"] = int(db.scalar(f"SELECT COUNT(DISTINCT Extension) FROM {TABLE}"))
+    if db.has("Hash"):
+        met["hash_nulos"] = int(db.scalar(f"SELECT COUNT(*) - COUNT(Hash) FROM {TABLE}"))
+    for col, key in (("Oculto", "porc_ocultos"), ("SoloLectura", "porc_solo_lectura")):
+        if db.has(col):
+            v = db.scalar(f"SELECT AVG(CASE WHEN {col} = 1 THEN 1.0 ELSE 0.0 END) FROM {TABLE}")
+            met[key] = float("nan") if v is None else float(v * 100)
+    return met
+
+
+def sql_top_n_by_size(db: InventoryDB, n: int = 50) -> pd.DataFrame:
+    if not db.has("TamanoBytes"):
+        return pd.DataFrame()
+    cols = ", ".join(_q(c) for c in db.columns)
+    return db.restore(db.query(f"SELECT {cols} FROM {TABLE} ORDER BY TamanoBytes IS NULL, TamanoBytes DESC LIMIT ?", (int(n),)))
+
+
+def sql_top_n_per_group_by_size(db: InventoryDB, by: str, n: int = 20) -> pd.DataFrame:
+    if not db.has("TamanoBytes") or not db.has(by):
+        return pd.DataFrame()
+    cols = ", ".join(_q(c) for c in db.columns)
+    out = db.query(f"SELECT * FROM (SELECT {cols}, ROW_NUMBER() OVER (PARTITION BY {_q(by)} "
+                   f"ORDER BY TamanoBytes IS NULL, TamanoBytes DESC) AS Rango FROM {TABLE}) "
+                   f"WHERE Rango <= ? ORDER BY {_q(by)} IS NULL, {_q(by)}, Rango", (int(n),))
+    out["Rango"] = out["Rango"].astype("int64")
+    out = db.restore(out)
+    return out[[by, "Rango"] + [c for c in out.columns if c not in (by, "Rango")]]
+
+
+def sql_missingness(db: InventoryDB) -> pd.DataFrame:
+    exprs = ", ".join(f"COUNT(*) - COUNT({_q(c)})" for c in db.columns)
+    vals = db.con.execute(f"SELECT {exprs} FROM {TABLE}").fetchone()
+    m = pd.DataFrame({"faltantes": [int(v) for v in vals]}, index=db.columns)
+    m["porcentaje"] = 0.0 if len(db) == 0 else (m["faltantes"] / len(db) * 100).round(2)
+    return m.sort_values("porcentaje", ascending=False)
+
+
+def sql_freq_table(db: InventoryDB, col: str, n: int = 30) -> pd.DataFrame:
+    if not db.has(col):
+        return pd.DataFrame()
+    tab = db.query(f"SELECT {_q(col)} AS {_q(col)}, COUNT(*) AS conteo FROM {TABLE} GROUP BY {_q(col)} "
+                   f"ORDER BY conteo DESC, {_q(col)} LIMIT ?", (int(n),))
+    tab[col] = tab[col].astype("string")
+    tab["conteo"] = tab["conteo"].astype("int64")
+    tab["porcentaje"] = 0.0 if len(db) == 0 else (tab["conteo"] / len(db) * 100).round(2)
+    return tab
+
+
+def _dup_key(db):
+    if db.has("Hash"):
+        return "Hash", "Hash"
+    if db.has("Nombre") and db.has("TamanoBytes"):
+        # mismo texto que Nombre.astype(str) + "|" + TamanoBytes.astype(str) (float -> '123.0')
+        return "__PseudoHash__", (f"Nombre || '|' || CASE WHEN TamanoBytes IS NULL THEN 'nan' "
+                                  f"ELSE CAST(CAST(TamanoBytes AS DOUBLE) AS TEXT) END")
+    return None, None
+
+
+def sql_duplicates_by_hash(db: InventoryDB):
+    name, key = _dup_key(db)
+    if name is None:
+        return pd.DataFrame(), 0.0
+    size = _size_expr(db)
+    dup = db.query(f"SELECT {key} AS {_q(name)}, COUNT(*) AS conteo, COALESCE(SUM({size}), 0) AS tam_total FROM {TABLE} "
+                   f"WHERE {key} IS NOT NULL GROUP BY {key} HAVING COUNT(*) > 1 "
+                   f"ORDER BY conteo DESC, tam_total DESC, {_q(name)}")
+    dup["conteo"] = dup["conteo"].astype("int64"); dup["tam_total"] = dup["tam_total"].astype(float)
+    # total - tamaño de la primera aparición de cada clave (como drop_duplicates en pandas)
+    total = db.scalar(f"SELECT COALESCE(SUM({size}), 0) FROM {TABLE}")
+    uniq = db.scalar(f"SELECT COALESCE(SUM({size}), 0) FROM {TABLE} WHERE rowid IN "
+                     f"(SELECT MIN(rowid) FROM {TABLE} WHERE {key} IS NOT NULL GROUP BY {key})")
+    return dup, max(0.0, float(total) - float(uniq))
+
+
+def sql_timeline_counts(db: InventoryDB, date_col: str, freq: str = "M") -> pd.DataFrame:
+    """Conteo por día en el motor; el paso día -> periodo (`freq` de pandas) se hace sobre pocas filas."""
+    if not db.has(date_col):
+        return pd.DataFrame()
+    d = db.query(f"SELECT substr({_q(date_col)}, 1, 10) AS dia, COUNT(*) AS n FROM {TABLE} "
+                 f"WHERE {_q(date_col)} IS NOT NULL GROUP BY dia")
+    if d.empty:
+        return pd.DataFrame({"periodo": pd.Series(dtype=str), "conteo": pd.Series(dtype="int64")})
+    per = pd.to_datetime(d["dia"], errors="coerce").dt.to_period(freq)
+    gr = d["n"].astype("int64").groupby(per.to_numpy()).sum().sort_index()
+    out = gr.rename_axis("periodo").reset_index(name="conteo")
+    out["periodo"] = out["periodo"].astype(str)
+    return out
+
+
+def sql_time_cube_daily(db: InventoryDB, date_col: str, dim=None) -> pd.DataFrame:
+    """Conteo y bytes por (día, `dim`) para `timecube`; las filas sin fecha quedan con dia NULL."""
+    g = f", {_q(dim)} AS {_q(dim)}" if dim else ""
+    d = db.query(f"SELECT substr({_q(date_col)}, 1, 10) AS dia{g}, COUNT(*) AS conteo, "
+                 f"COALESCE(SUM({_size_expr(db)}), 0) AS tam_total FROM {TABLE} GROUP BY 1{', 2' if dim else ''}")
+    d["conteo"] = d["conteo"].astype("int64"); d["tam_total"] = d["tam_total"].astype(float)
+    return d
+
+
+def sql_agg_by(db: InventoryDB, base_col: str, top: int = 50) -> pd.DataFrame:
+    if not db.has(base_col):
+        return pd.DataFrame()
+    g = db.query(f"SELECT {_q(base_col)} AS Categoria, COUNT(*) AS archivos, COALESCE(SUM({_size_expr(db)}), 0) AS tam_total "
+                 f"FROM {TABLE} GROUP BY {_q(base_col)} ORDER BY tam_total DESC, archivos DESC, Categoria LIMIT ?", (int(top),))
+    g["archivos"] = g["archivos"].astype("int64"); g["tam_total"] = g["tam_total"].astype(float)
+    g["tam_total_humano"] = g["tam_total"].map(human_bytes)
+    return g
+
+
+def sql_agg_by_folder(db: InventoryDB, top: int = 50) -> pd.DataFrame:
+    base_col = "CarpetaPadre" if db.has("CarpetaPadre") else None
+    if not base_col:
+        niveles = sorted([c for c in db.columns if c.startswith("Nivel_")], key=lambda x: int(x.split("_")[1]))
+        base_col = niveles[-1] if niveles else None
+    return sql_agg_by(db, base_col, top=top) if base_col else pd.DataFrame()
+
+
+def sql_size_buckets(db: InventoryDB, col: str = "TamanoBytes") -> pd.DataFrame:
+    labels = [b[0] for b in SIZE_BUCKETS]
+    if not db.has(col):
+        return pd.DataFrame({"rango": labels, "conteo": [0] * len(labels)})
+    case = " ".join(f"WHEN {_q(col)} >= {lo} AND {_q(col)} < {hi} THEN {i}" if hi is not None
+                    else f"WHEN {_q(col)} >= {lo} THEN {i}" for i, (_, lo, hi) in enumerate(SIZE_BUCKETS))
+    d = db.query(f"SELECT b, COUNT(*) AS n FROM (SELECT CASE {case} END AS b FROM {TABLE}) t WHERE b IS NOT NULL GROUP BY b")
+    counts = dict(zip(d["b"].astype(int), d["n"].astype("int64")))
+    return pd.DataFrame({"rango": labels, "conteo": [int(counts.get(i, 0)) for i in range(len(labels))]})
+
+
+__all__ = ["InventoryDB", "ingest", "choose_backend", "is_db_path", "engine_for", "INDEX_COLS",
+           "sql_overview_metrics", "sql_top_n_by_size", "sql_top_n_per_group_by_size", "sql_missingness", "sql_freq_table", "sql_duplicates_by_hash",
+           "sql_timeline_counts", "sql_time_cube_daily", "sql_agg_by", "sql_agg_by_folder", "sql_size_buckets"]
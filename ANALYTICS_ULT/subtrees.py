@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Carpetas duplicadas completas (hash Merkle por carpeta).
+
+Cada archivo aporta h(nombre, contenido) y cada carpeta suma (uint64, módulo
+2^64) las entradas de sus hijos: archivos y subcarpetas, éstas como
+h(nombre, hash de la subcarpeta). La suma no depende del orden, así que el
+hash de toda la jerarquía sale de un recorrido por niveles de profundidad,
+de abajo hacia arriba, con `np.add.at`: O(archivos + carpetas). El nombre de
+la carpeta no entra en su propio hash, por eso "proyecto" y "proyecto - copia"
+coinciden si su contenido es idéntico.
+
+Cada grupo conserva la copia de ruta menor (comparada componente a
+componente) y las demás son recuperables. Lo que está dentro de una copia
+recuperable queda cubierto por el grupo de arriba; lo que está dentro de la
+copia conservada sigue contando: si "P/X" y "P/X2" son iguales y "P" tiene una
+copia "Q", se reportan {P, Q} y además {P/X, P/X2}. La copia conservada de un
+grupo nunca está cubierta (su contraparte dentro de la copia conservada del
+padre tendría una ruta menor). Un archivo sin `Hash` recibe un hash único, de
+modo que su carpeta nunca se declara duplicada.
+
+    grupos, carpetas = duplicate_subtrees(df)
+"""
+import numpy as np
+import pandas as pd
+from .hashing import mix64 as _mix64
+
+
+def _hash_text(values) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def _path_column(df: pd.DataFrame):
+    if "RutaCompleta" in df.columns:
+        return df["RutaCompleta"]
+    if "RutaRelativa" in df.columns:  # la raíz distingue rutas relativas iguales en servidores distintos
+        return (df["Raiz"].astype("string").fillna("") + "/" + df["RutaRelativa"].astype("string")
+                if "Raiz" in df.columns else df["RutaRelativa"])
+    return None
+
+
+def _content_hash(df: pd.DataFrame) -> np.ndarray:
+    size = pd.to_numeric(df["TamanoBytes"], errors="coerce") if "TamanoBytes" in df.columns else pd.Series(np.nan, index=df.index)
+    size_h = _mix64(size.fillna(-1).to_numpy(dtype=np.int64).view(np.uint64))
+    if "Hash" in df.columns:
+        h = df["Hash"].astype("string")
+        miss = h.isna().to_numpy(dtype=bool)
+        out = _hash_text(h.fillna("").to_numpy(dtype=object)) ^ size_h
+        out[miss] = _mix64(np.flatnonzero(miss).astype(np.uint64) + np.uint64(0xA5A5A5A5))  # único: no empareja
+        return out
+    return size_h  # sin Hash: solo tamaño (como PseudoHash de duplicates_by_hash, el nombre ya entra en la hoja)
+
+
+def folder_hashes(df: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por carpeta: Carpeta, Padre (posición), Profundidad, HashMerkle, archivos, bytes (subárbol)."""
+    paths = _path_column(df)
+    if paths is None or len(df) == 0:
+        return pd.DataFrame()
+    p = paths.astype("string").fillna("").str.replace("\\", "/", regex=False).str.strip("/")
+    p = p.str.replace(r"/{2,}", "/", regex=True)
+    parts = p.str.rpartition("/")  # (carpeta, "/", nombre); sin "/" la carpeta es "" (raíz)
+    dirs, names = parts[0].astype("string"), parts[2].astype("string")
+
+    # todas las carpetas: prefijos de las carpetas de archivos, agregando un nivel por vuelta
+    uniq = pd.Index(dirs.unique())
+    all_dirs = [uniq]
+    frontier = uniq[uniq.str.contains("/", regex=False)]
+    while len(frontier):
+        parents = pd.Index(frontier.str.rpartition("/").get_level_values(0)).unique()
+        all_dirs.append(parents)
+        frontier = parents[parents.str.contains("/", regex=False)]
+    folders = pd.Index(np.concatenate([a.to_numpy(dtype=object) for a in all_dirs])).unique()
+    fparts = pd.Series(folders, dtype="string").str.rpartition("/")
+    depth = np.where(folders == "", 0, folders.str.count("/") + 1).astype(np.int64)
+    parent = folders.get_indexer(fparts[0].astype("string"))  # carpetas de primer nivel: "" si hay archivos en la raíz
+    parent[depth == 0] = -1
+    own = _hash_text(fparts[2].fillna("").to_numpy(dtype=object))
+
+    n = len(folders)
+    acc = np.zeros(n, dtype=np.uint64)
+    files = np.zeros(n, dtype=np.int64)
+    size = np.zeros(n, dtype=np.float64)
+    fid = folders.get_indexer(dirs)
+    leaf = _mix64(_hash_text(names.fillna("").to_numpy(dtype=object)) ^ _mix64(_content_hash(df)))
+    np.add.at(acc, fid, leaf)
+    np.add.at(files, fid, 1)
+    b = pd.to_numeric(df["TamanoBytes"], errors="coerce").fillna(0).to_numpy(dtype=float) if "TamanoBytes" in df.columns else 0.0
+    np.add.at(size, fid, b)
+
+    merkle = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for d in range(int(depth.max()), -1, -1):  # hijos completos antes que el padre
+            idx = np.flatnonzero(depth == d)
+            merkle[idx] = _mix64(acc[idx] ^ _mix64(files[idx].astype(np.uint64)))
+            up = idx[parent[idx] >= 0]
+            np.add.at(acc, parent[up], _mix64(own[up] ^ merkle[up]))
+            np.add.at(files, parent[up], files[up])
+            np.add.at(size, parent[up], size[up])
+    return pd.DataFrame({"Carpeta": folders.astype(str), "Padre": parent, "Profundidad": depth,
+                         "HashMerkle": merkle, "archivos": files, "bytes": size})
+
+
+def _path_order(folders: pd.Series) -> np.ndarray:
+    """Rango de cada ruta en orden por componentes ('P/x' < 'P 2/x', como tuplas de partes)."""
+    key = folders.astype(str).str.replace("/", "\x00", regex=False).to_numpy(dtype=object)
+    rank = np.empty(len(key), dtype=np.int64)
+    rank[np.argsort(key, kind="stable")] = np.arange(len(key))
+    return rank
+
+
+def duplicate_subtrees(df: pd.DataFrame, min_files: int = 2, min_bytes: float = 0):
+    """Subárboles duplicados. Retorna (grupos, carpetas).
+
+    grupos: GrupoId, copias (no cubiertas), archivos y bytes por copia, bytes_recuperables, Ejemplo (la conservada).
+    carpetas: GrupoId, Carpeta, Profundidad, archivos, bytes, Conservada, Anidada (dentro de una copia recuperable
+    de otro grupo: cubierta por ese grupo y fuera de `copias`).
+    """
+    fh = folder_hashes(df)
+    if fh.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    cand = (fh["archivos"] >= min_files) & (fh["bytes"] >= min_bytes) & (fh["Profundidad"] > 0)
+    cnt = fh.loc[cand, "HashMerkle"].map(fh.loc[cand, "HashMerkle"].value_counts())
+    dup = np.zeros(len(fh), dtype=bool)
+    dup[cnt.index[cnt.to_numpy() > 1]] = True
+    # conservada: la de ruta menor de cada grupo
+    rank = _path_order(fh["Carpeta"])
+    d = pd.DataFrame({"h": fh["HashMerkle"].to_numpy()[dup], "rank": rank[dup]}, index=np.flatnonzero(dup))
+    kept = np.zeros(len(fh), dtype=bool)
+    kept[d["rank"].groupby(d["h"]).idxmin().to_numpy()] = True
+    # cubierta: algún ancestro es una copia recuperable (de arriba hacia abajo, un nivel por vuelta)
+    par, depth = fh["Padre"].to_numpy(), fh["Profundidad"].to_numpy()
+    removable = dup & ~kept
+    covered = np.zeros(len(fh), dtype=bool)
+    for lvl in range(1, int(depth.max()) + 1):
+        idx = np.flatnonzero((depth == lvl) & (par >= 0))
+        covered[idx] = covered[par[idx]] | removable[par[idx]]
+    t = fh.loc[dup].assign(Conservada=kept[dup], Anidada=covered[dup], _rank=rank[dup])
+    act = t.loc[~t["Anidada"]].groupby("HashMerkle").size()
+    t = t[t["HashMerkle"].isin(act.index[act.to_numpy() > 1])]  # con una sola copia libre: cubierto por el de arriba
+    if t.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    g = t.groupby("HashMerkle").agg(archivos=("archivos", "first"), bytes=("bytes", "first"))
+    g["copias"] = act.loc[g.index]
+    g["bytes_recuperables"] = g["bytes"] * (g["copias"] - 1)
+    g["Ejemplo"] = t.loc[t["Conservada"]].set_index("HashMerkle").loc[g.index, "Carpeta"]
+    g = g.sort_values(["bytes_recuperables", "archivos"], ascending=False, kind="stable").reset_index()
+    g.insert(0, "GrupoId", np.arange(1, len(g) + 1))
+    t = t.merge(g[["HashMerkle", "GrupoId"]], on="HashMerkle")
+    carpetas = t.sort_values(["GrupoId", "Anidada", "_rank"], kind="stable")[
+        ["GrupoId", "Carpeta", "Profundidad", "archivos", "bytes", "Conservada", "Anidada"]].reset_index(drop=True)
+    grupos = g[["GrupoId", "copias", "archivos", "bytes", "bytes_recuperables", "Ejemplo"]]
+    return grupos, carpetas
+
+
+__all__ = ["folder_hashes", "duplicate_subtrees"]
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Generador de inventarios sintéticos con el esquema del proyecto.
+
+Produce chunks independientes (escala 10^4–10^8 filas) con:
+- profundidad de ruta ~ 1 + Poisson(λ) (cola hasta >20 niveles),
+- propietarios, extensiones y carpetas con frecuencias Zipf,
+- duplicados: una fracción `dup_ratio` de filas reutiliza el contenido
+  (Hash + TamanoBytes) de una fila anterior, también entre chunks,
+- mezcla de permisos, ocultos/solo lectura y rangos de fechas con una pequeña
+  fracción de fechas inconsistentes (para las validaciones).
+
+El contenido (hash y tamaño) es función determinista de un id de contenido,
+por lo que los duplicados son coherentes sin guardar estado entre chunks.
+"""
+import os
+import numpy as np
+import pandas as pd
+from .hashing import mix64 as _mix64
+from .schema import INVENTORY_COLUMNS
+
+COLUMNS = INVENTORY_COLUMNS
+
+# extensión → (MIME, mediana log-bytes, sigma)
+EXTENSIONS = {
+    "pdf": ("application/pdf", 12.5, 1.5), "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", 11.5, 1.2),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", 11.8, 1.5), "jpg": ("image/jpeg", 13.5, 1.0),
+    "png": ("image/png", 12.0, 1.5), "txt": ("text/plain", 8.5, 2.0), "csv": ("text/csv", 11.0, 2.5),
+    "msg": ("application/vnd.ms-outlook", 11.0, 1.2), "pptx": ("application/vnd.openxmlformats-officedocument.presentationml.presentation", 14.0, 1.3),
+    "zip": ("application/zip", 15.0, 2.0), "mp4": ("video/mp4", 18.0, 1.5), "py": ("text/x-python", 8.0, 1.2),
+    "dwg": ("application/acad", 14.0, 1.3), "log": ("text/plain", 10.0, 2.5), "mp3": ("audio/mpeg", 15.0, 0.8),
+    "iso": ("application/x-iso9660-image", 21.0, 0.8), "psd": ("image/vnd.adobe.photoshop", 17.0, 1.2),
+    "bak": ("application/octet-stream", 16.0, 2.5), "tmp": ("application/octet-stream", 9.0, 2.5), "exe": ("application/x-msdownload", 15.0, 1.5),
+}
+PERMS = (["644", "600", "664", "640", "755", "666", "777"], [0.45, 0.15, 0.15, 0.1, 0.08, 0.05, 0.02])
+WORDS = ["proyectos", "finanzas", "rrhh", "legal", "ventas", "marketing", "ti", "backup", "archivo", "compartido",
+         "clientes", "2019", "2020", "2021", "2022", "2023", "2024", "informes", "fotos", "planos", "contratos",
+         "old", "tmp", "entregables", "borradores", "auditoria", "nomina", "facturas", "soporte", "datos"]
+NAME_STEMS = ["informe", "acta", "factura", "presentacion", "foto", "plano", "contrato", "respaldo", "datos",
+              "reporte", "nomina", "propuesta", "minuta", "cotizacion", "imagen", "video", "export", "log"]
+NAME_SUFFIX = ["", "_final", "_v2", "_old", "_backup"]
+COPY_SUFFIX = [" (copia)", " - copia", " (copia 3)", "_copy", " (1)"]
+
+
+def _zipf_weights(n, a=1.1):
+    w = 1.0 / np.arange(1, n + 1) ** a
+    return w / w.sum()
+
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _folder_pool(rng, n_folders, n_roots, depth_lambda):
+    # Poisson con cola: ~2 % de carpetas muy profundas (>20 niveles posibles)
+    depth = 1 + rng.poisson(depth_lambda, n_folders) + (rng.random(n_folders) < 0.02) * rng.geometric(0.08, n_folders)
+    depth = np.clip(depth, 1, 40)
+    words = np.asarray(WORDS)
+    folders = []
+    for d in depth:
+        parts = words[rng.integers(0, len(words), d)]
+        parts = [f"{p}{rng.integers(0, 50)}" if rng.random() < 0.4 else p for p in parts]
+        folders.append("/".join(parts))
+    roots = np.asarray([f"\\\\fs{i:02d}\\share" for i in range(n_roots)])
+    return np.asarray(folders, dtype=object), roots[rng.integers(0, n_roots, n_folders)]
+
+
+def iter_inventory_chunks(n_rows: int, chunksize: int = 250_000, seed: int = 0, dup_ratio: float = 0.15,
+                          n_owners: int = 400, n_roots: int = 6, n_folders=None, depth_lambda: float = 4.0,
+                          start="2010-01-01", end=None, bad_date_ratio: float = 0.002):
+    """Genera `n_rows` filas en chunks de `chunksize` con el esquema de `COLUMNS`."""
+    rng = np.random.default_rng(seed)
+    n_folders = n_folders or int(min(max(50, n_rows // 40), 2_000_000))
+    folders, folder_roots = _folder_pool(rng, n_folders, n_roots, depth_lambda)
+    folder_w = _zipf_weights(n_folders, 0.9)
+    owners = np.asarray([f"DOMINIO\\usuario{i:04d}" for i in range(n_owners)], dtype=object)
+    owner_w = _zipf_weights(n_owners, 1.2)
+    exts = np.asarray(list(EXTENSIONS), dtype=object)
+    ext_cdf = np.cumsum(_zipf_weights(len(exts), 1.0))
+    mimes = np.asarray([EXTENSIONS[e][0] for e in exts], dtype=object)
+    mu = np.asarray([EXTENSIONS[e][1] for e in exts])
+    sigma = np.asarray([EXTENSIONS[e][2] for e in exts])
+    t0 = pd.Timestamp(start).value // 10 ** 9
+    t1 = (pd.Timestamp(end) if end else pd.Timestamp.now()).value // 10 ** 9
+    stems = np.asarray(NAME_STEMS, dtype=object)
+    suffix = np.asarray(NAME_SUFFIX, dtype=object)
+    copy_suffix = np.asarray(COPY_SUFFIX, dtype=object)
+
+    done = 0
+    while done < n_rows:
+        m = min(chunksize, n_rows - done)
+        row_id = np.arange(done, done + m, dtype=np.int64)
+        # id de contenido: propio o el de una fila anterior (duplicado)
+        is_dup = (rng.random(m) < dup_ratio) & (row_id > 0)
+        content = row_id.copy()
+        content[is_dup] = (rng.random(is_dup.sum()) * row_id[is_dup]).astype(np.int64)
+        h1 = _mix64(content.astype(np.uint64))
+        h2 = _mix64(h1)
+        # el contenido fija extensión, tamaño y nombre base (coherentes en duplicados)
+        ext_i = np.searchsorted(ext_cdf, _unit(_mix64(h2 ^ np.uint64(7)))).clip(0, len(exts) - 1)
+        u1, u2 = _unit(h1).clip(1e-12, 1), _unit(h2)
+        z = np.sqrt(-2 * np.log(u1)) * np.cos(2 * np.pi * u2)
+        size = np.exp(mu[ext_i] + sigma[ext_i] * z).astype(np.int64)
+        size[_unit(_mix64(h1 ^ np.uint64(3))) < 0.01] = 0
+
+        f_i = rng.choice(n_folders, m, p=folder_w)
+        folder = folders[f_i]
+        stem = stems[(h1 % np.uint64(len(stems))).astype(np.int64)]
+        deco = np.where(rng.random(m) < 0.85, "", suffix[rng.integers(0, len(suffix), m)])
+        # la mitad de los duplicados lleva un nombre de copia ("informe (copia).pdf", "Copy of ...")
+        copy = is_dup & (rng.random(m) < 0.5)
+        deco[copy] = copy_suffix[rng.integers(0, len(copy_suffix), copy.sum())]
+        prefix = np.where(copy & (rng.random(m) < 0.2), "Copy of ", "")
+        name = (prefix + stem + "_" + pd.Series(content).astype(str).to_numpy(dtype=object) + deco + "." + exts[ext_i])
+        rel = folder + "/" + name
+        root = folder_roots[f_i]
+        full = root + "\\" + pd.Series(rel).str.replace("/", "\\", regex=False).to_numpy(dtype=object)
+
+        cre = rng.integers(t0, t1, m)
+        mod = np.minimum(cre + rng.exponential(120 * 86400, m).astype(np.int64), t1)
+        acc = np.minimum(mod + rng.exponential(200 * 86400, m).astype(np.int64), t1)
+        bad = rng.random(m) < bad_date_ratio
+        acc[bad] = cre[bad] - rng.integers(86400, 400 * 86400, bad.sum())
+        fut = rng.random(m) < bad_date_ratio / 4
+        mod[fut] = t1 + rng.integers(86400, 900 * 86400, fut.sum())
+
+        yield pd.DataFrame({
+            "Nombre": name,
+            "Extension": exts[ext_i],
+            "MimeType": mimes[ext_i],
+            "TamanoBytes": size,
+            "RutaCompleta": full,
+            "RutaRelativa": rel,
+            "CarpetaPadre": folder,
+            "Raiz": root,
+            "Propietario": owners[rng.choice(n_owners, m, p=owner_w)],
+            "Hash": pd.Series(h1).map("{:016x}".format).to_numpy(dtype=object),
+            "FechaCreacion": pd.to_datetime(cre, unit="s"),
+            "FechaModificacion": pd.to_datetime(mod, unit="s"),
+            "FechaAcceso": pd.to_datetime(acc, unit="s"),
+            "Oculto": rng.random(m) < 0.03,
+            "SoloLectura": rng.random(m) < 0.08,
+            "PermOctal": rng.choice(PERMS[0], m, p=PERMS[1]),
+        }, index=pd.RangeIndex(done, done + m))
+        done += m
+
+
+def generate_inventory(n_rows: int, **kwargs) -> pd.DataFrame:
+    """Inventario sintético completo en memoria (ver `iter_inventory_chunks`)."""
+    return pd.concat(list(iter_inventory_chunks(n_rows, **kwargs)), axis=0)
+
+
+XLSX_MAX_ROWS = 1_048_575
+
+
+def _write_xlsx(path: str, chunks):
+    """XLSX fila a fila con la API de hoja de xlsxwriter. `constant_memory` descarta cada fila al pasar a la
+    siguiente, por eso no sirve `to_excel` (escribe columna a columna): aquí cada fila se escribe completa."""
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss"})
+    try:
+        ws = wb.add_worksheet("Inventario")
+        r = 0
+        for chunk in chunks:
+            if r == 0:
+                ws.write_row(0, 0, list(chunk.columns))
+            for values in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                r += 1
+                ws.write_row(r, 0, values)
+    finally:
+        wb.close()
+
+
+def write_inventory(path: str, n_rows: int, chunksize: int = 250_000, **kwargs) -> str:
+    """Escribe el inventario en CSV, XLSX o Parquet (según la extensión) chunk a chunk."""
+    ext = os.path.splitext(path)[1].lower()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    chunks = iter_inventory_chunks(n_rows, chunksize=chunksize, **kwargs)
+    if ext in (".csv", ".txt"):
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False, encoding="utf-8")
+    elif ext == ".xlsx":
+        if n_rows > XLSX_MAX_ROWS:
+            raise ValueError(f"XLSX admite como máximo {XLSX_MAX_ROWS:,} filas (pedidas {n_rows:,})")
+        _write_xlsx(path, chunks)
+    elif ext == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet requiere 'pyarrow' (pip install pyarrow)") from e
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = writer or pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        raise ValueError(f"Extensión no soportada: {ext}")
+    return path
+
+
+__all__ = ["COLUMNS", "iter_inventory_chunks", "generate_inventory", "write_inventory"]
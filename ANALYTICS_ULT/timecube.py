@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo temporal: conteo y bytes por fecha a varias granularidades.
+
+Cada columna de fecha se recorre una vez: se lleva a número de día y se agrega
+por (día, dimensión) con `factorize` + `bincount`. Semana, mes y año se derivan
+de esa tabla diaria (miles de filas, no millones), igual que los perfiles de
+edad (0–30 d, 30–365 d, 1–3 a, 3 a+), que se calculan contra la fecha del día
+al consultarlos: el cubo cacheado no envejece. La edad se mide en días de
+calendario.
+
+Con un `sqlstore.InventoryDB` la tabla diaria sale de un GROUP BY en el motor.
+
+    cube = build_time_cube(df)                          # DATE_COLS x (total, Categoria, Propietario)
+    cube.series("FechaModificacion", "W")              # periodo, conteo, tam_total
+    cube.timeline("FechaCreacion", "M")                # periodo, conteo (hojas Timeline*)
+    cube.series("FechaModificacion", "M", dim="Categoria")
+    cube.age_profile("FechaAcceso")                    # banda, conteo, tam_total, porcentaje
+    cube.stale("FechaAcceso", 365)                     # archivos con más de 365 días
+"""
+import numpy as np
+import pandas as pd
+from .filters import NULL_LABEL
+from .sqlstore import InventoryDB, sql_time_cube_daily
+
+DATE_COLS = ["FechaCreacion", "FechaModificacion", "FechaAcceso"]
+DIMENSIONS = ["Categoria", "Propietario"]
+GRANULARITIES = {"D": "Día", "W": "Semana", "M": "Mes", "Y": "Año"}
+AGE_BANDS = [("0–30 d", 0), ("30–365 d", 30), ("1–3 a", 365), ("3 a+", 3 * 365)]  # (etiqueta, desde días)
+NO_DATE = "sin fecha"
+_NAT = np.iinfo(np.int64).min
+
+
+def _day_numbers(s: pd.Series) -> np.ndarray:
+    """Días desde 1970-01-01 (int64); faltantes = `_NAT`."""
+    s = pd.to_datetime(s, errors="coerce")
+    if getattr(s.dt, "tz", None) is not None:
+        s = s.dt.tz_localize(None)
+    return s.to_numpy().astype("datetime64[D]").view(np.int64)
+
+
+def _dim_codes(s: pd.Series):
+    codes, uniq = pd.factorize(s.astype("string"))
+    labels = np.append(np.asarray(uniq, dtype=object), NULL_LABEL)
+    return np.where(codes < 0, len(uniq), codes).astype(np.int64), labels
+
+
+def _aggregate(days, counts, sizes, dim=None, codes=None, labels=None):
+    """(tabla diaria, faltantes) de una columna de fecha, opcionalmente por dimensión."""
+    valid = days != _NAT
+    if codes is None:
+        key, nlab = days[valid], 1
+    else:
+        nlab = len(labels)
+        key = days[valid] * nlab + codes[valid]
+    inv, uniq = pd.factorize(key)
+    uniq = np.asarray(uniq, dtype=np.int64)
+    daily = pd.DataFrame({"dia": np.floor_divide(uniq, nlab),
+                          "conteo": np.bincount(inv, weights=counts[valid], minlength=len(uniq)).astype(np.int64),
+                          "tam_total": np.bincount(inv, weights=sizes[valid], minlength=len(uniq))})
+    miss = ~valid
+    if codes is None:
+        missing = pd.DataFrame({"conteo": [int(counts[miss].sum())], "tam_total": [float(sizes[miss].sum())]})
+    else:
+        daily.insert(1, dim, labels[np.mod(uniq, nlab)])
+        missing = pd.DataFrame({dim: labels,
+                                "conteo": np.bincount(codes[miss], weights=counts[miss], minlength=nlab).astype(np.int64),
+                                "tam_total": np.bincount(codes[miss], weights=sizes[miss], minlength=nlab)})
+        missing = missing[missing["conteo"] > 0].reset_index(drop=True)
+    return daily.sort_values([c for c in ("dia", dim) if c], kind="stable").reset_index(drop=True), missing
+
+
+# ---------------- Cubo ----------------
+class TimeCube:
+    """Tablas diarias por (columna de fecha, dimensión); `dim=None` es el total."""
+
+    def __init__(self, daily: dict, missing: dict, rows: int):
+        self.daily, self.missing, self.rows = daily, missing, rows
+
+    def columns(self):
+        return list(dict.fromkeys(c for c, _ in self.daily))
+
+    def dims(self, col: str):
+        return [d for c, d in self.daily if c == col and d is not None]
+
+    def _table(self, col, dim):
+        if (col, dim) not in self.daily:
+            raise KeyError(f"El cubo no tiene {col}" + (f" por {dim}" if dim else ""))
+        return self.daily[(col, dim)]
+
+    def series(self, col: str, freq: str = "M", dim=None) -> pd.DataFrame:
+        """Conteo y bytes por periodo (`freq` de pandas: D, W, M, Q, Y), en orden cronológico."""
+        d = self._table(col, dim)
+        keys = ["periodo"] + ([dim] if dim else [])
+        if d.empty:
+            return pd.DataFrame({k: pd.Series(dtype=str) for k in keys}).assign(
+                conteo=pd.Series(dtype="int64"), tam_total=pd.Series(dtype=float))
+        per = pd.DatetimeIndex(d["dia"].to_numpy().astype("datetime64[D]").astype("datetime64[s]")).to_period(freq)
+        g = d.assign(periodo=per).groupby(keys, sort=True)[["conteo", "tam_total"]].sum().reset_index()
+        g["periodo"] = g["periodo"].astype(str)
+        return g
+
+    def timeline(self, col: str, freq: str = "M") -> pd.DataFrame:
+        """Mismo contrato que `analyzers.timeline_counts` (periodo, conteo; vacío si falta la columna)."""
+        return self.series(col, freq)[["periodo", "conteo"]] if (col, None) in self.daily else pd.DataFrame()
+
+    def _ages(self, d: pd.DataFrame, now):
+        today = np.datetime64(pd.Timestamp(now if now is not None else pd.Timestamp.now()).date(), "D").astype(np.int64)
+        return today - d["dia"].to_numpy()
+
+    def age_profile(self, col: str, dim=None, now=None) -> pd.DataFrame:
+        """Archivos y bytes por banda de edad (+ 'sin fecha'); `porcentaje` sobre el total (del grupo con `dim`).
+        Las fechas futuras cuentan en la primera banda."""
+        d = self._table(col, dim)
+        labels = [b[0] for b in AGE_BANDS]
+        band = np.searchsorted([b[1] for b in AGE_BANDS[1:]], self._ages(d, now), side="right")
+        t = d.assign(banda=pd.Categorical(np.asarray(labels, dtype=object)[band], categories=labels))
+        keys = ([dim] if dim else []) + ["banda"]
+        g = t.groupby(keys, observed=dim is not None, sort=True)[["conteo", "tam_total"]].sum().reset_index()
+        m = self.missing[(col, dim)].assign(banda=NO_DATE)
+        g = pd.concat([g.astype({"banda": object}), m[m["conteo"] > 0][g.columns]], ignore_index=True)
+        g["banda"] = pd.Categorical(g["banda"], categories=labels + [NO_DATE])
+        g = g.sort_values(keys, kind="stable").reset_index(drop=True)
+        total = g.groupby(dim, sort=False)["conteo"].transform("sum") if dim else pd.Series(g["conteo"].sum(), index=g.index)
+        g["porcentaje"] = (g["conteo"] / total.where(total > 0) * 100).fillna(0.0).round(2)
+        g["conteo"] = g["conteo"].astype("int64")
+        return g
+
+    def stale(self, col: str, days: int = 365, now=None) -> int:
+        """Archivos cuya fecha `col` tiene más de `days` días."""
+        d = self._table(col, None)
+        return int(d["conteo"].to_numpy()[self._ages(d, now) > days].sum())
+
+
+def build_time_cube(df, cols=DATE_COLS, dims=DIMENSIONS) -> TimeCube:
+    """Cubo de las columnas de fecha y dimensiones presentes. `df`: DataFrame o `sqlstore.InventoryDB`."""
+    daily, missing = {}, {}
+    if isinstance(df, InventoryDB):
+        cols = [c for c in cols if df.has(c)]
+        dims = [d for d in dims if df.has(d)]
+        for col in cols:
+            for dim in [None] + dims:
+                t = sql_time_cube_daily(df, col, dim)
+                days = _day_numbers(t["dia"])
+                codes, labels = _dim_codes(t[dim]) if dim else (None, None)
+                daily[(col, dim)], missing[(col, dim)] = _aggregate(
+                    days, t["conteo"].to_numpy(dtype=float), t["tam_total"].to_numpy(dtype=float), dim, codes, labels)
+        return TimeCube(daily, missing, len(df))
+    cols = [c for c in cols if c in df.columns]
+    dims = [d for d in dims if d in df.columns]
+    ones = np.ones(len(df))
+    size = (pd.to_numeric(df["TamanoBytes"], errors="coerce").fillna(0).to_numpy(dtype=float)
+            if "TamanoBytes" in df.columns else np.zeros(len(df)))
+    dim_codes = {d: _dim_codes(df[d]) for d in dims}  # una vez por dimensión, compartido entre fechas
+    for col in cols:
+        days = _day_numbers(df[col])
+        daily[(col, None)], missing[(col, None)] = _aggregate(days, ones, size)
+        for dim, (codes, labels) in dim_codes.items():
+            daily[(col, dim)], missing[(col, dim)] = _aggregate(days, ones, size, dim, codes, labels)
+    return TimeCube(daily, missing, len(df))
+
+
+__all__ = ["DATE_COLS", "DIMENSIONS", "GRANULARITIES", "AGE_BANDS", "NO_DATE", "TimeCube", "build_time_cube"]
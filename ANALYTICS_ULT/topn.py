@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Top-N global y por grupo sin ordenar la tabla completa.
+
+Cada clave se lleva a float64 orientada de menor a mayor (las descendentes se
+niegan; fechas en microsegundos, texto y categóricas por su código ordenado)
+con los faltantes como NaN, que numpy deja al final igual que
+`sort_values(na_position="last")`. El resultado y el orden de los empates (orden
+original de las filas) son los de `sort_values(by, kind="stable").head(n)`.
+
+- `top_n`: `np.partition` sobre la primera clave da el valor del n-ésimo; entran
+  las filas estrictamente mejores y, entre las empatadas con ese valor, decide la
+  clave siguiente (recursivo). Con claves de pocos valores distintos (RiskScore)
+  los empates no arrastran la tabla entera al ordenamiento. O(filas) + O(n log n).
+- `top_n_per_group`: quickselect vectorizado sobre todos los grupos a la vez
+  (O(filas) esperado) da el n-ésimo valor de la primera clave en cada grupo; solo
+  las filas que lo alcanzan (≈ n por grupo más empates) pasan al lexsort
+  (grupo, claves) y al rango dentro de cada tramo. Sin bucle de Python por grupo.
+
+    top_n(df, 50, "TamanoBytes")
+    top_n(scored, 1000, ["RiskScore", "TamanoBytes"])
+    top_n_per_group(df, 20, "TamanoBytes", group="Propietario", rank_col="Rango")
+"""
+import numpy as np
+import pandas as pd
+
+RISK_ORDER = ["RiskScore", "TamanoBytes"]
+
+
+# ---------------- Claves ----------------
+def _key(s: pd.Series, ascending: bool) -> np.ndarray:
+    if isinstance(s.dtype, pd.CategoricalDtype):  # sort_values ordena por el código de la categoría
+        v = s.cat.codes.to_numpy(dtype=np.float64)
+        v[v < 0] = np.nan
+    elif s.dtype.kind == "M":
+        if getattr(s.dt, "tz", None) is not None:
+            s = s.dt.tz_convert(None)
+        v = s.to_numpy(dtype="datetime64[us]").view(np.int64).astype(np.float64)
+        v[s.isna().to_numpy()] = np.nan
+    elif s.dtype.kind in "biuf":
+        v = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        codes = pd.factorize(s.astype("string"), sort=True)[0]
+        v = codes.astype(np.float64)
+        v[codes < 0] = np.nan
+    return v if ascending else -v
+
+
+def _keys(obj, by, ascending) -> list:
+    if isinstance(obj, pd.Series):
+        return [_key(obj, bool(ascending))]
+    by = [by] if isinstance(by, str) else list(by)
+    asc = [ascending] * len(by) if isinstance(ascending, bool) else list(ascending)
+    return [_key(obj[c], a) for c, a in zip(by, asc)]
+
+
+# ---------------- Selección ----------------
+def _select(keys, idx: np.ndarray, n: int) -> np.ndarray:
+    """Las `n` mejores posiciones de `idx` (sin ordenar) según `keys`."""
+    if n <= 0:
+        return idx[:0]
+    if len(idx) <= n:
+        return idx
+    k = keys[0][idx]
+    kth = np.partition(k, n - 1)[n - 1]
+    if np.isnan(kth):  # menos de n valores: entran todos y se completa con faltantes
+        better, tie = ~np.isnan(k), np.isnan(k)
+    else:
+        better, tie = k < kth, k == kth
+    sure, tied = idx[better], idx[tie]
+    rest = n - len(sure)
+    tied = _select(keys[1:], tied, rest) if len(keys) > 1 else tied[:rest]
+    return np.concatenate([sure, tied])
+
+
+def top_positions(keys, n: int) -> np.ndarray:
+    """Posiciones de las `n` primeras filas según `keys` (lista de arrays ya orientados), en orden."""
+    size = len(keys[0]) if keys else 0
+    sel = np.sort(_select(keys, np.arange(size), min(int(n), size)))
+    return sel[np.lexsort([k[sel] for k in reversed(keys)])] if len(sel) else sel
+
+
+def top_n(obj, n: int, by=None, ascending=False):
+    """`obj.sort_values(by, ascending).head(n)` por selección parcial. `obj`: DataFrame o Series
+    (`by` se ignora); `ascending` como en `sort_values` (bool o lista por clave)."""
+    if len(obj) == 0:
+        return obj
+    return obj.iloc[top_positions(_keys(obj, by, ascending), n)]
+
+
+def _group_codes(df: pd.DataFrame, group) -> np.ndarray:
+    cols = [group] if isinstance(group, str) else list(group)
+    return df.groupby(cols, sort=True, dropna=False).ngroup().to_numpy(dtype=np.int64)
+
+
+def _group_kth(v: np.ndarray, codes: np.ndarray, counts: np.ndarray, r: int) -> np.ndarray:
+    """Por grupo, el valor de rango `r` (0 = el menor) de `v` sin NaN; inf si el grupo tiene ≤ r filas.
+    Quickselect vectorizado: en cada vuelta un pivote al azar por grupo y se descarta el lado sin el rango."""
+    n_groups = len(counts)
+    thr = np.full(n_groups, np.inf)
+    rank = np.full(n_groups, r, dtype=np.float64)
+    act = np.flatnonzero(counts[codes] > r)
+    act = act[np.random.default_rng(0).permutation(len(act))]  # el último activo de cada grupo es un pivote al azar
+    piv = np.empty(n_groups)
+    while len(act):
+        g, x = codes[act], v[act]
+        piv[g] = x
+        p = piv[g]
+        lt = np.bincount(g, x < p, n_groups)
+        le = lt + np.bincount(g, x == p, n_groups)
+        live = np.zeros(n_groups, dtype=bool)
+        live[g] = True
+        lo, hi = rank < lt, rank >= le
+        done = live & ~lo & ~hi
+        thr[done] = piv[done]
+        rank = np.where(hi, rank - le, rank)
+        act = act[np.where(lo[g], x < p, hi[g] & (x > p))]
+    return thr
+
+
+def top_n_per_group(df: pd.DataFrame, n: int, by, group, ascending=False, rank_col=None) -> pd.DataFrame:
+    """Las `n` primeras filas de cada grupo (`group`: columna o lista, vacíos como grupo propio).
+    Grupos en orden de sus valores, filas en el orden de `by`; `rank_col` añade el rango 1..n."""
+    if len(df) == 0:
+        return df
+    codes = _group_codes(df, group)
+    keys = _keys(df, by, ascending)
+    # solo se ordenan las filas que alcanzan el n-ésimo valor de la primera clave en su grupo
+    # (si de todos modos queda más de la mitad de la tabla, el filtro no compensa)
+    counts = np.bincount(codes)
+    if n <= 0:
+        sel = np.arange(0)
+    elif 2 * np.minimum(counts, n).sum() > len(codes):
+        sel = np.arange(len(codes))
+    else:
+        k = np.where(np.isnan(keys[0]), np.inf, keys[0])
+        sel = np.flatnonzero(k <= _group_kth(k, codes, counts, n - 1)[codes])
+    order = sel[np.lexsort([*(key[sel] for key in reversed(keys)), codes[sel]])]
+    g = codes[order]
+    i = np.arange(len(g))
+    rank = i - np.maximum.accumulate(np.where(np.r_[True, g[1:] != g[:-1]], i, 0))
+    keep = rank < n
+    out = df.iloc[order[keep]]
+    return out.assign(**{rank_col: rank[keep] + 1}) if rank_col else out
+
+
+__all__ = ["RISK_ORDER", "top_positions", "top_n", "top_n_per_group"]
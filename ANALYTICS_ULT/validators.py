@@ -1,34 +1,302 @@
 # -*- coding: utf-8 -*-
+"""
+Motor de validaciones vectorizado para Anywhere Analytics ULTIMATE.
+
+Cada regla produce una máscara booleana sobre el DataFrame (o sobre un chunk) y
+las violaciones de cada fila se combinan en una máscara de bits (columna
+``Violaciones``): el bit ``i`` corresponde a la regla ``i`` de la lista de reglas.
+Los conteos por regla se obtienen de las máscaras, sin copiar filas.
+
+Una regla es un dict ``{"id", "regla", "fn" | "expr"}``:
+- ``fn(cols)`` recibe un ``_Columns`` (columnas ya convertidas, con caché) y
+  devuelve una máscara booleana o ``None`` si la regla no aplica.
+- ``expr`` es una expresión de ``DataFrame.eval`` (p.ej. ``"TamanoBytes > 1e12"``),
+  útil para reglas definidas por el usuario en JSON.
+"""
+import hashlib
+import json
 import pandas as pd
 import numpy as np
+from .anomalies import outlier_mask
+
+DATE_COLS = ["FechaCreacion", "FechaModificacion", "FechaAcceso"]
+BITMASK_COL = "Violaciones"
+MAX_RULES = 63
+
+
+def _as_datetime(s: pd.Series) -> pd.Series:
+    if not pd.api.types.is_datetime64_any_dtype(s):
+        s = pd.to_datetime(s, errors="coerce")
+    if getattr(s.dt, "tz", None) is not None:
+        s = s.dt.tz_localize(None)
+    return s
+
+
+def _as_numeric(s: pd.Series) -> pd.Series:
+    return s if pd.api.types.is_numeric_dtype(s) else pd.to_numeric(s, errors="coerce")
+
+
+class _Columns:
+    """Acceso a columnas convertidas una sola vez por DataFrame/chunk."""
+
+    def __init__(self, df: pd.DataFrame, now=None, params=None, streaming=False):
+        self.df = df
+        self.now = now if now is not None else pd.Timestamp.now().tz_localize(None)
+        self.params = params or {}
+        self.streaming = streaming
+        self._cache = {}
+
+    def has(self, *cols):
+        return all(c in self.df.columns for c in cols)
+
+    def date(self, col):
+        if ("d", col) not in self._cache:
+            self._cache[("d", col)] = _as_datetime(self.df[col])
+        return self._cache[("d", col)]
+
+    def num(self, col):
+        if ("n", col) not in self._cache:
+            self._cache[("n", col)] = _as_numeric(self.df[col])
+        return self._cache[("n", col)]
+
+
+# ---------------- Reglas por defecto ----------------
+def iqr_fences(s: pd.Series, k: float = 1.5):
+    """Límites (inferior, superior) de Tukey sobre una serie numérica."""
+    s = _as_numeric(s).dropna()
+    if s.empty:
+        return None
+    q1, q3 = s.quantile([0.25, 0.75]).tolist()
+    iqr = q3 - q1
+    return max(0.0, q1 - k * iqr), q3 + k * iqr
+
+
+def _future(col):
+    def fn(c):
+        if not c.has(col): return None
+        return (c.date(col) > c.now).to_numpy()
+    return fn
+
+
+def _before(col, ref):
+    def fn(c):
+        if not c.has(col, ref): return None
+        return (c.date(col) < c.date(ref)).to_numpy()
+    return fn
+
+
+def _negative_size(c):
+    if not c.has("TamanoBytes"): return None
+    return (c.num("TamanoBytes") < 0).to_numpy()
+
+
+def _size_iqr(c):
+    if not c.has("TamanoBytes"): return None
+    fences = c.params.get("iqr_fences")
+    if isinstance(fences, pd.DataFrame):
+        # Límites por grupo (anomalies.size_fences / fences_from_sketches)
+        return outlier_mask(c.df, fences, c.params.get("iqr_by"))
+    if fences is None:
+        # En streaming los límites deben ser globales: sin ellos la regla no aplica.
+        if c.streaming: return None
+        fences = iqr_fences(c.num("TamanoBytes"), k=c.params.get("iqr_k", 1.5))
+        if fences is None: return None
+    lower, upper = fences
+    s = c.num("TamanoBytes")
+    return ((s > upper) | (s < lower)).to_numpy()
+
+
+DEFAULT_RULES = [
+    {"id": "creacion_futuro", "regla": "FechaCreacion en el futuro", "fn": _future("FechaCreacion")},
+    {"id": "modificacion_futuro", "regla": "FechaModificacion en el futuro", "fn": _future("FechaModificacion")},
+    {"id": "acceso_futuro", "regla": "FechaAcceso en el futuro", "fn": _future("FechaAcceso")},
+    {"id": "acceso_antes_creacion", "regla": "Acceso antes de Creación", "fn": _before("FechaAcceso", "FechaCreacion")},
+    {"id": "modificacion_antes_creacion", "regla": "Modificación antes de Creación", "fn": _before("FechaModificacion", "FechaCreacion")},
+    {"id": "tamano_negativo", "regla": "Tamaño negativo", "fn": _negative_size},
+    {"id": "tamano_iqr", "regla": "Tamaño atípico (IQR)", "fn": _size_iqr},
+]
+
+DATE_RULE_IDS = ["creacion_futuro", "modificacion_futuro", "acceso_futuro",
+                 "acceso_antes_creacion", "modificacion_antes_creacion"]
+
+
+def select_rules(ids, rules=None):
+    rules = DEFAULT_RULES if rules is None else rules
+    return [r for r in rules if r["id"] in ids]
+
+
+# ---------------- Motor ----------------
+def _eval_expr(expr, df):
+    """Evalúa una regla `expr`; None si usa columnas ausentes. ValueError si falla o no es booleana."""
+    try:
+        m = df.eval(expr)
+    except pd.errors.UndefinedVariableError:
+        return None  # columna ausente en este inventario
+    except Exception as e:
+        raise ValueError(f"expresión inválida: {type(e).__name__}: {e}") from e
+    if not isinstance(m, pd.Series) or not (pd.api.types.is_bool_dtype(m.dtype) or (
+            m.dtype == object and m.dropna().map(type).isin([bool, np.bool_]).all())):
+        raise ValueError(f"la expresión no es booleana (resultado {getattr(m, 'dtype', type(m).__name__)})")
+    return m
+
+
+def check_rules(rules, df=None, max_rules=None):
+    """
+    Revisa reglas de usuario (p.ej. ``policies["validation_rules"]``) antes de evaluarlas.
+    Descarta las que no son dict con ``id``/``regla``/``expr`` de texto, repiten ``id``,
+    tienen error de sintaxis o no dan un resultado booleano (probado sobre unas filas de `df`),
+    y las que exceden `max_rules` (por defecto lo que queda libre tras DEFAULT_RULES, que `validate`
+    antepone). Retorna (válidas, [(id, motivo)]).
+    """
+    max_rules = MAX_RULES - len(DEFAULT_RULES) if max_rules is None else max_rules
+    if rules is not None and not isinstance(rules, (list, tuple)):
+        return [], [("validation_rules", "debe ser una lista de reglas")]
+    sample = df.head(64) if df is not None else pd.DataFrame()
+    seen = {r["id"] for r in DEFAULT_RULES}
+    ok, bad = [], []
+    for i, r in enumerate(rules or []):
+        rid = r.get("id", f"#{i}") if isinstance(r, dict) else f"#{i}"
+        if not isinstance(r, dict) or not all(isinstance(r.get(k), str) for k in ("id", "regla", "expr")):
+            bad.append((rid, "requiere 'id', 'regla' y 'expr' de texto"))
+            continue
+        if r["id"] in seen:
+            bad.append((rid, "id repetido"))
+            continue
+        try:
+            _eval_expr(r["expr"], sample)
+        except ValueError as e:
+            bad.append((rid, str(e)))
+            continue
+        if len(ok) >= max_rules:
+            bad.append((rid, f"excede el máximo de {max_rules} reglas de usuario"))
+            continue
+        seen.add(r["id"])
+        ok.append({"id": r["id"], "regla": r["regla"], "expr": r["expr"]})
+    return ok, bad
+
+
+def _eval_rule(rule, cols: _Columns):
+    if "expr" in rule:
+        try:
+            m = _eval_expr(rule["expr"], cols.df)
+        except ValueError as e:
+            raise ValueError(f"Regla '{rule['id']}': {e}") from e
+    else:
+        m = rule["fn"](cols)
+    if m is None:
+        return None
+    return pd.Series(m).fillna(False).to_numpy(dtype=bool)
+
+
+def _run(df, rules, now, params, streaming):
+    rules = DEFAULT_RULES if rules is None else rules
+    if len(rules) > MAX_RULES:
+        raise ValueError(f"Máximo {MAX_RULES} reglas por máscara de bits (recibidas {len(rules)})")
+    cols = _Columns(df, now=now, params=params, streaming=streaming)
+    bits = np.zeros(len(df), dtype=np.int64)
+    counts = []
+    for i, rule in enumerate(rules):
+        m = _eval_rule(rule, cols)
+        if m is None:
+            counts.append(None)
+            continue
+        bits |= m.astype(np.int64) << i
+        counts.append(int(m.sum()))
+    return bits, counts
+
+
+def _counts_frame(rules, counts):
+    rules = DEFAULT_RULES if rules is None else rules
+    return pd.DataFrame({
+        "bit": list(range(len(rules))),
+        "id": [r["id"] for r in rules],
+        "Regla": [r["regla"] for r in rules],
+        "aplica": [c is not None for c in counts],
+        "conteo": [0 if c is None else c for c in counts],
+    })
+
+
+def validate(df: pd.DataFrame, rules=None, now=None, **params):
+    """
+    Evalúa todas las reglas sobre `df`.
+    Retorna (mascara_bits: Series int64 llamada 'Violaciones', conteos_por_regla: DataFrame).
+    `params` admite `iqr_fences=(inf, sup)` o una tabla de límites por grupo
+    (con `iqr_by=columna`), e `iqr_k`.
+    """
+    bits, counts = _run(df, rules, now, params, streaming=False)
+    return pd.Series(bits, index=df.index, name=BITMASK_COL), _counts_frame(rules, counts)
+
+
+def decode_bits(bits: pd.Series, rules=None, sep="; ") -> pd.Series:
+    """Traduce la máscara de bits a los nombres de regla, solo para los valores distintos."""
+    rules = DEFAULT_RULES if rules is None else rules
+    uniq = pd.unique(bits[bits != 0])
+    names = {b: sep.join(r["regla"] for i, r in enumerate(rules) if b >> i & 1) for b in uniq}
+    return bits.map(names).fillna("")
+
+
+def bits_key(bits: pd.Series, rules=None) -> str:
+    """Clave de caché de `violations`: contenido de la máscara y reglas (id/regla/expr). Cubre cualquier
+    parámetro que cambie las reglas (k de IQR, agrupación, límites) sin tener que enumerarlos."""
+    rules = DEFAULT_RULES if rules is None else rules
+    h = hashlib.sha1(np.ascontiguousarray(bits.to_numpy(dtype=np.int64)).tobytes())
+    h.update(json.dumps([[r["id"], r["regla"], r.get("expr")] for r in rules], ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def violations(df: pd.DataFrame, bits: pd.Series, rules=None, columns=None) -> pd.DataFrame:
+    """Filas con al menos una violación (una fila por archivo) con columnas 'Violaciones' y 'Reglas'."""
+    sel = bits.to_numpy() != 0
+    if not sel.any():
+        return pd.DataFrame()
+    cols = [c for c in (columns or df.columns) if c in df.columns]
+    out = df.loc[sel, cols].copy()
+    out[BITMASK_COL] = bits[sel]
+    out["Reglas"] = decode_bits(out[BITMASK_COL], rules)
+    return out
+
+
+def validate_chunks(chunks, rules=None, now=None, keep_rows=True, columns=None, **params):
+    """
+    Validación en streaming: evalúa las reglas chunk a chunk acumulando conteos.
+    Las reglas que requieren estadísticas globales (IQR) solo aplican si se
+    pasan sus parámetros (`iqr_fences`, p.ej. desde anomalies.fences_from_sketches).
+    Retorna (conteos_por_regla, filas_con_violaciones | None).
+    """
+    rules = DEFAULT_RULES if rules is None else rules
+    now = now if now is not None else pd.Timestamp.now().tz_localize(None)
+    total = [None] * len(rules)
+    rows = []
+    for chunk in chunks:
+        bits, counts = _run(chunk, rules, now, params, streaming=True)
+        total = [t if c is None else (t or 0) + c for t, c in zip(total, counts)]
+        if keep_rows and bits.any():
+            rows.append(violations(chunk, pd.Series(bits, index=chunk.index, name=BITMASK_COL), rules, columns))
+    out = pd.concat(rows, axis=0, ignore_index=True) if rows else (pd.DataFrame() if keep_rows else None)
+    return _counts_frame(rules, total), out
+
+
+# ---------------- API clásica ----------------
+def _rule_rows(df, ids):
+    rules = select_rules(ids)
+    bits, _ = validate(df, rules)
+    return violations(df, bits, rules)
+
+
 def validate_sizes(df: pd.DataFrame):
     if "TamanoBytes" not in df.columns: return pd.DataFrame()
-    return df[pd.to_numeric(df["TamanoBytes"], errors="coerce") < 0].copy()
+    return df[(_as_numeric(df["TamanoBytes"]) < 0).to_numpy()]
+
+
 def validate_dates(df: pd.DataFrame):
-    out = []
-    cols = [c for c in ["FechaCreacion","FechaModificacion","FechaAcceso"] if c in df.columns]
-    if not cols: return pd.DataFrame()
-    now = pd.Timestamp.now().tz_localize(None)
-    t = df.copy()
-    for c in cols:
-        t[c] = pd.to_datetime(t[c], errors="coerce")
-        try: t[c] = t[c].dt.tz_localize(None)
-        except Exception: pass
-    for c in cols:
-        bad = t[t[c] > now].copy(); 
-        if not bad.empty: bad["Regla"] = f"{c} en el futuro"; out.append(bad)
-    if set(["FechaCreacion","FechaAcceso"]).issubset(t.columns):
-        bad = t[t["FechaAcceso"] < t["FechaCreacion"]].copy()
-        if not bad.empty: bad["Regla"] = "Acceso antes de Creación"; out.append(bad)
-    if set(["FechaCreacion","FechaModificacion"]).issubset(t.columns):
-        bad = t[t["FechaModificacion"] < t["FechaCreacion"]].copy()
-        if not bad.empty: bad["Regla"] = "Modificación antes de Creación"; out.append(bad)
-    return pd.concat(out, axis=0, ignore_index=True) if out else pd.DataFrame()
+    """Filas con fechas inválidas; una fila por archivo, reglas en la columna 'Reglas'."""
+    if not any(c in df.columns for c in DATE_COLS): return pd.DataFrame()
+    return _rule_rows(df, DATE_RULE_IDS)
+
+
 def anomalies_size_iqr(df: pd.DataFrame):
     if "TamanoBytes" not in df.columns: return pd.DataFrame()
-    s = pd.to_numeric(df["TamanoBytes"], errors="coerce").dropna()
-    if s.empty: return pd.DataFrame()
-    q1, q3 = s.quantile(0.25), s.quantile(0.75); iqr = q3 - q1
-    upper = q3 + 1.5*iqr; lower = max(0, q1 - 1.5*iqr)
-    mask = (pd.to_numeric(df["TamanoBytes"], errors="coerce") > upper) | (pd.to_numeric(df["TamanoBytes"], errors="coerce") < lower)
-    return df[mask].copy()
+    fences = iqr_fences(df["TamanoBytes"])
+    if fences is None: return pd.DataFrame()
+    s = _as_numeric(df["TamanoBytes"])
+    return df[((s > fences[1]) | (s < fences[0])).to_numpy()]
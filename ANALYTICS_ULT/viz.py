@@ -1,19 +1,23 @@
 # -*- coding: utf-8 -*-
-import matplotlib.pyplot as plt, numpy as np, pandas as pd
+import numpy as np, pandas as pd
+from .topn import top_n
 
 def bar_chart(df, x, y, title):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(); ax.bar(df[x].astype(str), df[y])
     ax.set_title(title); ax.set_xlabel(x); ax.set_ylabel(y); ax.tick_params(axis='x', labelrotation=75); fig.tight_layout(); return fig
 def line_chart(df, x, y, title):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots(); ax.plot(df[x], df[y], marker="o")
     ax.set_title(title); ax.set_xlabel(x); ax.set_ylabel(y); ax.grid(True, linestyle=":"); fig.tight_layout(); return fig
 def hist_log_sizes(series, bins=50, title="Histograma de tamaños (log10 bytes)"):
-    import numpy as np
+    import matplotlib.pyplot as plt
     s = pd.to_numeric(series, errors="coerce").dropna(); s=s[s>0]
     if s.empty: return None
     fig, ax = plt.subplots(); ax.hist(np.log10(s), bins=bins)
     ax.set_title(title); ax.set_xlabel("log10(Bytes)"); ax.set_ylabel("Frecuencia"); fig.tight_layout(); return fig
 def treemap_sliced(values, labels, title="Treemap"):
+    import matplotlib.pyplot as plt
     vals = np.array(values, dtype=float); 
     if vals.sum()<=0: return None
     labels=list(labels); fig, ax = plt.subplots(); ax.set_title(title)
@@ -29,6 +33,7 @@ def treemap_sliced(values, labels, title="Treemap"):
     ax.set_xlim(0,1); ax.set_ylim(0,1); ax.axis("off"); fig.tight_layout(); return fig
 
 def heatmap_pivot(pivot_df, title="Heatmap"):
+    import matplotlib.pyplot as plt
     fig, ax = plt.subplots()
     im = ax.imshow(pivot_df.values, aspect="auto")
     ax.set_title(title); ax.set_xlabel(pivot_df.columns.name or "Col"); ax.set_ylabel(pivot_df.index.name or "Idx")
@@ -37,10 +42,19 @@ def heatmap_pivot(pivot_df, title="Heatmap"):
     fig.tight_layout(); return fig
 
 
-def smart_time_series(df, x: str, y: str, title: str):
+def smart_time_series(df, x: str, y: str, title: str, hue=None, max_lines=8):
+    """`hue`: una línea por valor de esa columna (los `max_lines` de mayor total)."""
     import matplotlib.pyplot as plt, matplotlib.ticker as mticker
     fig, ax = plt.subplots(figsize=(10,4))
-    ax.plot(df[x], df[y], marker="o")
+    if hue:
+        keep = top_n(df.groupby(hue)[y].sum(), max_lines).index
+        wide = df[df[hue].isin(keep)].pivot_table(index=x, columns=hue, values=y, aggfunc="sum", fill_value=0)
+        for k in keep:
+            ax.plot(wide.index, wide[k], marker=".", label=str(k))
+        ax.legend(fontsize=7, ncol=2)
+        df = wide
+    else:
+        ax.plot(df[x], df[y], marker="o")
     ax.set_title(title); ax.set_xlabel(x); ax.set_ylabel(y)
     ax.grid(True, linestyle=":", linewidth=0.7)
     ax.margins(x=0.02)
@@ -57,8 +71,7 @@ def smart_time_series(df, x: str, y: str, title: str):
 
 def bar_top(df, x: str, y: str, title: str, top=20, horizontal=False):
     import matplotlib.pyplot as plt
-    d = df[[x,y]].copy().dropna()
-    d = d.sort_values(y, ascending=False).head(top)
+    d = top_n(df[[x,y]].dropna(), top, y)
     if horizontal:
         fig, ax = plt.subplots(figsize=(10,5))
         ax.barh(d[x].astype(str), d[y])
@@ -15,25 +15,36 @@ import numpy as np
 from datetime import datetime
 
 # --- Módulos del paquete ULTIMATE ---
-from ANALYTICS_ULT.io_utils import (
-    load_table, coerce_booleans, coerce_datetimes, coerce_numeric
-)
-from ANALYTICS_ULT.path_utils import split_path_to_levels, path_depth_from_levels
+from ANALYTICS_ULT.io_utils import load_table, iter_table_chunks, SUPPORTED_CSV, SUPPORTED_EXCEL, _source_ext
+from ANALYTICS_ULT.csv_io import sniff_csv, describe_sniff, parse_sep
+from ANALYTICS_ULT.path_utils import path_depth_from_levels
+from ANALYTICS_ULT.pipeline import normalize_inventory
 from ANALYTICS_ULT.analyzers import (
-    overview_metrics, top_n_by_size, missingness, freq_table, duplicates_by_hash,
-    timeline_counts, agg_by_folder, agg_by, size_buckets, kpi_advanced
+    overview_metrics, top_n_by_size, top_n_per_group_by_size, missingness, freq_table, duplicates_by_hash,
+    agg_by_folder, agg_by, size_buckets, kpi_advanced
 )
 from ANALYTICS_ULT.mismatch import mime_ext_mismatch
-from ANALYTICS_ULT.validators import validate_sizes, validate_dates, anomalies_size_iqr
+from ANALYTICS_ULT.validators import DEFAULT_RULES, bits_key, check_rules, validate, violations
+from ANALYTICS_ULT.anomalies import anomalies_size_grouped
 from ANALYTICS_ULT.security import octal_to_rwx
 from ANALYTICS_ULT.risk import risk_scoring, DEFAULT_POLICIES
 from ANALYTICS_ULT.simulator import simulate_dedupe
+from ANALYTICS_ULT.neardup import near_duplicates
+from ANALYTICS_ULT.subtrees import duplicate_subtrees
+from ANALYTICS_ULT.delta import delta_key, delta_tables
 from ANALYTICS_ULT.viz import (
     bar_chart, line_chart, hist_log_sizes, treemap_sliced, heatmap_pivot,
     smart_time_series, bar_top
 )
 from ANALYTICS_ULT.categorize import add_category_column
 from ANALYTICS_ULT.exporters import export_excel_with_figs
+from ANALYTICS_ULT.profiling import Profiler
+from ANALYTICS_ULT import shared
+from ANALYTICS_ULT.topn import top_n
+from ANALYTICS_ULT.timecube import build_time_cube, GRANULARITIES
+from ANALYTICS_ULT.filters import FilterIndex, RANGES, spec_key, describe_filters
+from ANALYTICS_ULT.paging import PAGE_SIZES, filter_positions, sort_positions, n_pages, page_slice, csv_spool
+from ANALYTICS_ULT.sqlstore import InventoryDB, ingest, choose_backend, is_db_path
 
 # ------------------------ Configuración UI ------------------------
 st.set_page_config(page_title="Anywhere Analytics ULTIMATE", layout="wide")
@@ -47,53 +58,55 @@ with st.sidebar:
     uploaded = st.file_uploader("Corte actual (Excel/CSV)", type=["xlsx", "xls", "xlsm", "xlsb", "csv", "txt"])
     baseline = st.file_uploader("Corte base (opcional)", type=["xlsx", "xls", "xlsm", "xlsb", "csv", "txt"])
     sheet_name = st.text_input("Hoja (si Excel):", value="")
-    sep = st.text_input("Separador (si CSV):", value=",")
-    encoding = st.text_input("Encoding (si CSV):", value="utf-8")
+    sep = st.text_input("Separador (si CSV):", value="", placeholder="auto")
+    encoding = st.text_input("Encoding (si CSV):", value="", placeholder="auto")
 
     st.markdown("---")
     st.header("🧠 Policies (Risk)")
     policies_json = st.text_area("JSON de policies", value=json.dumps(DEFAULT_POLICIES, indent=2), height=280)
 
     st.markdown("---")
-    st.header("🔖 Bookmarks")
-    if "bookmark" not in st.session_state:
-        st.session_state["bookmark"] = {}
-    bookmark_name = st.text_input("Nombre de bookmark", value="mi_vista")
-    if st.button("Guardar bookmark"):
-        st.session_state["bookmark"][bookmark_name] = {
-            "columns": [],
-            "meta": {"saved_at": datetime.now().isoformat()}
-        }
-    if st.button("Exportar bookmarks JSON"):
-        st.download_button(
-            "Descargar JSON",
-            data=json.dumps(st.session_state["bookmark"], indent=2).encode("utf-8"),
-            file_name="bookmarks.json"
-        )
+    st.header("⏱️ Rendimiento")
+    deep_profile = st.checkbox("Perfilado profundo (cProfile + tracemalloc)", value=False)
 
 # ------------------------ Carga y normalización ------------------------
-def _load_dataframe(file, default_path, sheet_name, sep, encoding):
-    if file is not None:
-        tmp_dir = os.path.join(".", "__tmp__")
-        os.makedirs(tmp_dir, exist_ok=True)
-        in_path = os.path.join(tmp_dir, file.name)
-        with open(in_path, "wb") as f:
-            f.write(file.getbuffer())
-        df = load_table(in_path, sheet_name=sheet_name or None, sep=sep or ",", encoding=encoding or "utf-8")
-    elif default_path and os.path.exists(default_path):
-        df = load_table(default_path, sheet_name=sheet_name or None, sep=sep or ",", encoding=encoding or "utf-8")
-    else:
-        st.stop()
-
-    df = coerce_datetimes(df, ["FechaCreacion", "FechaModificacion", "FechaAcceso"])
-    df = coerce_numeric(df, ["TamanoBytes"])
-    df = coerce_booleans(df, ["Oculto", "SoloLectura"])
-
-    # Niveles de ruta y métricas
-    if not any(c.startswith("Nivel_") for c in df.columns):
-        if "RutaRelativa" in df.columns:
-            levels = split_path_to_levels(df["RutaRelativa"])
-            df = pd.concat([df.reset_index(drop=True), levels.reset_index(drop=True)], axis=1)
+prof = Profiler(deep=deep_profile)
+
+PREP_VERSION = 2  # subir si cambia la preparación: invalida los datasets compartidos publicados
+
+EXCEL_CHUNK_ROWS = 250_000
+CSV_CHUNK_ROWS = 250_000
+CSV_CHUNK_BYTES = 256 << 20  # CSV mayores se normalizan por chunks (pico de memoria acotado)
+
+def _source_size(src):
+    if isinstance(src, (str, os.PathLike)):
+        return os.path.getsize(src)
+    return getattr(src, "size", None) or len(src.getbuffer())
+
+def _concat_normalized(chunks, step, prof=prof):
+    with prof.step(step) as rec:
+        parts = [normalize_inventory(c) for c in chunks]
+        df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        rec["filas_salida"] = len(df)
+        return df
+
+def _read_normalized(src, sheet_name, sep, encoding, prof=prof):
+    """Lee y normaliza sin copias intermedias a disco. `src` es una ruta o el buffer del upload
+    (UploadedFile ya está en memoria). CSV hasta CSV_CHUNK_BYTES: un solo parseo (pyarrow multihilo
+    si está instalado); CSV mayores y Excel: se normaliza por chunks, así nunca conviven el texto o la
+    hoja cruda completa y el frame tipado."""
+    ext = _source_ext(src)
+    if ext in SUPPORTED_EXCEL:
+        return _concat_normalized(iter_table_chunks(src, chunksize=EXCEL_CHUNK_ROWS, sheet_name=sheet_name or None),
+                                  "load_normalize.excel_chunks", prof=prof)
+    if ext in SUPPORTED_CSV and _source_size(src) > CSV_CHUNK_BYTES:
+        return _concat_normalized(iter_table_chunks(src, chunksize=CSV_CHUNK_ROWS, sep=sep or None, encoding=encoding or None),
+                                  "load_normalize.csv_chunks", prof=prof)
+    df = prof.call("load_table", load_table, src, sheet_name=sheet_name or None, sep=sep or None, encoding=encoding or None)
+    return normalize_inventory(df, prof)
+
+def _prepare_frame(file, default_path, sheet_name, sep, encoding, prof=prof):
+    df = _read_normalized(file if file is not None else default_path, sheet_name, sep, encoding, prof=prof)
 
     df["Profundidad"] = path_depth_from_levels(df)
 
@@ -104,29 +117,288 @@ def _load_dataframe(file, default_path, sheet_name, sep, encoding):
         df["Perm_RWX"] = df["PermOctal"].apply(octal_to_rwx)
 
     # Categoría (Imagen, Video, Documento, etc.)
-    df = add_category_column(df)
+    df = prof.call("add_category_column", add_category_column, df)
     return df
 
+@st.cache_resource(show_spinner="Preparando inventario…", max_entries=8)
+def _shared_dataset(key, _file, default_path, sheet_name, sep, encoding, _prof=prof):
+    """Un solo DataFrame por inventario para todas las sesiones (solo lectura). Con pyarrow además
+    se publica como Arrow IPC mapeado en memoria, compartido entre procesos del servidor."""
+    build = lambda: _prepare_frame(_file, default_path, sheet_name, sep, encoding, prof=_prof)
+    if shared.available():
+        df = _prof.call("shared_dataset", shared.get_or_publish, shared.STORE_DIR, key, build)
+    else:
+        df = build()
+    df.attrs["dataset_key"] = key  # identifica el dataset en `_result`
+    return df
+
+@st.cache_resource
+def _prune_shared_store():
+    # solo datasets publicados por la app (shared.prune reconoce sus nombres); ./__tmp__ de versiones
+    # anteriores no se toca: puede contener archivos ajenos y se borra a mano
+    return shared.prune(shared.STORE_DIR)
+
+def _load_dataframe(file, default_path, sheet_name, sep, encoding, prof=prof):
+    src = file if file is not None else default_path
+    if src and (file is not None or os.path.exists(src)) and _source_ext(src) in SUPPORTED_CSV:
+        # dialecto sobre una muestra; el resultado queda fijado en la clave del dataset
+        info = sniff_csv(src, sep=parse_sep(sep), encoding=encoding or None)
+        sep, encoding = info["sep"], info["encoding"]
+        st.sidebar.caption(f"{describe_sniff(info)} · {os.path.basename(getattr(src, 'name', src))}")
+    opts = {"sheet": sheet_name, "sep": sep, "enc": encoding, "v": PREP_VERSION}
+    if file is not None:
+        keys = st.session_state.setdefault("_dataset_keys", {})
+        fid = getattr(file, "file_id", None) or f"{file.name}:{file.size}"
+        if fid not in keys:  # hash del contenido una vez por archivo subido
+            keys[fid] = shared.content_key(file.getbuffer(), **opts)
+        key = keys[fid]
+    elif default_path and os.path.exists(default_path):
+        st_ = os.stat(default_path)
+        key = shared.content_key(f"{os.path.abspath(default_path)}|{st_.st_size}|{st_.st_mtime_ns}".encode("utf-8"), **opts)
+    else:
+        st.stop()
+    _prune_shared_store()
+    return _shared_dataset(key, file, default_path if file is None else "", sheet_name, sep, encoding, _prof=prof)
+
+# ------------------------ Backend SQL (inventarios que no caben en RAM) ------------------------
+@st.cache_resource(show_spinner="Ingestando inventario en SQLite…")
+def _open_inventory_db(path: str, mtime: float, sheet_name: str, sep: str, encoding: str):
+    """Una instancia por inventario y opciones de carga; InventoryDB abre una conexión por hilo (sesión)."""
+    if is_db_path(path):
+        return InventoryDB(path)
+    # la base derivada lleva las opciones en el nombre: otra hoja/separador/encoding no reutiliza la ingesta
+    opts = shared.content_key(b"", sheet=sheet_name, sep=sep, enc=encoding)[:8]
+    db_path = f"{os.path.splitext(path)[0]}.{opts}.sqlite"
+    if not os.path.exists(db_path) or os.path.getmtime(db_path) < mtime:
+        ingest(path, db_path, sheet_name=sheet_name or None, sep=parse_sep(sep), encoding=encoding or None)
+    return InventoryDB(db_path)
+
+if uploaded is None and default_path and os.path.exists(default_path) and choose_backend(default_path) == "sql":
+    db = _open_inventory_db(default_path, os.path.getmtime(default_path), sheet_name, sep, encoding)
+    st.info(f"Backend SQL ({db.engine}): {len(db):,} filas en {db.path}. Las agregaciones se resuelven en la base; "
+            "las vistas fila a fila (riesgo, simulador, validaciones) están disponibles en el CLI.")
+    met = prof.call("overview_metrics", overview_metrics, db)
+    c = st.columns(4)
+    c[0].metric("Archivos", f"{met.get('filas', 0):,}")
+    c[1].metric("Tamaño total", met.get("tamano_total_humano", "—"))
+    c[2].metric("0 bytes", f"{met.get('archivos_cero_bytes', 0):,}")
+    c[3].metric("Extensiones únicas", f"{met.get('extensiones_unicas', '—')}")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown("**Top extensiones**")
+        st.dataframe(prof.call("freq_table", freq_table, db, "Extension", n=30), use_container_width=True, height=300)
+        st.markdown("**Rangos de tamaño**")
+        st.dataframe(prof.call("size_buckets", size_buckets, db), use_container_width=True, height=220)
+    with c2:
+        st.markdown("**Por carpeta (Top 50)**")
+        st.dataframe(prof.call("agg_by_folder", agg_by_folder, db, top=50), use_container_width=True, height=300)
+        dup, espacio = prof.call("duplicates_by_hash", duplicates_by_hash, db)
+        st.markdown(f"**Duplicados** — espacio recuperable: {espacio:,.0f} bytes")
+        st.dataframe(dup.head(1000), use_container_width=True, height=220)
+    db_cube = prof.call("build_time_cube", build_time_cube, db, dims=())
+    for label in db_cube.columns():
+        t = db_cube.series(label, "M")
+        if not t.empty:
+            st.pyplot(smart_time_series(t, "periodo", "conteo", f"Conteo mensual — {label}"), use_container_width=True)
+    st.session_state["last_profile"] = prof.to_frame()
+    st.stop()
+
 df = _load_dataframe(uploaded, default_path, sheet_name, sep, encoding)
 df_base = _load_dataframe(baseline, default_path, sheet_name, sep, encoding) if baseline is not None else None
 
+# ------------------------ Resultados compartidos y tablas paginadas ------------------------
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _full_result(name: str, dataset_key, params: str, _fn, _args=(), _kwargs=None):
+    return _fn(*_args, **(_kwargs or {}))
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _view_result(name: str, dataset_key, params: str, _fn, _args=(), _kwargs=None):
+    return _fn(*_args, **(_kwargs or {}))
+
+def _result(name: str, dataset_key, params: str, _fn, _args=(), _kwargs=None):
+    """Resultado por (dataset, parámetros), común a todas las sesiones y con identidad estable entre
+    reruns: la paginación reutiliza sus posiciones ordenadas sin recalcular. Los resultados de vistas
+    filtradas (clave "<dataset>|<filtro>", ver `_filtered_view`) van a su propio caché acotado: probar
+    combinaciones de filtros no desaloja los del inventario completo, que son los caros."""
+    cache = _view_result if "|" in str(dataset_key) else _full_result
+    return cache(name, dataset_key, params, _fn, _args, _kwargs)
+
+def _dkey(frame):
+    return None if frame is None else frame.attrs.get("dataset_key")
+
+@st.fragment
+def paged_table(data: pd.DataFrame, key: str, columns=None, height=360, file_name=None):
+    """Filtro, orden y paginación en el servidor: al navegador solo viaja la página visible.
+    Es un fragmento: cambiar de página no re-ejecuta el resto de la app."""
+    if data is None or data.empty:
+        st.info("Sin filas.")
+        return
+    cols = [c for c in (columns or list(data.columns)) if c in data.columns]
+    c1, c2, c3, c4, c5 = st.columns([3, 2, 2, 1, 1])
+    text = c1.text_input("Filtrar (contiene)", key=f"{key}_q")
+    fcol = c2.selectbox("En columna", ["(todas)"] + cols, key=f"{key}_fc")
+    by = c3.selectbox("Ordenar por", ["(original)"] + cols, key=f"{key}_by")
+    asc = c4.toggle("Asc", value=False, key=f"{key}_asc")
+    size = c5.selectbox("Filas", PAGE_SIZES, index=1, key=f"{key}_ps")
+    sig = (id(data), len(data), text, fcol, by, asc)
+    state = st.session_state.get(f"{key}_pos")
+    if state is None or state[0] != sig:
+        pos = filter_positions(data, text, columns=[fcol] if fcol != "(todas)" else cols)
+        pos = sort_positions(data, pos, None if by == "(original)" else by, asc)
+        st.session_state[f"{key}_pos"] = state = (sig, pos)
+    pos = state[1]
+    pages = n_pages(len(pos), size)
+    if st.session_state.get(f"{key}_pg", 1) > pages:
+        st.session_state[f"{key}_pg"] = pages
+    page = st.number_input(f"Página (de {pages:,}) — {len(pos):,} filas", min_value=1, max_value=pages, value=1, key=f"{key}_pg")
+    st.dataframe(page_slice(data, pos, page, size, cols), use_container_width=True, height=height)
+    st.download_button("Descargar resultado completo (CSV)", data=lambda: csv_spool(data, pos, cols),
+                       file_name=file_name or f"{key}.csv", mime="text/csv", key=f"{key}_dl")
+
+# ------------------------ Filtros globales + bookmarks ------------------------
+MB = 1024 ** 2
+
+try:
+    policies = json.loads(policies_json)
+except Exception as e:
+    st.sidebar.error(f"Policies JSON inválido: {e}")
+    policies = DEFAULT_POLICIES
+policies_key = json.dumps(policies, sort_keys=True)
+# riesgo sobre el inventario completo (duplicados de todo el corte); RiskBand entra al índice de filtros
+scored_all = prof.call("risk_scoring", _result, "risk", _dkey(df), policies_key, risk_scoring, (df, policies))
+fidx = prof.call("filter_index", _result, "filter_index", _dkey(df), policies_key, FilterIndex, (df,),
+                 {"extra": {"RiskBand": scored_all["RiskBand"]}})
+
+def _clear_filters():
+    for k in [k for k in st.session_state if str(k).startswith("flt_")]:
+        del st.session_state[k]
+
+def _apply_bookmark(name, idx):
+    """Carga la definición guardada en los widgets de filtro (callback: corre antes de dibujarlos)."""
+    _clear_filters()
+    for c, cond in st.session_state["bookmark"].get(name, {}).get("filters", {}).items():
+        if c == "TamanoBytes":
+            lo, hi = (list(cond) + [None, None])[:2]
+            st.session_state["flt_TamanoBytes_min"] = float(lo or 0) / MB
+            st.session_state["flt_TamanoBytes_max"] = float(hi or 0) / MB
+        elif c in RANGES:
+            bounds = idx.bounds(c)
+            if bounds[0] is not None:
+                st.session_state[f"flt_{c}"] = tuple(pd.Timestamp(x if x else b).date() for x, b in zip(cond, bounds))
+        else:
+            st.session_state[f"flt_{c}"] = list(cond)
+
+def filter_widgets(idx) -> dict:
+    """Widgets de la barra lateral -> definición de filtro (solo lo que restringe algo)."""
+    spec = {}
+    for c in idx.categorical:
+        opts = idx.options(c)
+        key = f"flt_{c}"
+        if key in st.session_state:  # valores que no existen en este dataset
+            st.session_state[key] = [v for v in st.session_state[key] if v in opts]
+        sel = st.multiselect(c, list(opts), key=key, format_func=lambda v, o=opts: f"{v} ({o[v]:,})")
+        if sel:
+            spec[c] = sel
+    if "TamanoBytes" in idx.ranges:
+        m1, m2 = st.columns(2)
+        lo = m1.number_input("Tamaño mín (MB)", min_value=0.0, step=1.0, key="flt_TamanoBytes_min")
+        hi = m2.number_input("Tamaño máx (MB)", min_value=0.0, step=1.0, key="flt_TamanoBytes_max", help="0 = sin límite")
+        if lo or hi:
+            spec["TamanoBytes"] = [lo * MB if lo else None, hi * MB if hi else None]
+    for c in idx.ranges:
+        lo, hi = idx.bounds(c)
+        if c == "TamanoBytes" or lo is None:
+            continue
+        key = f"flt_{c}"
+        st.session_state.setdefault(key, (lo.date(), hi.date()))
+        val = st.date_input(c, key=key)
+        if isinstance(val, (tuple, list)) and len(val) == 2 and (val[0] > lo.date() or val[1] < hi.date()):
+            spec[c] = [val[0].isoformat(), val[1].isoformat()]
+    return spec
+
+@st.cache_resource(max_entries=4, show_spinner="Aplicando filtros…")
+def _filtered_view(dataset_key, params: str, _frame, _idx, _spec, _prof=prof):
+    """Vista filtrada compartida por (dataset, filtro); su `dataset_key` propia separa los resultados en `_result`."""
+    pos = _prof.call("filter_select", _idx.select, _spec)
+    if pos is None:
+        return _frame
+    view = _frame.take(pos)
+    view.attrs["dataset_key"] = f"{dataset_key}|{params}"
+    return view
+
+with st.sidebar:
+    st.markdown("---")
+    st.header("🔎 Filtros (todas las pestañas)")
+    spec = filter_widgets(fidx)
+    st.button("Limpiar filtros", on_click=_clear_filters)
+
+    st.markdown("---")
+    st.header("🔖 Bookmarks")
+    if "bookmark" not in st.session_state:
+        st.session_state["bookmark"] = {}
+    imported = st.file_uploader("Importar bookmarks JSON", type=["json"])
+    done = st.session_state.setdefault("_bookmark_imports", {})
+    if imported is not None:
+        fid = getattr(imported, "file_id", None) or f"{imported.name}:{imported.size}"
+        if fid not in done:  # una vez por archivo subido: los reruns no pisan bookmarks editados después
+            try:
+                loaded = json.loads(imported.getvalue().decode("utf-8"))
+                if not isinstance(loaded, dict):
+                    raise ValueError("se esperaba un objeto {nombre: bookmark}")
+                st.session_state["bookmark"].update(loaded)
+                done[fid] = None
+            except Exception as e:
+                done[fid] = f"JSON de bookmarks inválido: {e}"
+        if done[fid]:
+            st.error(done[fid])
+    bookmark_name = st.text_input("Nombre de bookmark", value="mi_vista")
+    if st.button("Guardar bookmark"):
+        st.session_state["bookmark"][bookmark_name] = {
+            "filters": spec,
+            "meta": {"saved_at": datetime.now().isoformat(), "dataset": _dkey(df)}
+        }
+    if st.session_state["bookmark"]:
+        chosen = st.selectbox("Bookmark guardado", list(st.session_state["bookmark"]))
+        st.caption(describe_filters(st.session_state["bookmark"][chosen].get("filters", {})) or "Sin filtros.")
+        st.button("Aplicar bookmark", on_click=_apply_bookmark, args=(chosen, fidx))
+        st.download_button(
+            "Exportar bookmarks JSON",
+            data=json.dumps(st.session_state["bookmark"], indent=2, ensure_ascii=False).encode("utf-8"),
+            file_name="bookmarks.json"
+        )
+
+df_all, df_base_all = df, df_base
+view_key = spec_key(spec) + (f"|{policies_key}" if "RiskBand" in spec else "")
+df = _filtered_view(_dkey(df_all), view_key, df_all, fidx, spec)
+if df is not df_all:
+    st.info(f"Filtros activos: {describe_filters(spec)} — {len(df):,} de {len(df_all):,} archivos.")
+    scored = prof.call("risk_filter", _result, "risk_view", _dkey(df), policies_key,
+                       lambda: scored_all[scored_all.index.isin(df.index)])
+    if df_base_all is not None:  # el delta compara contra el corte base con el mismo filtro
+        bidx = prof.call("filter_index.base", _result, "filter_index", _dkey(df_base_all), "", FilterIndex, (df_base_all,))
+        df_base = _filtered_view(_dkey(df_base_all), spec_key(spec), df_base_all, bidx, spec)
+else:
+    scored = scored_all
+# cubo temporal de la vista (cacheado por dataset y filtro): Temporal, KPIs+ y exportación leen de él
+cube = prof.call("build_time_cube", _result, "time_cube", _dkey(df), "", build_time_cube, (df,))
+
 # ------------------------ Tabs ------------------------
-tab_dash, tab_kpis, tab_risk, tab_dup, tab_folders, tab_heatmap, tab_time, tab_quality, tab_mismatch, tab_delta, tab_validate, tab_export = st.tabs([
+tab_dash, tab_kpis, tab_risk, tab_dup, tab_folders, tab_heatmap, tab_time, tab_quality, tab_mismatch, tab_delta, tab_validate, tab_export, tab_perf = st.tabs([
     "Dashboard", "KPIs+", "Riesgos", "Duplicados/Simulador", "Carpetas", "Heatmap", "Temporal",
-    "Calidad", "MIME vs Ext", "Delta", "Validaciones", "Exportar"
+    "Calidad", "MIME vs Ext", "Delta", "Validaciones", "Exportar", "Rendimiento"
 ])
 
 # ------------------------ Dashboard ------------------------
 with tab_dash:
     st.subheader("KPIs")
-    met = overview_metrics(df)
+    met = prof.call("overview_metrics", overview_metrics, df)
     c = st.columns(4)
     c[0].metric("Archivos", f"{met.get('filas', len(df)):,}")
     c[1].metric("Tamaño total", met.get("tamano_total_humano", "—"))
     c[2].metric("0 bytes", f"{met.get('archivos_cero_bytes', 0):,}")
     c[3].metric("Extensiones únicas", f"{met.get('extensiones_unicas', '—')}")
     st.markdown("**Top por tamaño**")
-    st.dataframe(top_n_by_size(df, n=50), use_container_width=True, height=360)
+    st.dataframe(prof.call("top_n_by_size", top_n_by_size, df, n=50), use_container_width=True, height=360)
     if "TamanoBytes" in df.columns:
         fig = hist_log_sizes(df["TamanoBytes"])
         if fig is not None:
@@ -155,7 +427,7 @@ with tab_kpis:
             st.dataframe(cat_size, use_container_width=True, height=260)
 
     # Buckets de tamaño (SIEMPRE columnas ['rango','conteo'])
-    sb = size_buckets(df)
+    sb = prof.call("size_buckets", size_buckets, df)
     st.markdown("**Distribución por rangos de tamaño**")
     st.dataframe(sb, use_container_width=True, height=200)
     try:
@@ -165,38 +437,77 @@ with tab_kpis:
 
     # KPIs avanzados
     st.markdown("**KPIs Avanzados**")
-    st.dataframe(kpi_advanced(df), use_container_width=True, height=240)
+    st.dataframe(prof.call("kpi_advanced", kpi_advanced, df, cube=cube), use_container_width=True, height=240)
 
 # ------------------------ Riesgos ------------------------
 with tab_risk:
     st.subheader("Priorización + explicación")
-    try:
-        policies = json.loads(policies_json)
-    except Exception as e:
-        st.error(f"Policies JSON inválido: {e}")
-        policies = DEFAULT_POLICIES
-    scored = risk_scoring(df, policies)
     cols_show = [c for c in ["Nombre", "TamanoBytes", "Perm_RWX", "LongRuta", "Profundidad", "RiskScore", "RiskBand", "RiskWhy"] if c in scored.columns]
-    st.dataframe(scored[cols_show].head(1000), use_container_width=True, height=420)
+    paged_table(scored, "pg_risk", columns=cols_show, height=420, file_name="riesgos.csv")
 
 # ------------------------ Duplicados / Simulador ------------------------
 with tab_dup:
     st.subheader("Duplicados por Hash/PseudoHash + Simulador")
-    dup, espacio = duplicates_by_hash(df)
+    dup, espacio = prof.call("duplicates_by_hash", _result, "dups", _dkey(df), "", duplicates_by_hash, (df,))
     st.write(f"**Espacio potencial recuperable (estimado):** {espacio:,.0f} bytes")
-    st.dataframe(dup, use_container_width=True, height=300)
+    paged_table(dup, "pg_dups", height=300, file_name="duplicados.csv")
+
+    st.markdown("---")
+    st.markdown("### Casi duplicados (nombre similar, mismo tipo y tamaño parecido)")
+    n1, n2, n3 = st.columns(3)
+    near_thr = n1.slider("Similitud mínima", 0.5, 1.0, 0.7, 0.05)
+    near_tol = n2.slider("Tolerancia de tamaño", 0.0, 0.5, 0.1, 0.05, help="0 = sin bloqueo por tamaño")
+    near_xext = n3.checkbox("Comparar entre extensiones", value=False)
+    near_kw = {"threshold": near_thr, "size_tol": near_tol or None, "block_ext": not near_xext}
+    near_key = json.dumps(near_kw, sort_keys=True)
+    near = lambda: prof.call("near_duplicates", _result, "near", _dkey(df), near_key, near_duplicates, (df,), near_kw)
+    if st.button("Buscar casi duplicados"):
+        st.session_state["near_params"] = near_key
+    if st.session_state.get("near_params") == near_key:
+        near_members, near_clusters = near()
+        if near_clusters.empty:
+            st.info("Sin casi duplicados con estos parámetros.")
+        else:
+            st.write(f"**{len(near_clusters):,} clusters, {len(near_members):,} archivos; recuperable (verificados, sin el representante):** "
+                     f"{near_clusters['bytes_recuperables'].sum():,.0f} bytes")
+            paged_table(near_clusters, "pg_near_cl", height=260, file_name="casi_duplicados_clusters.csv")
+            cols_near = [c for c in ["ClusterId", "Nombre", "RutaCompleta", "TamanoBytes", "Extension", "Similitud",
+                                     "EsRepresentante", "Verificado"] if c in near_members.columns]
+            paged_table(near_members, "pg_near", columns=cols_near, height=300, file_name="casi_duplicados.csv")
+
+    st.markdown("---")
+    st.markdown("### Carpetas completas duplicadas (hash Merkle)")
+    t1, t2 = st.columns(2)
+    sub_kw = {"min_files": int(t1.number_input("Mínimo de archivos por carpeta", 1, 10_000, 2)),
+              "min_bytes": float(t2.number_input("Mínimo de bytes por carpeta", 0, None, 0))}
+    sub_key = json.dumps(sub_kw, sort_keys=True)
+    if st.button("Buscar carpetas duplicadas"):
+        st.session_state["sub_params"] = sub_key
+    if st.session_state.get("sub_params") == sub_key:
+        grupos_sub, carpetas_sub = prof.call("duplicate_subtrees", _result, "subtrees", _dkey(df), sub_key,
+                                             duplicate_subtrees, (df,), sub_kw)
+        if grupos_sub.empty:
+            st.info("Sin carpetas duplicadas completas (se requiere RutaCompleta o RutaRelativa).")
+        else:
+            st.write(f"**{len(grupos_sub):,} grupos, {len(carpetas_sub):,} carpetas; recuperable (una copia conservada):** "
+                     f"{grupos_sub['bytes_recuperables'].sum():,.0f} bytes")
+            paged_table(grupos_sub, "pg_sub_gr", height=260, file_name="carpetas_duplicadas_grupos.csv")
+            paged_table(carpetas_sub, "pg_sub", height=300, file_name="carpetas_duplicadas.csv")
 
     st.markdown("---")
     st.markdown("### Simulador de deduplicación")
     by_opts = [c for c in ["CarpetaPadre", "Propietario", "Extension", "Raiz"] if c in df.columns]
     by = st.selectbox("Agrupar por", options=by_opts or ["CarpetaPadre"])
     strat = st.selectbox("Estrategia", options=["keep-largest", "keep-earliest", "keep-latest"])
+    use_near = st.checkbox("Incluir casi duplicados (parámetros de arriba)", value=False)
+    sim_key = json.dumps([by, strat, near_kw if use_near else None], sort_keys=True)
     if st.button("Simular"):
-        plan, ahorro = simulate_dedupe(df, by=by, strategy=strat)
+        st.session_state["sim_params"] = sim_key
+    if st.session_state.get("sim_params") == sim_key:
+        plan, ahorro = prof.call("simulate_dedupe", _result, "sim", _dkey(df), sim_key, simulate_dedupe,
+                                 (df,), {"by": by, "strategy": strat, "near": near()[0] if use_near else None})
         st.metric("Ahorro estimado", f"{ahorro:,.0f} bytes")
-        st.dataframe(plan.head(1000), use_container_width=True, height=360)
-        if not plan.empty:
-            st.download_button("Descargar plan CSV", data=plan.to_csv(index=False).encode("utf-8"), file_name="plan_deduplicacion.csv")
+        paged_table(plan, "pg_plan", height=360, file_name="plan_deduplicacion.csv")
 
 # ------------------------ Carpetas / Raíz / Extensión ------------------------
 with tab_folders:
@@ -204,7 +515,7 @@ with tab_folders:
     c1, c2 = st.columns(2)
     with c1:
         st.markdown("**Por carpeta (Top 50)**")
-        st.dataframe(agg_by_folder(df, top=50), use_container_width=True, height=360)
+        st.dataframe(prof.call("agg_by_folder", agg_by_folder, df, top=50), use_container_width=True, height=360)
     with c2:
         if "Raiz" in df.columns:
             st.markdown("**Por raíz**")
@@ -214,11 +525,21 @@ with tab_folders:
             st.dataframe(agg_by(df, "Extension", top=30), use_container_width=True, height=360)
 
     if "CarpetaPadre" in df.columns:
-        tt = df.groupby("CarpetaPadre")["TamanoBytes"].sum().sort_values(ascending=False).head(25)
+        tt = top_n(df.groupby("CarpetaPadre")["TamanoBytes"].sum(), 25)
         fig = treemap_sliced(tt.values, tt.index, title="Treemap - Top carpetas por tamaño")
         if fig is not None:
             st.pyplot(fig, use_container_width=True)
 
+    group_cols = [c for c in ["Propietario", "CarpetaPadre", "Raiz", "Extension", "Categoria"] if c in df.columns]
+    if group_cols and "TamanoBytes" in df.columns:
+        st.markdown("**Archivos más grandes por grupo**")
+        g1, g2 = st.columns([2, 1])
+        top_by = g1.selectbox("Agrupar por", group_cols, key="topg_by")
+        top_k = int(g2.number_input("Archivos por grupo", min_value=1, max_value=1000, value=20, step=5, key="topg_k"))
+        topg = prof.call("top_n_per_group_by_size", _result, "top_group", _dkey(df), f"{top_by}|{top_k}",
+                         top_n_per_group_by_size, (df,), {"by": top_by, "n": top_k})
+        paged_table(topg, "pg_topg", height=360, file_name=f"top_{top_k}_por_{top_by}.csv")
+
 # ------------------------ Heatmap ------------------------
 with tab_heatmap:
     st.subheader("Heatmap de tamaños por Propietario vs Extensión")
@@ -231,7 +552,7 @@ with tab_heatmap:
             aggfunc=lambda x: pd.to_numeric(x, errors="coerce").sum()
         ).fillna(0)
         # Reducir dimensiones para legibilidad
-        pv = pv.sort_values(by=list(pv.columns), ascending=False).head(30)
+        pv = top_n(pv, 30, list(pv.columns))
         if pv.shape[0] > 0 and pv.shape[1] > 0:
             fig = heatmap_pivot(pv, title="Tamaño total (bytes)")
             st.pyplot(fig, use_container_width=True)
@@ -242,23 +563,43 @@ with tab_heatmap:
 # ------------------------ Temporal ------------------------
 with tab_time:
     st.subheader("Series temporales")
-    for label in ["FechaCreacion", "FechaModificacion", "FechaAcceso"]:
-        if label in df.columns:
-            t = timeline_counts(df, label, "M")
-            if not t.empty:
-                st.markdown(f"**{label} (mensual)**")
-                st.dataframe(t, use_container_width=True, height=240)
-                st.pyplot(smart_time_series(t, "periodo", "conteo", f"Conteo mensual — {label}"), use_container_width=True)
+    date_cols = cube.columns()
+    if not date_cols:
+        st.info("El inventario no tiene columnas de fecha.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        freq = c1.selectbox("Granularidad", list(GRANULARITIES), index=2, format_func=GRANULARITIES.get, key="tc_freq")
+        dim = c2.selectbox("Desglose", ["(ninguno)"] + cube.dims(date_cols[0]), key="tc_dim")
+        dim = None if dim == "(ninguno)" else dim
+        metric = c3.selectbox("Métrica", ["conteo", "tam_total"], format_func={"conteo": "Archivos", "tam_total": "Bytes"}.get,
+                              key="tc_metric")
+        for label in date_cols:
+            t = prof.call(f"time_cube.series.{label}", cube.series, label, freq, dim)
+            if t.empty:
+                continue
+            st.markdown(f"**{label} ({GRANULARITIES[freq].lower()})**")
+            paged_table(t, f"pg_tc_{label}", height=240, file_name=f"serie_{label}_{freq}.csv")
+            st.pyplot(smart_time_series(t, "periodo", metric, f"{GRANULARITIES[freq]} — {label}", hue=dim),
+                      use_container_width=True)
+
+        st.markdown("**Perfil de antigüedad**")
+        for c, label in zip(st.columns(len(date_cols)), date_cols):
+            c.markdown(f"*{label}*")
+            c.dataframe(cube.age_profile(label), use_container_width=True, hide_index=True)
+        if dim:
+            age_col = st.selectbox("Fecha para el perfil por grupo", date_cols, index=len(date_cols) - 1, key="tc_age_col")
+            paged_table(cube.age_profile(age_col, dim=dim), "pg_tc_age", height=300, file_name=f"antiguedad_{dim}.csv")
 
 # ------------------------ Calidad ------------------------
 with tab_quality:
     st.subheader("Calidad de datos")
-    st.dataframe(missingness(df), use_container_width=True, height=360)
+    st.dataframe(prof.call("missingness", missingness, df), use_container_width=True, height=360)
 
 # ------------------------ MIME vs Ext ------------------------
 with tab_mismatch:
     st.subheader("MIME vs Extensión")
-    st.dataframe(mime_ext_mismatch(df), use_container_width=True, height=420)
+    mm = prof.call("mime_ext_mismatch", _result, "mismatch", _dkey(df), "", mime_ext_mismatch, (df,))
+    paged_table(mm, "pg_mismatch", height=420, file_name="mime_vs_ext.csv")
 
 # ------------------------ Delta ------------------------
 with tab_delta:
@@ -266,53 +607,59 @@ with tab_delta:
     if df_base is None:
         st.info("Cargue un corte base en la barra lateral para activar el delta.")
     else:
-        key = "Hash" if "Hash" in df.columns else ("RutaCompleta" if "RutaCompleta" in df.columns else None)
-        if key is None or key not in df_base.columns:
+        if "RiskBand" in spec:
+            st.caption("El filtro RiskBand no se aplica al corte base (no tiene puntaje de riesgo).")
+        key = delta_key(df, df_base)
+        if key is None:
             st.warning("No hay columna clave común (Hash o RutaCompleta) para delta.")
         else:
-            cur = df.drop_duplicates(subset=[key]).set_index(key)
-            base = df_base.drop_duplicates(subset=[key]).set_index(key)
-            add_keys = cur.index.difference(base.index)
-            rem_keys = base.index.difference(cur.index)
-            common = cur.index.intersection(base.index)
-
-            add = cur.loc[add_keys].reset_index()
-            rem = base.loc[rem_keys].reset_index()
-            chg = pd.DataFrame({
-                "key": common,
-                "TamanoBytes_cur": pd.to_numeric(cur.loc[common]["TamanoBytes"], errors="coerce"),
-                "TamanoBytes_base": pd.to_numeric(base.loc[common]["TamanoBytes"], errors="coerce")
-            })
-            chg = chg[chg["TamanoBytes_cur"] != chg["TamanoBytes_base"]]
+            add, rem, chg = prof.call("delta", _result, "delta", _dkey(df), f"{_dkey(df_base)}|{key}", delta_tables, (df, df_base, key))
 
             c1, c2, c3 = st.columns(3)
-            c1.metric("Agregados", len(add))
-            c2.metric("Removidos", len(rem))
-            c3.metric("Cambiados", len(chg))
+            c1.metric("Agregados", f"{len(add):,}")
+            c2.metric("Removidos", f"{len(rem):,}")
+            c3.metric("Cambiados", f"{len(chg):,}")
 
             st.markdown("**Agregados**")
-            st.dataframe(add, use_container_width=True, height=240)
+            paged_table(add, "pg_delta_add", height=240, file_name="delta_agregados.csv")
             st.markdown("**Removidos**")
-            st.dataframe(rem, use_container_width=True, height=240)
+            paged_table(rem, "pg_delta_rem", height=240, file_name="delta_removidos.csv")
             st.markdown("**Cambiados**")
-            st.dataframe(chg, use_container_width=True, height=240)
+            paged_table(chg, "pg_delta_chg", height=240, file_name="delta_cambiados.csv")
 
 # ------------------------ Validaciones ------------------------
 with tab_validate:
     st.subheader("Validaciones")
-    v1 = validate_sizes(df)
-    v2 = validate_dates(df)
-    v3 = anomalies_size_iqr(df)
+    # Reglas de usuario opcionales en policies: "validation_rules": [{"id", "regla", "expr"}]
+    user_rules, bad_rules = check_rules(policies.get("validation_rules"), df)
+    for rid, why in bad_rules:
+        st.warning(f"Regla de usuario '{rid}' omitida: {why}")
+    rules = DEFAULT_RULES + user_rules
+    bits, rule_counts = prof.call("validate", validate, df, rules)
     c1, c2, c3 = st.columns(3)
-    c1.metric("Tamaños negativos", len(v1))
-    c2.metric("Fechas inválidas", len(v2))
-    c3.metric("Anomalías IQR", len(v3))
-    st.markdown("**Fechas inválidas**")
-    st.dataframe(v2, use_container_width=True, height=240)
-    st.markdown("**Tamaños negativos**")
-    st.dataframe(v1, use_container_width=True, height=200)
-    st.markdown("**Anomalías IQR**")
-    st.dataframe(v3, use_container_width=True, height=240)
+    c1.metric("Archivos con violaciones", f"{int((bits != 0).sum()):,}")
+    c2.metric("Reglas evaluadas", int(rule_counts["aplica"].sum()))
+    c3.metric("Violaciones totales", f"{int(rule_counts['conteo'].sum()):,}")
+    st.markdown("**Conteo por regla**")
+    st.dataframe(rule_counts[rule_counts["aplica"]][["Regla", "conteo"]], use_container_width=True, height=280)
+    st.markdown("**Archivos con violaciones** (una fila por archivo)")
+    viol = prof.call("violations", _result, "violations", _dkey(df), bits_key(bits, rules), violations, (df, bits, rules))
+    paged_table(viol, "pg_viol", height=360, file_name="violaciones.csv")
+
+    st.markdown("---")
+    st.markdown("### Anomalías de tamaño por grupo")
+    a1, a2, a3, a4 = st.columns(4)
+    an_by = a1.selectbox("Agrupar por", options=["(global)"] + [c for c in ["Extension", "Categoria", "CarpetaPadre"] if c in df.columns])
+    an_method = a2.selectbox("Método", options=["iqr", "robust_z"])
+    an_thr = a3.number_input("k (IQR) / z (robusto)", value=1.5 if an_method == "iqr" else 3.5, step=0.5)
+    an_log = a4.checkbox("Escala log", value=True)
+    an_rows, an_fences = prof.call(
+        "anomalies_size_grouped", anomalies_size_grouped, df, by=None if an_by == "(global)" else an_by, method=an_method,
+        k=an_thr, z=an_thr, log=an_log
+    )
+    st.metric("Archivos atípicos", f"{len(an_rows):,}")
+    st.dataframe(an_fences, use_container_width=True, height=240)
+    paged_table(an_rows, "pg_anom", height=300, file_name="anomalias_tamano.csv")
 
 # ------------------------ Exportar ------------------------
 with tab_export:
@@ -329,17 +676,16 @@ with tab_export:
                 figures["hist_tamano"] = f
 
         if "CarpetaPadre" in df.columns:
-            tt = df.groupby("CarpetaPadre")["TamanoBytes"].sum().sort_values(ascending=False).head(25)
+            tt = top_n(df.groupby("CarpetaPadre")["TamanoBytes"].sum(), 25)
             tf = treemap_sliced(tt.values, tt.index, title="Treemap - Top carpetas por tamaño")
             if tf is not None:
                 figures["treemap_carpetas"] = tf
 
         # Series temporales con helper legible
-        for col in ["FechaCreacion", "FechaModificacion", "FechaAcceso"]:
-            if col in df.columns:
-                t = timeline_counts(df, col, "M")
-                if not t.empty:
-                    figures[f"ts_{col}"] = smart_time_series(t, "periodo", "conteo", f"Conteo mensual — {col}")
+        for col in cube.columns():
+            t = cube.series(col, "M")
+            if not t.empty:
+                figures[f"ts_{col}"] = smart_time_series(t, "periodo", "conteo", f"Conteo mensual — {col}")
 
         # Gráfico categorías (conteo)
         if "Categoria" in df.columns:
@@ -357,23 +703,50 @@ with tab_export:
             "TopPropietario": freq_table(df, "Propietario", n=50),
             "Duplicados": duplicates_by_hash(df)[0],
             "Carpetas": agg_by_folder(df, top=50),
-            "TimelineCreacion": timeline_counts(df, "FechaCreacion", "M"),
-            "TimelineModificacion": timeline_counts(df, "FechaModificacion", "M"),
-            "TimelineAcceso": timeline_counts(df, "FechaAcceso", "M"),
+            "TimelineCreacion": cube.timeline("FechaCreacion"),
+            "TimelineModificacion": cube.timeline("FechaModificacion"),
+            "TimelineAcceso": cube.timeline("FechaAcceso"),
+            "PerfilAntiguedad": (pd.concat({c: cube.age_profile(c) for c in cube.columns()}, names=["Fecha"]).reset_index(level=0)
+                                 if cube.columns() else pd.DataFrame()),
             "MIME_Ext_Mismatch": mime_ext_mismatch(df),
-            "RiskTop": risk_scoring(df, json.loads(policies_json)).head(1000) if policies_json else risk_scoring(df, DEFAULT_POLICIES).head(1000),
+            "RiskTop": scored.head(1000),
             "Categorias_Conteo": df["Categoria"].value_counts(dropna=False).reset_index().rename(columns={"index": "Categoria", "Categoria": "conteo"}) if "Categoria" in df.columns else pd.DataFrame(),
             "Categorias_Tamano": (pd.DataFrame({"Categoria": df.get("Categoria", pd.Series(index=df.index)),
                                                 "TamanoBytes": pd.to_numeric(df.get("TamanoBytes", pd.Series(index=df.index)), errors="coerce")})
                                   .groupby("Categoria").sum().reset_index() if "Categoria" in df.columns else pd.DataFrame()),
             "Size_Buckets": size_buckets(df),
-            "KPIs_Avanzados": kpi_advanced(df),
+            "KPIs_Avanzados": kpi_advanced(df, cube=cube),
         }
 
         try:
-            out_path = export_excel_with_figs(tables, figures, out_dir, base_name)
+            out_path = prof.call("export_excel_with_figs", export_excel_with_figs, tables, figures, out_dir, base_name, profiler=prof)
             st.success(f"Excel generado: {out_path}")
             with open(out_path, "rb") as f:
                 st.download_button("Descargar Excel", data=f.read(), file_name=os.path.basename(out_path))
         except Exception as e:
             st.error(f"No se pudo exportar: {e}")
+
+# ------------------------ Rendimiento ------------------------
+# Va al final del script para incluir todos los pasos de esta ejecución.
+with tab_perf:
+    st.subheader("Rendimiento de la última ejecución")
+    perf = prof.to_frame()
+    st.session_state["last_profile"] = perf
+    if perf.empty:
+        st.info("Sin pasos instrumentados todavía.")
+    else:
+        c1, c2, c3 = st.columns(3)
+        top_level = perf[perf["nivel"] == 0]
+        c1.metric("Tiempo total", f"{top_level['wall_s'].sum():.2f} s")
+        c2.metric("CPU total", f"{top_level['cpu_s'].sum():.2f} s")
+        c3.metric("Paso más lento", str(top_level.sort_values("wall_s").iloc[-1]["paso"]))
+        st.dataframe(perf, use_container_width=True, height=420)
+        try:
+            st.pyplot(bar_top(top_level, "paso", "wall_s", "Tiempo por paso (s)", top=25, horizontal=True), use_container_width=True)
+        except Exception:
+            pass
+        st.download_button("Descargar perfil JSON", data=perf.to_json(orient="records", indent=2).encode("utf-8"),
+                           file_name="perfil_rendimiento.json")
+        if deep_profile:
+            st.markdown("**cProfile (top por tiempo acumulado)**")
+            st.code(prof.hotspots(40))
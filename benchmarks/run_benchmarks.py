@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de Anywhere Analytics ULTIMATE.
+
+Genera inventarios sintéticos (ANALYTICS_ULT.synth) a varias escalas y mide
+tiempo de pared, tiempo de CPU y pico de memoria (tracemalloc) de cada
+analizador, de la ingesta y de los comandos completos del CLI.
+Los resultados se guardan en JSON para comparar corridas:
+
+    python benchmarks/run_benchmarks.py --rows 10000 100000 --output benchmarks/results/hoy.json
+    python benchmarks/run_benchmarks.py --rows 10000 --compare benchmarks/results/ayer.json
+    python benchmarks/run_benchmarks.py --startup      # solo arranque del CLI; código 1 si excede el presupuesto
+
+El arranque se mide con `python -X importtime`: tiempo de importación por
+comando contra `STARTUP_BUDGET_S` y módulos que ese comando no debe cargar.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from ANALYTICS_ULT import (analyzers, risk, simulator, validators, categorize, mismatch, anomalies, io_utils, sqlstore,
+                           excel_io, csv_io, neardup, subtrees, filters, timecube)
+from ANALYTICS_ULT.synth import generate_inventory, write_inventory
+import cli_ultimate
+
+CLI = os.path.join(ROOT, "cli_ultimate.py")
+STARTUP_BUDGET_S = {"help": 0.5, "comando": 2.0}  # segundos de importación; pandas solo ya cuesta ~1 s
+LAZY_MODULES = ["matplotlib", "openpyxl", "asyncio"]  # ningún comando del cron los necesita
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+\d+ \| (\s*)(\S+)")
+
+
+# ---------------- Medición ----------------
+def _rows_out(out):
+    if isinstance(out, tuple):
+        out = out[0]
+    if isinstance(out, (pd.DataFrame, pd.Series, list, dict)):
+        return len(out)
+    return None
+
+
+def measure(fn, memory=True, repeat=1):
+    """Ejecuta `fn` y devuelve {wall_s, cpu_s, peak_mb, rows_out} (mejor tiempo de `repeat`)."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        if memory:
+            tracemalloc.start()
+        w0, c0 = time.perf_counter(), time.process_time()
+        out = fn()
+        wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if memory else None
+        if memory:
+            tracemalloc.stop()
+        rec = {"wall_s": round(wall, 4), "cpu_s": round(cpu, 4),
+               "peak_mb": None if peak is None else round(peak, 2), "rows_out": _rows_out(out)}
+        if best is None or rec["wall_s"] < best["wall_s"]:
+            best = rec
+        del out
+    return best
+
+
+def measure_cli(argv):
+    """Ejecuta el CLI en un proceso aparte; el hijo reporta su RSS máximo."""
+    code = ("import resource, runpy, sys; sys.argv = %r; "
+            "runpy.run_path(%r, run_name='__main__'); "
+            "sys.stderr.write('\\n__MAXRSS__=%%d\\n' %% resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)") % (
+        [CLI] + argv, CLI)
+    w0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    wall = time.perf_counter() - w0
+    rss = None
+    for line in proc.stderr.splitlines():
+        if line.startswith("__MAXRSS__="):
+            rss = int(line.split("=", 1)[1]) / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+    rec = {"wall_s": round(wall, 4), "cpu_s": None, "peak_mb": None if rss is None else round(rss, 2), "rows_out": None}
+    if proc.returncode != 0:
+        rec["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    return rec
+
+
+def measure_startup(argv, budget, forbidden=()):
+    """CLI con `-X importtime`: tiempo de importación, paquetes más pesados y módulos prohibidos cargados."""
+    w0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", CLI] + argv, capture_output=True, text=True, cwd=ROOT)
+    wall = time.perf_counter() - w0
+    per_pkg = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            pkg = m.group(3).split(".")[0]
+            per_pkg[pkg] = per_pkg.get(pkg, 0) + int(m.group(1)) / 1e6
+    imp = sum(per_pkg.values())
+    heavy = sorted(per_pkg.items(), key=lambda kv: -kv[1])[:5]
+    loaded = [m for m in forbidden if m in per_pkg]
+    rec = {"wall_s": round(wall, 4), "cpu_s": None, "peak_mb": None, "rows_out": None,
+           "import_s": round(imp, 4), "presupuesto_s": budget, "pesados": {k: round(v, 4) for k, v in heavy},
+           "prohibidos": loaded, "excede": imp > budget or bool(loaded)}
+    if proc.returncode != 0:
+        rec["error"] = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    return rec
+
+
+# ---------------- Casos ----------------
+def cases(ctx):
+    """(grupo, nombre, callable) para cada función medida."""
+    df, raw = ctx["df"], ctx["raw"]
+    half = df.iloc[: len(df) // 2]
+    yield "ingesta", "sniff_csv", lambda: csv_io.sniff_csv(ctx["csv"])
+    yield "ingesta", "load_table_csv", lambda: io_utils.load_table(ctx["csv"])
+    if ctx.get("xlsx"):
+        yield "ingesta", "load_table_xlsx", lambda: io_utils.load_table(ctx["xlsx"])
+        for eng in ("calamine", "openpyxl"):
+            try:
+                excel_io.excel_engine(".xlsx", eng)
+            except ImportError:
+                continue
+            yield "ingesta", f"excel_{eng}", lambda eng=eng: excel_io.read_excel_sheet(ctx["xlsx"], engine=eng)
+    yield "ingesta", "coerce_datetimes", lambda: io_utils.coerce_datetimes(raw.copy(), validators.DATE_COLS)
+    yield "ingesta", "coerce_numeric", lambda: io_utils.coerce_numeric(raw.copy(), ["TamanoBytes"])
+    yield "ingesta", "coerce_booleans", lambda: io_utils.coerce_booleans(raw.copy(), ["Oculto", "SoloLectura"])
+    yield "ingesta", "prep", lambda: cli_ultimate._prep(ctx["csv"])
+
+    yield "analyzers", "overview_metrics", lambda: analyzers.overview_metrics(df)
+    yield "analyzers", "top_n_by_size", lambda: analyzers.top_n_by_size(df, n=50)
+    yield "analyzers", "top_n_per_group_by_size", lambda: analyzers.top_n_per_group_by_size(df, "Propietario", n=20)
+    yield "analyzers", "missingness", lambda: analyzers.missingness(df)
+    yield "analyzers", "freq_table", lambda: analyzers.freq_table(df, "Extension", n=50)
+    yield "analyzers", "freq_table_sketch", lambda: analyzers.freq_table(df, "Extension", n=50, sketch=True)
+    yield "analyzers", "duplicates_by_hash", lambda: analyzers.duplicates_by_hash(df)
+    yield "analyzers", "timeline_counts", lambda: analyzers.timeline_counts(df, "FechaModificacion", "M")
+    yield "analyzers", "agg_by", lambda: analyzers.agg_by(df, "Extension", top=50)
+    yield "analyzers", "agg_by_folder", lambda: analyzers.agg_by_folder(df, top=50)
+    yield "analyzers", "size_buckets", lambda: analyzers.size_buckets(df)
+    yield "analyzers", "kpi_advanced", lambda: analyzers.kpi_advanced(df)
+    cube = timecube.build_time_cube(df)
+    yield "timecube", "build_time_cube", lambda: timecube.build_time_cube(df)
+    yield "timecube", "series_W_dim", lambda: cube.series("FechaModificacion", "W", dim="Propietario")
+    yield "timecube", "age_profile", lambda: cube.age_profile("FechaAcceso")
+
+    fidx = filters.FilterIndex(df)
+    spec = {"Extension": list(fidx.options("Extension"))[:2], "FechaModificacion": ["2020-01-01", "2022-12-31"]}
+    yield "filters", "FilterIndex", lambda: filters.FilterIndex(df)
+    yield "filters", "select", lambda: fidx.select(spec)
+
+    db_path = os.path.join(os.path.dirname(ctx["csv"]), f"inv_{ctx['rows']}.sqlite")
+    yield "sql", "ingest", lambda: sqlstore.ingest(ctx["csv"], db_path)
+    if os.path.exists(db_path):
+        db = sqlstore.InventoryDB(db_path)
+        yield "sql", "overview_metrics", lambda: analyzers.overview_metrics(db)
+        yield "sql", "freq_table", lambda: analyzers.freq_table(db, "Extension", n=50)
+        yield "sql", "duplicates_by_hash", lambda: analyzers.duplicates_by_hash(db)
+        yield "sql", "timeline_counts", lambda: analyzers.timeline_counts(db, "FechaModificacion", "M")
+        yield "sql", "build_time_cube", lambda: timecube.build_time_cube(db)
+        yield "sql", "agg_by", lambda: analyzers.agg_by(db, "Extension", top=50)
+        yield "sql", "top_n_per_group_by_size", lambda: analyzers.top_n_per_group_by_size(db, "Propietario", n=20)
+        yield "sql", "size_buckets", lambda: analyzers.size_buckets(db)
+
+    yield "risk", "risk_scoring", lambda: risk.risk_scoring(df)
+    yield "simulator", "simulate_dedupe", lambda: simulator.simulate_dedupe(df, by="CarpetaPadre")
+    yield "simulator", "near_duplicates", lambda: neardup.near_duplicates(df)
+    yield "simulator", "duplicate_subtrees", lambda: subtrees.duplicate_subtrees(df)
+    yield "validators", "validate", lambda: validators.validate(df)
+    yield "validators", "validate_dates", lambda: validators.validate_dates(df)
+    yield "validators", "anomalies_size_iqr", lambda: validators.anomalies_size_iqr(df)
+    yield "validators", "anomalies_size_grouped", lambda: anomalies.anomalies_size_grouped(df, by="Extension", log=True)
+    yield "categorize", "add_category_column", lambda: categorize.add_category_column(df)
+    yield "mismatch", "mime_ext_mismatch", lambda: mismatch.mime_ext_mismatch(df)
+
+
+def cli_cases(ctx):
+    out = ctx["out_dir"]
+    yield "cli", "report", ["report", "--input", ctx["csv"], "--output", out]
+    yield "cli", "delta", ["delta", "--input", ctx["csv"], "--baseline", ctx["csv_base"], "--output", out]
+    yield "cli", "simulate-dedupe", ["simulate-dedupe", "--input", ctx["csv"], "--output", out]
+
+
+def startup_cases(ctx):
+    """(nombre, argv, presupuesto, módulos prohibidos): comandos cortos como los del cron."""
+    out, csv = ctx["out_dir"], ctx["csv"]
+    cmd, lazy = STARTUP_BUDGET_S["comando"], LAZY_MODULES
+    yield "help", ["--help"], STARTUP_BUDGET_S["help"], ["pandas", "numpy"] + lazy
+    yield "synth", ["synth", "--rows", "200", "--output", os.path.join(out, "synth.csv")], cmd, lazy + ["xlsxwriter"]
+    yield "simulate-dedupe", ["simulate-dedupe", "--input", csv, "--output", out], cmd, lazy + ["xlsxwriter"]
+    yield "top-files", ["top-files", "--input", csv, "--output", out], cmd, lazy
+    yield "report", ["report", "--input", csv, "--output", out], cmd, lazy
+
+
+def run_startup(only=None, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="aa_bench_") as tmp:
+        csv = os.path.join(tmp, "inv_1000.csv")
+        write_inventory(csv, 1_000, seed=seed)
+        print("== arranque del CLI (-X importtime)", flush=True)
+        for name, argv, budget, forbidden in startup_cases({"csv": csv, "out_dir": os.path.join(tmp, "out")}):
+            if only and not any(o in f"arranque.{name}" for o in only):
+                continue
+            rec = measure_startup(argv, budget, forbidden)
+            rec.update({"grupo": "arranque", "caso": name, "filas": 0})
+            results.append(rec)
+            flag = "EXCEDE" if rec["excede"] else "ok"
+            print(f"  arranque.{name:<20} {rec['import_s']:>7.3f}s import / {budget}s  {flag}"
+                  + (f"  cargó {', '.join(rec['prohibidos'])}" if rec["prohibidos"] else "")
+                  + f"  ({', '.join(f'{k} {v:.2f}' for k, v in list(rec['pesados'].items())[:3])})", flush=True)
+    return results
+
+
+# ---------------- Corrida ----------------
+def check_xlsx_fixture(csv, xlsx, rows=500):
+    """El XLSX de entrada debe tener los mismos datos que el CSV en todas las columnas (no solo Nombre):
+    si no, los casos de Excel medirían una hoja casi vacía."""
+    got, exp = io_utils.load_table(xlsx, nrows=rows), io_utils.load_table(csv, nrows=rows)
+    bad = [c for c in exp.columns if c not in got.columns or got[c].notna().sum() != exp[c].notna().sum()]
+    if bad or len(got) != len(exp):
+        raise RuntimeError(f"XLSX de benchmark incompleto ({xlsx}): columnas sin datos {bad}")
+
+
+def run(rows_list, memory=True, repeat=1, only=None, skip_cli=False, xlsx_max=200_000, seed=0):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="aa_bench_") as tmp:
+        for rows in rows_list:
+            print(f"== {rows:,} filas", flush=True)
+            csv = os.path.join(tmp, f"inv_{rows}.csv")
+            write_inventory(csv, rows, seed=seed)
+            csv_base = os.path.join(tmp, f"base_{rows}.csv")
+            write_inventory(csv_base, rows, seed=seed + 1)
+            xlsx = None
+            if rows <= xlsx_max:
+                xlsx = os.path.join(tmp, f"inv_{rows}.xlsx")
+                write_inventory(xlsx, rows, seed=seed)
+                check_xlsx_fixture(csv, xlsx)
+            ctx = {"rows": rows, "csv": csv, "csv_base": csv_base, "xlsx": xlsx, "out_dir": os.path.join(tmp, "out"),
+                   "raw": pd.read_csv(csv), "df": cli_ultimate._prep(csv)}
+            for group, name, fn in cases(ctx):
+                if only and not any(o in f"{group}.{name}" for o in only):
+                    continue
+                try:
+                    rec = measure(fn, memory=memory, repeat=repeat)
+                except Exception as e:  # un caso roto no aborta la corrida
+                    rec = {"wall_s": None, "cpu_s": None, "peak_mb": None, "rows_out": None, "error": repr(e)}
+                rec.update({"grupo": group, "caso": name, "filas": rows})
+                results.append(rec)
+                print(f"  {group}.{name:<24} {rec['wall_s']!s:>9}s  {rec['peak_mb']!s:>9} MB", flush=True)
+            if not skip_cli:
+                for group, name, argv in cli_cases(ctx):
+                    if only and not any(o in f"{group}.{name}" for o in only):
+                        continue
+                    rec = measure_cli(argv)
+                    rec.update({"grupo": group, "caso": name, "filas": rows})
+                    results.append(rec)
+                    print(f"  {group}.{name:<24} {rec['wall_s']!s:>9}s  {rec['peak_mb']!s:>9} MB(rss)", flush=True)
+    return results
+
+
+def meta():
+    return {"fecha": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "pandas": pd.__version__, "numpy": np.__version__, "plataforma": platform.platform(),
+            "cpus": os.cpu_count()}
+
+
+def compare(current, baseline_path, threshold=1.2):
+    """Tabla de comparación (ratio = actual / base); retorna las regresiones por encima de `threshold`."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["resultados"]
+    key = lambda r: (r["grupo"], r["caso"], r["filas"])
+    b = {key(r): r for r in base}
+    rows = []
+    for r in current:
+        old = b.get(key(r))
+        if not old or not old.get("wall_s") or not r.get("wall_s"):
+            continue
+        rows.append({"grupo": r["grupo"], "caso": r["caso"], "filas": r["filas"], "base_s": old["wall_s"],
+                     "actual_s": r["wall_s"], "ratio": round(r["wall_s"] / old["wall_s"], 3)})
+    table = pd.DataFrame(rows)
+    if not table.empty:
+        print(table.to_string(index=False))
+    return table[table["ratio"] > threshold] if not table.empty else table
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks de Anywhere Analytics ULTIMATE")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--only", nargs="*", help="filtrar casos por subcadena de 'grupo.caso'")
+    ap.add_argument("--no-memory", action="store_true", help="sin tracemalloc (tiempos más fieles)")
+    ap.add_argument("--skip-cli", action="store_true")
+    ap.add_argument("--startup", action="store_true", help="solo el arranque del CLI (código 1 si excede el presupuesto)")
+    ap.add_argument("--skip-startup", action="store_true")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--compare", help="JSON de una corrida anterior")
+    ap.add_argument("--fail-ratio", type=float, default=0.0, help="salir con código 1 si alguna ratio supera este valor")
+    args = ap.parse_args()
+
+    results = [] if args.skip_startup else run_startup(only=args.only, seed=args.seed)
+    if not args.startup:
+        results += run(args.rows, memory=not args.no_memory, repeat=args.repeat, only=args.only,
+                       skip_cli=args.skip_cli, seed=args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta(), "resultados": results}, f, indent=2, ensure_ascii=False)
+    print("OK:", args.output)
+    if args.startup and any(r.get("excede") for r in results):
+        sys.exit(1)
+    if args.compare:
+        reg = compare(results, args.compare, threshold=args.fail_ratio or 1.2)
+        if args.fail_ratio and not reg.empty:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
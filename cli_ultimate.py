@@ -1,75 +1,334 @@
 # -*- coding: utf-8 -*-
+# Cada subcomando importa lo suyo al ejecutarse: el arranque (cron, cientos de llamadas al día) no paga
+# pandas en --help ni matplotlib/asyncio/multiprocessing en los comandos que no los usan
+# (ver benchmarks/run_benchmarks.py --startup).
 import argparse, os, json
-import pandas as pd
-from ANALYTICS_ULT.io_utils import load_table, coerce_booleans, coerce_datetimes, coerce_numeric
-from ANALYTICS_ULT.path_utils import split_path_to_levels
-from ANALYTICS_ULT.analyzers import (top_n_by_size, missingness, freq_table, duplicates_by_hash, timeline_counts, agg_by_folder)
-from ANALYTICS_ULT.mismatch import mime_ext_mismatch
-from ANALYTICS_ULT.risk import risk_scoring, DEFAULT_POLICIES
-from ANALYTICS_ULT.simulator import simulate_dedupe
-from ANALYTICS_ULT.exporters import export_excel_with_figs
-
-def _prep(path):
-    df = load_table(path, sheet_name=None)
-    df = coerce_datetimes(df, ["FechaCreacion","FechaModificacion","FechaAcceso"])
-    df = coerce_numeric(df, ["TamanoBytes"])
-    df = coerce_booleans(df, ["Oculto","SoloLectura"])
-    if not any(c.startswith("Nivel_") for c in df.columns):
-        if "RutaRelativa" in df.columns:
-            df = pd.concat([df.reset_index(drop=True), split_path_to_levels(df["RutaRelativa"]).reset_index(drop=True)], axis=1)
-    return df
+from ANALYTICS_ULT.profiling import Profiler, NULL_PROFILER
+
+def _load_opts(args, path):
+    """sep/encoding para `path`: los de --sep/--encoding o, en CSV, los detectados (se informan para fijarlos)."""
+    from ANALYTICS_ULT.io_utils import SUPPORTED_CSV, _source_ext
+    from ANALYTICS_ULT.csv_io import sniff_csv, describe_sniff, sep_label, parse_sep
+    if _source_ext(path) not in SUPPORTED_CSV:
+        return {}
+    sep = parse_sep(args.sep)
+    if sep and args.encoding:
+        return {"sep": sep, "encoding": args.encoding}
+    info = sniff_csv(path, sep=sep, encoding=args.encoding or None)
+    print(f"{describe_sniff(info)} [{os.path.basename(path)}]; fijar con --sep '{sep_label(info['sep'])}' "
+          f"--encoding {info['encoding']}")
+    return {"sep": info["sep"], "encoding": info["encoding"]}
+
+def _prep(path, prof=NULL_PROFILER, **load_kwargs):
+    """Siempre DataFrame (una base de `ingest` se materializa para los comandos fila a fila)."""
+    import pandas as pd
+    from ANALYTICS_ULT.pipeline import prepare_inventory
+    df = prepare_inventory(path, prof, **load_kwargs)
+    return df if isinstance(df, pd.DataFrame) else prof.call("db.to_frame", df.to_frame)
+
+def _report_input(args):
+    """DataFrame o InventoryDB según --backend (auto: por tamaño del archivo frente a la RAM disponible)."""
+    from ANALYTICS_ULT.pipeline import prepare_inventory
+    from ANALYTICS_ULT.sqlstore import ingest, choose_backend, is_db_path
+    backend = choose_backend(args.input) if args.backend == "auto" else args.backend
+    if backend == "sql" and not is_db_path(args.input):
+        db = args.db or os.path.join(args.output, os.path.splitext(os.path.basename(args.input))[0] + ".sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(db)), exist_ok=True)
+        info = args.prof.call("ingest", ingest, args.input, db, prof=args.prof, **_load_opts(args, args.input))
+        print(f"Backend SQL: {info['filas']} filas en {db}")
+        return prepare_inventory(db, args.prof)
+    if backend == "sql":
+        return prepare_inventory(args.input, args.prof)
+    return _prep(args.input, args.prof, **_load_opts(args, args.input))
+
+def _report_tables(args):
+    import pandas as pd
+    from ANALYTICS_ULT.pipeline import report_tables, report_tables_stream
+    from ANALYTICS_ULT.risk import DEFAULT_POLICIES
+    from ANALYTICS_ULT.sqlstore import choose_backend, is_db_path
+    P = args.prof
+    backend = choose_backend(args.input) if args.backend == "auto" else args.backend
+    if args.sketch and args.workers <= 1 and backend != "sql" and not is_db_path(args.input):
+        # sketches por chunk: el inventario completo nunca se carga
+        return report_tables_stream(args.input, P, chunksize=args.chunksize, policies=DEFAULT_POLICIES, **_load_opts(args, args.input))
+    df = _report_input(args)
+    if args.workers > 1 and not isinstance(df, pd.DataFrame):
+        print("Backend SQL: --workers se ignora (las agregaciones corren en el motor)"); args.workers = 1
+    if args.workers > 1:
+        from ANALYTICS_ULT.parallel import parallel_report
+        return P.call("parallel_report", parallel_report, df, workers=args.workers, shard_by=args.shard_by, policies=DEFAULT_POLICIES, sketch=args.sketch)
+    return report_tables(df, P, sketch=args.sketch, policies=DEFAULT_POLICIES)
 
 def run_report(args):
-    df = _prep(args.input)
-    tables = {
-        "ResumenTop": top_n_by_size(df, n=50),
-        "CalidadDatos": missingness(df),
-        "TopExtensiones": freq_table(df, "Extension", n=50),
-        "TopMIME": freq_table(df, "MimeType", n=50),
-        "TopPropietario": freq_table(df, "Propietario", n=50),
-        "Duplicados": duplicates_by_hash(df)[0],
-        "Carpetas": agg_by_folder(df, top=50),
-        "TimelineCreacion": timeline_counts(df, "FechaCreacion", "M"),
-        "TimelineModificacion": timeline_counts(df, "FechaModificacion", "M"),
-        "TimelineAcceso": timeline_counts(df, "FechaAcceso", "M"),
-        "MIME_Ext_Mismatch": mime_ext_mismatch(df),
-        "RiskTop": risk_scoring(df, DEFAULT_POLICIES).head(1000),
-    }
-    out = export_excel_with_figs(tables, figures={}, out_dir=args.output, base_name="Reporte_Analitica_ULTIMATE")
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    P = args.prof
+    tables = _report_tables(args)
+    out = P.call("export_excel_with_figs", export_excel_with_figs, tables, figures={}, out_dir=args.output, base_name="Reporte_Analitica_ULTIMATE", profiler=P)
     print("OK:", out)
 
+def run_ingest(args):
+    from ANALYTICS_ULT.sqlstore import ingest
+    info = ingest(args.input, args.db, engine=args.engine or None, chunksize=args.chunksize, prof=args.prof,
+                  **_load_opts(args, args.input))
+    print(f"OK: {info['filas']} filas, {info['columnas']} columnas -> {info['db']} ({info['engine']})")
+
+def run_batch_cmd(args):
+    from ANALYTICS_ULT.batch import run_batch
+    from ANALYTICS_ULT.risk import DEFAULT_POLICIES
+    if not args.inputs and not args.manifest:
+        raise SystemExit("batch: indique --inputs y/o --manifest")
+    def progress(rec, done, total):
+        msg = "cache" if rec.get("cache") else rec.get("estado")
+        print(f"[{done}/{total}] {msg}: {rec['inventario']}" + (f" -> {rec['error']}" if rec.get("error") else ""), flush=True)
+    with args.prof.step("batch"):
+        res = run_batch(args.inputs, manifest=args.manifest, out_dir=args.output, workers=args.workers,
+                        cache_dir=args.cache_dir, sketch=args.sketch, figures=not args.no_figures,
+                        policies=DEFAULT_POLICIES, progress=progress)
+    errores = int((res["resumen"]["estado"] != "ok").sum())
+    print(f"OK: {len(res['resumen'])} inventarios, {errores} con error, {res['salida']}")
+
 def run_delta(args):
-    df = _prep(args.input); base = _prep(args.baseline)
-    key = "Hash" if "Hash" in df.columns else ("RutaCompleta" if "RutaCompleta" in df.columns else None)
-    if key is None or key not in base.columns:
+    import pandas as pd
+    from ANALYTICS_ULT.delta import delta_key, delta_tables
+    df = _prep(args.input, args.prof, **_load_opts(args, args.input))
+    base = _prep(args.baseline, args.prof, **_load_opts(args, args.baseline))
+    key = delta_key(df, base)
+    if key is None:
         print("No hay clave común (Hash o RutaCompleta)"); return
-    cur = df.drop_duplicates(subset=[key]).set_index(key); bs = base.drop_duplicates(subset=[key]).set_index(key)
-    add_keys = cur.index.difference(bs.index); rem_keys = bs.index.difference(cur.index); common = cur.index.intersection(bs.index)
-    add = cur.loc[add_keys].reset_index(); rem = bs.loc[rem_keys].reset_index()
-    chg = pd.DataFrame({"key": common, "TamanoBytes_cur": pd.to_numeric(cur.loc[common]["TamanoBytes"], errors="coerce"),
-                        "TamanoBytes_base": pd.to_numeric(bs.loc[common]["TamanoBytes"], errors="coerce")})
-    chg = chg[chg["TamanoBytes_cur"] != chg["TamanoBytes_base"]]
-    with pd.ExcelWriter(os.path.join(args.output, "Delta_ULTIMATE.xlsx"), engine="xlsxwriter") as w:
+    add, rem, chg = args.prof.call("delta_tables", delta_tables, df, base, key)
+    with args.prof.step("export_delta", rows_in=len(add) + len(rem) + len(chg)), \
+            pd.ExcelWriter(os.path.join(args.output, "Delta_ULTIMATE.xlsx"), engine="xlsxwriter") as w:
         add.to_excel(w, sheet_name="Agregados", index=False)
         rem.to_excel(w, sheet_name="Removidos", index=False)
         chg.to_excel(w, sheet_name="Cambiados", index=False)
     print("OK: delta exportado")
 
+def _near_kwargs(args):
+    return {"on": args.on, "threshold": args.threshold, "block_ext": not args.cross_ext,
+            "size_tol": args.size_tol if args.size_tol > 0 else None}
+
+def run_near_dups(args):
+    from ANALYTICS_ULT.neardup import near_duplicates
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    df = _prep(args.input, args.prof, **_load_opts(args, args.input))
+    members, clusters = args.prof.call("near_duplicates", near_duplicates, df, **_near_kwargs(args))
+    out = export_excel_with_figs({"Clusters": clusters, "Miembros": members}, figures={}, out_dir=args.output,
+                                 base_name="Casi_Duplicados_ULTIMATE")
+    rec = 0 if clusters.empty else clusters["bytes_recuperables"].sum()
+    print(f"OK: clusters={len(clusters)}, archivos={len(members)}, recuperable={rec:,.0f} bytes, {out}")
+
+def run_dup_folders(args):
+    from ANALYTICS_ULT.subtrees import duplicate_subtrees
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    df = _prep(args.input, args.prof, **_load_opts(args, args.input))
+    grupos, carpetas = args.prof.call("duplicate_subtrees", duplicate_subtrees, df, min_files=args.min_files,
+                                      min_bytes=args.min_bytes)
+    out = export_excel_with_figs({"Grupos": grupos, "Carpetas": carpetas}, figures={}, out_dir=args.output,
+                                 base_name="Carpetas_Duplicadas_ULTIMATE")
+    rec = 0 if grupos.empty else grupos["bytes_recuperables"].sum()
+    print(f"OK: grupos={len(grupos)}, carpetas={len(carpetas)}, recuperable={rec:,.0f} bytes, {out}")
+
+def run_top_files(args):
+    from ANALYTICS_ULT.pipeline import prepare_inventory
+    from ANALYTICS_ULT.analyzers import top_n_per_group_by_size
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    df = prepare_inventory(args.input, args.prof, **_load_opts(args, args.input))  # acepta también .sqlite/.duckdb
+    top = args.prof.call("top_n_per_group_by_size", top_n_per_group_by_size, df, by=args.by, n=args.n)
+    out = export_excel_with_figs({f"Top{args.n}_{args.by}"[:31]: top}, figures={}, out_dir=args.output,
+                                 base_name="TopPorGrupo_ULTIMATE")
+    grupos = 0 if top.empty else top[args.by].nunique(dropna=False)
+    print(f"OK: grupos={grupos}, filas={len(top)}, {out}")
+
+def run_timeline(args):
+    import pandas as pd
+    from ANALYTICS_ULT.pipeline import add_derived_columns, prepare_inventory
+    from ANALYTICS_ULT.timecube import build_time_cube
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    df = prepare_inventory(args.input, args.prof, **_load_opts(args, args.input))  # acepta también .sqlite/.duckdb
+    dim = args.by or None
+    if dim and isinstance(df, pd.DataFrame):  # --by Categoria: columna derivada, como en anomalies
+        df = args.prof.call("add_derived_columns", add_derived_columns, df, [dim])
+    cube = args.prof.call("build_time_cube", build_time_cube, df, dims=[dim] if dim else ())
+    if dim and dim not in cube.dims(next(iter(cube.columns()), "")):
+        raise SystemExit(f"La columna '{dim}' no está en el inventario.")
+    tables = {}
+    for col in cube.columns():
+        tables[f"Serie_{col}"] = cube.series(col, args.freq, dim=dim)
+        tables[f"Antiguedad_{col}"] = cube.age_profile(col, dim=dim)
+    out = export_excel_with_figs(tables, figures={}, out_dir=args.output, base_name="Temporal_ULTIMATE")
+    print(f"OK: fechas={len(cube.columns())}, granularidad={args.freq}{', por ' + dim if dim else ''}, {out}")
+
+def run_serve(args):
+    from ANALYTICS_ULT.service import run_service, check_loopback, DEFAULT_HOST, DEFAULT_PORT
+    from ANALYTICS_ULT.csv_io import parse_sep
+    if not args.socket:
+        try:
+            check_loopback(args.host or DEFAULT_HOST)
+        except ValueError as e:
+            raise SystemExit(str(e))
+    run_service(args.input, args.name, host=args.host or DEFAULT_HOST, port=args.port or DEFAULT_PORT, socket_path=args.socket, workers=args.workers,
+                sep=parse_sep(args.sep), encoding=args.encoding or None, sheet_name=args.sheet or None)
+
+def run_query(args):
+    from ANALYTICS_ULT.service import request, DEFAULT_HOST, DEFAULT_PORT
+    conn = {"host": args.host or DEFAULT_HOST, "port": args.port or DEFAULT_PORT, "socket_path": args.socket}
+    if args.load:
+        status, out = request("/load", {"name": args.dataset, "path": os.path.abspath(args.load)}, **conn)
+    elif args.op:
+        status, out = request("/query", {"dataset": args.dataset, "op": args.op, "params": json.loads(args.params or "{}")}, **conn)
+    else:
+        status, out = request(args.path, **conn)
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    if status != 200:
+        raise SystemExit(1)
+
 def run_simulate_dedupe(args):
-    df = _prep(args.input)
-    plan, ahorro = simulate_dedupe(df, by=args.by, strategy=args.strategy)
+    from ANALYTICS_ULT.neardup import near_duplicates
+    from ANALYTICS_ULT.simulator import simulate_dedupe
+    df = _prep(args.input, args.prof, **_load_opts(args, args.input))
+    near = args.prof.call("near_duplicates", near_duplicates, df, **_near_kwargs(args))[0] if args.near else None
+    plan, ahorro = args.prof.call("simulate_dedupe", simulate_dedupe, df, by=args.by, strategy=args.strategy, near=near)
     out = os.path.join(args.output, "plan_deduplicacion.csv")
     os.makedirs(args.output, exist_ok=True)
     plan.to_csv(out, index=False, encoding="utf-8")
     print(f"OK: ahorro={ahorro:.0f} bytes, plan={out}")
 
+def run_anomalies(args):
+    from ANALYTICS_ULT.pipeline import add_derived_columns, iter_inventory_chunks
+    from ANALYTICS_ULT.anomalies import anomalies_size_grouped, anomalies_size_stream
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    by = args.by or None
+    opts = _load_opts(args, args.input)
+    if args.chunksize:
+        # cada chunk normalizado y con las columnas derivadas (p. ej. --by Categoria), igual que en memoria
+        rows, fences = anomalies_size_stream(lambda: iter_inventory_chunks(args.input, chunksize=args.chunksize, derived=[by], **opts),
+                                             by=by, method=args.method, k=args.k, z=args.z, log=args.log, min_count=args.min_count)
+    else:
+        rows, fences = anomalies_size_grouped(add_derived_columns(_prep(args.input, args.prof, **opts), [by]), by=by, method=args.method, k=args.k, z=args.z,
+                                              log=args.log, min_count=args.min_count)
+    out = export_excel_with_figs({"Limites": fences, "Anomalias": rows}, figures={}, out_dir=args.output, base_name="Anomalias_ULTIMATE")
+    print(f"OK: atipicos={len(rows)}, grupos={len(fences)}, {out}")
+
+def run_validate(args):
+    from ANALYTICS_ULT.pipeline import iter_inventory_chunks
+    from ANALYTICS_ULT.anomalies import size_sketches, fences_from_sketches
+    from ANALYTICS_ULT.validators import validate_chunks
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    by = args.by or None
+    opts = _load_opts(args, args.input)
+    chunks = lambda: iter_inventory_chunks(args.input, chunksize=args.chunksize, derived=[by], **opts)
+    # dos pasadas: límites IQR globales (o por grupo) desde sketches KLL, luego las reglas chunk a chunk
+    sk = args.prof.call("size_sketches", size_sketches, chunks(), by=by)
+    fences = fences_from_sketches(sk, method="iqr", k=args.k, min_count=args.min_count)
+    counts, rows = args.prof.call("validate_chunks", validate_chunks, chunks(), keep_rows=not args.no_rows, iqr_fences=fences, iqr_by=by)
+    tables = {"Reglas": counts, "Limites_IQR": fences}
+    if rows is not None:
+        tables["Violaciones"] = rows
+    out = export_excel_with_figs(tables, figures={}, out_dir=args.output, base_name="Validaciones_ULTIMATE")
+    print(f"OK: violaciones={int(counts['conteo'].sum())}, archivos={'-' if rows is None else len(rows)}, {out}")
+
+def run_sketch(args):
+    from ANALYTICS_ULT.pipeline import iter_inventory_chunks
+    from ANALYTICS_ULT.sketches import build_inventory_sketches, dumps_inventory_sketches
+    sk = build_inventory_sketches(iter_inventory_chunks(args.input, chunksize=args.chunksize, **_load_opts(args, args.input)))
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(dumps_inventory_sketches(sk))
+    print(f"OK: filas={sk['filas']}, sketch={args.output}")
+
+def run_sketch_merge(args):
+    import pandas as pd
+    from ANALYTICS_ULT.sketches import (merge_inventory_sketches, dumps_inventory_sketches, loads_inventory_sketches,
+                                        sketch_freq_table, sketch_overview)
+    from ANALYTICS_ULT.exporters import export_excel_with_figs
+    parts = []
+    for p in args.inputs:
+        with open(p, encoding="utf-8") as f:
+            parts.append(loads_inventory_sketches(f.read()))
+    sk = merge_inventory_sketches(parts)
+    met = sketch_overview(sk)
+    tables = {
+        "Resumen": pd.DataFrame({"KPI": list(met.keys()), "Valor": list(met.values())}),
+        "TopExtensiones": sketch_freq_table(sk, "Extension", n=50),
+        "TopMIME": sketch_freq_table(sk, "MimeType", n=50),
+        "TopPropietario": sketch_freq_table(sk, "Propietario", n=50),
+    }
+    out = export_excel_with_figs(tables, figures={}, out_dir=args.output, base_name="Reporte_Sketches_ULTIMATE")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            f.write(dumps_inventory_sketches(sk))
+    print(f"OK: {len(parts)} sketches, filas={sk['filas']}, {out}")
+
+def run_synth(args):
+    from ANALYTICS_ULT.synth import write_inventory
+    out = write_inventory(args.output, args.rows, chunksize=args.chunksize, seed=args.seed, dup_ratio=args.dup_ratio)
+    print(f"OK: {args.rows} filas sintéticas, {out}")
+
 def main():
     ap = argparse.ArgumentParser(description="Anywhere Analytics ULTIMATE")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--profile", default="", help="guardar tiempos/memoria por paso (.json o .csv)")
+    common.add_argument("--profile-deep", action="store_true", help="además cProfile (<profile>.prof) y tracemalloc por paso")
+    common.add_argument("--sep", default="", help="separador CSV (por defecto se detecta)")
+    common.add_argument("--encoding", default="", help="encoding CSV (por defecto se detecta)")
     sub = ap.add_subparsers(dest="cmd", required=True)
-    r = sub.add_parser("report"); r.add_argument("--input", required=True); r.add_argument("--output", default="./reportes"); r.set_defaults(func=run_report)
-    d = sub.add_parser("delta"); d.add_argument("--input", required=True); d.add_argument("--baseline", required=True); d.add_argument("--output", default="./reportes"); d.set_defaults(func=run_delta)
-    s = sub.add_parser("simulate-dedupe"); s.add_argument("--input", required=True); s.add_argument("--by", default="CarpetaPadre"); s.add_argument("--strategy", default="keep-largest"); s.add_argument("--output", default="./reportes"); s.set_defaults(func=run_simulate_dedupe)
-    args = ap.parse_args(); args.func(args)
+    r = sub.add_parser("report", parents=[common]); r.add_argument("--input", required=True); r.add_argument("--output", default="./reportes")
+    r.add_argument("--sketch", action="store_true", help="Top Extensiones/MIME/Propietario con sketches; con --workers 1 el reporte se calcula por chunks")
+    r.add_argument("--chunksize", type=int, default=500_000, help="filas por chunk con --sketch")
+    r.add_argument("--workers", type=int, default=1, help="procesos para el reporte particionado")
+    r.add_argument("--shard-by", default="auto", choices=["auto","raiz","carpeta"])
+    r.add_argument("--backend", default="auto", choices=["auto","pandas","sql"], help="sql: analizadores en SQLite/DuckDB (fuera de RAM)")
+    r.add_argument("--db", default="", help="base para --backend sql (por defecto <output>/<input>.sqlite)"); r.set_defaults(func=run_report)
+    i = sub.add_parser("ingest", parents=[common]); i.add_argument("--input", required=True); i.add_argument("--db", required=True, help=".sqlite | .duckdb")
+    i.add_argument("--engine", default="", choices=["","sqlite","duckdb"]); i.add_argument("--chunksize", type=int, default=250_000); i.set_defaults(func=run_ingest)
+    b = sub.add_parser("batch", parents=[common])
+    b.add_argument("--inputs", nargs="*", default=[], help="rutas o patrones glob (entre comillas)"); b.add_argument("--manifest", default="", help=".txt (una ruta por línea) o .json")
+    b.add_argument("--output", default="./reportes"); b.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    b.add_argument("--cache-dir", default="", help="caché de tablas/figuras por hash de contenido"); b.add_argument("--sketch", action="store_true")
+    b.add_argument("--no-figures", action="store_true"); b.set_defaults(func=run_batch_cmd)
+    d = sub.add_parser("delta", parents=[common]); d.add_argument("--input", required=True); d.add_argument("--baseline", required=True); d.add_argument("--output", default="./reportes"); d.set_defaults(func=run_delta)
+    near = argparse.ArgumentParser(add_help=False)
+    near.add_argument("--on", default="Nombre", help="columna comparada (Nombre | RutaRelativa)"); near.add_argument("--threshold", type=float, default=0.7)
+    near.add_argument("--size-tol", type=float, default=0.1, help="ancho relativo de la banda de tamaño (0 = sin bloqueo)"); near.add_argument("--cross-ext", action="store_true", help="comparar entre extensiones")
+    s = sub.add_parser("simulate-dedupe", parents=[common, near]); s.add_argument("--input", required=True); s.add_argument("--by", default="CarpetaPadre"); s.add_argument("--strategy", default="keep-largest"); s.add_argument("--output", default="./reportes")
+    s.add_argument("--near", action="store_true", help="incluir casi duplicados (MinHash/LSH) en el plan"); s.set_defaults(func=run_simulate_dedupe)
+    n = sub.add_parser("near-dups", parents=[common, near]); n.add_argument("--input", required=True); n.add_argument("--output", default="./reportes"); n.set_defaults(func=run_near_dups)
+    f = sub.add_parser("dup-folders", parents=[common]); f.add_argument("--input", required=True); f.add_argument("--output", default="./reportes")
+    f.add_argument("--min-files", type=int, default=2); f.add_argument("--min-bytes", type=float, default=0); f.set_defaults(func=run_dup_folders)
+    t = sub.add_parser("top-files", parents=[common]); t.add_argument("--input", required=True); t.add_argument("--output", default="./reportes")
+    t.add_argument("--by", default="Propietario", help="Propietario | CarpetaPadre | Raiz | Extension | ..."); t.add_argument("--n", type=int, default=20, help="archivos por grupo")
+    t.set_defaults(func=run_top_files)
+    tl = sub.add_parser("timeline", parents=[common]); tl.add_argument("--input", required=True); tl.add_argument("--output", default="./reportes")
+    tl.add_argument("--freq", default="M", help="D | W | M | Q | Y"); tl.add_argument("--by", default="", help="desglose: Categoria | Propietario | ...")
+    tl.set_defaults(func=run_timeline)
+    srv = argparse.ArgumentParser(add_help=False)
+    srv.add_argument("--host", default="", help="por defecto service.DEFAULT_HOST"); srv.add_argument("--port", type=int, default=0, help="por defecto service.DEFAULT_PORT")
+    srv.add_argument("--socket", default="", help="socket Unix en lugar de TCP")
+    v = sub.add_parser("serve", parents=[common, srv]); v.add_argument("--input", nargs="*", default=[], help="inventarios a cargar al iniciar")
+    v.add_argument("--name", nargs="*", default=[], help="nombres de los datasets (por defecto el del archivo)"); v.add_argument("--sheet", default="")
+    v.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="procesos (0 = hilos)"); v.set_defaults(func=run_serve)
+    q = sub.add_parser("query", parents=[common, srv]); q.add_argument("--dataset", default=""); q.add_argument("--op", default="", help="overview | agg_by | freq | duplicates | risk_top | delta | ...")
+    q.add_argument("--params", default="", help='JSON, p. ej. \'{"col": "Extension", "top": 20}\''); q.add_argument("--load", default="", help="cargar este inventario en el servicio")
+    q.add_argument("--path", default="/datasets", help="GET sin --op/--load: /datasets | /ops | /health"); q.set_defaults(func=run_query)
+    a = sub.add_parser("anomalies", parents=[common]); a.add_argument("--input", required=True); a.add_argument("--by", default="Extension"); a.add_argument("--method", default="iqr", choices=["iqr","robust_z"])
+    a.add_argument("--k", type=float, default=1.5); a.add_argument("--z", type=float, default=3.5); a.add_argument("--log", action="store_true"); a.add_argument("--min-count", type=int, default=20)
+    a.add_argument("--chunksize", type=int, default=0, help="streaming con sketches KLL (0 = en memoria)"); a.add_argument("--output", default="./reportes"); a.set_defaults(func=run_anomalies)
+    va = sub.add_parser("validate", parents=[common]); va.add_argument("--input", required=True); va.add_argument("--output", default="./reportes")
+    va.add_argument("--chunksize", type=int, default=500_000); va.add_argument("--by", default="", help="límites IQR por grupo (vacío = global)")
+    va.add_argument("--k", type=float, default=1.5); va.add_argument("--min-count", type=int, default=20)
+    va.add_argument("--no-rows", action="store_true", help="solo conteos por regla, sin la hoja de archivos"); va.set_defaults(func=run_validate)
+    k = sub.add_parser("sketch", parents=[common]); k.add_argument("--input", required=True); k.add_argument("--output", required=True, help="archivo .json del sketch")
+    k.add_argument("--chunksize", type=int, default=500_000); k.set_defaults(func=run_sketch)
+    m = sub.add_parser("sketch-merge", parents=[common]); m.add_argument("--inputs", nargs="+", required=True); m.add_argument("--output", default="./reportes")
+    m.add_argument("--save", default="", help="guardar el sketch combinado (.json)"); m.set_defaults(func=run_sketch_merge)
+    y = sub.add_parser("synth", parents=[common]); y.add_argument("--rows", type=int, required=True); y.add_argument("--output", required=True, help=".csv | .xlsx | .parquet")
+    y.add_argument("--chunksize", type=int, default=250_000); y.add_argument("--seed", type=int, default=0); y.add_argument("--dup-ratio", type=float, default=0.15)
+    y.set_defaults(func=run_synth)
+    args = ap.parse_args()
+    args.prof = Profiler(deep=args.profile_deep) if args.profile else NULL_PROFILER
+    args.func(args)
+    if args.profile:
+        print("Perfil:", args.prof.save(args.profile))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from ANALYTICS_ULT.csv_io import SAMPLE_BYTES, sniff_csv, read_csv_fast
+from ANALYTICS_ULT.io_utils import load_table, iter_table_chunks
+from ANALYTICS_ULT.synth import generate_inventory
+
+
+def _late_accent_csv(path, sep=","):
+    """cp1252 que es ASCII en toda la muestra: la primera 'é' aparece después de SAMPLE_BYTES."""
+    df = generate_inventory(4000, seed=3)
+    df.loc[len(df) - 5, "Propietario"] = "José"
+    df.to_csv(path, index=False, sep=sep, encoding="cp1252")
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert raw.index("José".encode("cp1252")) > SAMPLE_BYTES
+    return df
+
+
+def test_late_non_ascii_byte_is_decoded(tmp_path):
+    path = str(tmp_path / "inv.csv")
+    src = _late_accent_csv(path)
+    info = sniff_csv(path)
+    assert info["encoding"] == "utf-8"  # la muestra es ASCII
+    for df in (load_table(path), read_csv_fast(path, info["sep"], info["encoding"])):
+        assert df["Propietario"].iloc[-5] == "José"
+        assert not any(isinstance(v, bytes) for v in df["Propietario"])
+        assert df["Propietario"].astype("string").tolist() == src["Propietario"].astype("string").tolist()
+
+
+def test_late_non_ascii_byte_in_chunks(tmp_path):
+    path = str(tmp_path / "inv.csv")
+    _late_accent_csv(path, sep=";")
+    chunks = list(iter_table_chunks(path, chunksize=1000))
+    owners = pd.concat([c["Propietario"] for c in chunks], ignore_index=True)
+    assert owners.iloc[-5] == "José"
+
+
+def test_valid_utf8_is_unchanged(tmp_path):
+    path = str(tmp_path / "inv.csv")
+    df = generate_inventory(500, seed=1)
+    df.loc[10, "Propietario"] = "Núñez"
+    df.to_csv(path, index=False, encoding="utf-8")
+    assert load_table(path)["Propietario"].iloc[10] == "Núñez"
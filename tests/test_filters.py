@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from ANALYTICS_ULT.filters import NULL_LABEL, FilterIndex
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    ext = rng.choice(["pdf", "docx", "jpg", "raro", None], size=n, p=[0.5, 0.3, 0.15, 0.02, 0.03])
+    size = rng.choice([0, 10, 10, 2048, 5 << 20, np.nan], size=n).astype(float)  # empates y NaN
+    days = pd.to_datetime("2020-01-01") + pd.to_timedelta(rng.integers(0, 900, size=n), unit="D") \
+        + pd.to_timedelta(rng.integers(0, 86400, size=n), unit="s")
+    fecha = pd.Series(days).where(rng.random(n) > 0.05)
+    return pd.DataFrame({"Extension": ext, "Propietario": rng.choice(["ana", "luis"], size=n),
+                         "TamanoBytes": size, "FechaModificacion": fecha})
+
+
+def _reference(df, spec):
+    mask = np.ones(len(df), dtype=bool)
+    for c, cond in spec.items():
+        s = df[c]
+        if c == "TamanoBytes":
+            lo, hi = cond
+            mask &= s.between(-np.inf if lo is None else lo, np.inf if hi is None else hi).to_numpy()
+        elif c == "FechaModificacion":
+            lo, hi = pd.Timestamp(cond[0]), pd.Timestamp(cond[1]) + pd.Timedelta(days=1)
+            mask &= ((s >= lo) & (s < hi)).to_numpy()
+        else:
+            mask &= (s.astype(str).isin(cond) | (s.isna() & (NULL_LABEL in cond))).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def test_select_matches_pandas_masks():
+    df = _frame(5000, 1)
+    idx = FilterIndex(df)
+    specs = [
+        {"Extension": ["raro"]},                                   # escasa: junta posiciones
+        {"Extension": ["pdf", NULL_LABEL]},                         # frecuente + vacío
+        {"TamanoBytes": [10, 10]},                                 # empates en el límite
+        {"TamanoBytes": [None, 2048], "Propietario": ["ana"]},
+        {"FechaModificacion": ["2020-03-01", "2020-03-01"]},        # día completo
+        {"Extension": ["docx"], "TamanoBytes": [2048, None], "FechaModificacion": ["2021-01-01", "2022-12-31"]},
+        {"Extension": ["no-existe"]},
+    ]
+    for spec in specs:
+        got = idx.select(spec)
+        assert np.array_equal(got, _reference(df, spec)), spec
+    assert idx.select({}) is None and idx.select({"Extension": []}) is None
+    assert idx.options("Extension")[NULL_LABEL] == int(df["Extension"].isna().sum())
+
+
+def test_select_on_empty_frame():
+    idx = FilterIndex(_frame(0, 2))
+    assert len(idx.select({"Extension": ["pdf"], "TamanoBytes": [0, None]})) == 0
+    assert idx.bounds("FechaModificacion") == (None, None)
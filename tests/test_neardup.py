@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from ANALYTICS_ULT.neardup import normalize_names, near_duplicates, _shingles, SHINGLE
+from ANALYTICS_ULT.simulator import simulate_dedupe
+
+
+def _jaccard(a, b):
+    x, y = _shingles(a, SHINGLE), _shingles(b, SHINGLE)
+    return len(x & y) / len(x | y)
+
+
+def _reference_clusters(df, threshold=0.7, size_tol=0.1):
+    """Todos los pares: misma extensión y números, tamaños dentro de `size_tol` y Jaccard exacto ≥ umbral."""
+    norm = normalize_names(df["Nombre"])[0].tolist()
+    parent = list(range(len(df)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    size = df["TamanoBytes"].to_numpy(dtype=float)
+    for i, j in itertools.combinations(range(len(df)), 2):
+        if not norm[i] or not norm[j] or df["Extension"].iat[i] != df["Extension"].iat[j]:
+            continue
+        if [w for w in norm[i].split() if w.isdigit()] != [w for w in norm[j].split() if w.isdigit()]:
+            continue
+        if abs(np.log1p(size[i]) - np.log1p(size[j])) > np.log1p(size_tol) / 2:
+            continue
+        if _jaccard(norm[i], norm[j]) >= threshold:
+            parent[find(i)] = find(j)
+    groups = {}
+    for i in range(len(df)):
+        groups.setdefault(find(i), set()).add(df.index[i])
+    return {frozenset(g) for g in groups.values() if len(g) > 1}
+
+
+def _clusters(members):
+    return {frozenset(g) for g in members.groupby("ClusterId").groups.values()} if len(members) else set()
+
+
+def _inventory(seed=0):
+    rng = np.random.default_rng(seed)
+    stems = ["presupuesto anual", "acta de reunion", "contrato marco", "fotografia evento", "plano estructural",
+             "nomina quincenal", "propuesta comercial", "minuta directorio"]
+    copies = ["{}", "{} (copia)", "Copia de {}", "{} - copy", "{} (2)", "copy of {}"]
+    rows = []
+    for stem in stems:
+        size = int(rng.integers(10_000, 10_000_000))
+        for c in rng.choice(len(copies), size=rng.integers(1, 4), replace=False):
+            rows.append({"Nombre": copies[c].format(stem) + ".pdf", "Extension": "pdf", "TamanoBytes": size,
+                         "Hash": f"h{len(rows)}"})
+        rows.append({"Nombre": stem + ".docx", "Extension": "docx", "TamanoBytes": size, "Hash": f"h{len(rows)}"})
+    rows.append({"Nombre": None, "Extension": "pdf", "TamanoBytes": 5, "Hash": "hn"})
+    return pd.DataFrame(rows).sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def test_matches_exhaustive_pairs():
+    for seed in range(5):
+        df = _inventory(seed)
+        members, clusters = near_duplicates(df)
+        assert _clusters(members) == _reference_clusters(df)
+        assert clusters["archivos"].sum() == len(members)
+
+
+def test_versions_are_not_copies():
+    df = pd.DataFrame({"Nombre": ["informe.docx", "informe_final.docx", "informe_v2.docx", "informe_old.docx",
+                                  "informe (copia).docx"],
+                       "Extension": "docx", "TamanoBytes": [1000, 1040, 1010, 1000, 1000], "Hash": list("abcde"),
+                       "CarpetaPadre": "X", "RutaCompleta": [f"X/{i}" for i in range(5)]})
+    members, _ = near_duplicates(df)
+    assert _clusters(members) == {frozenset({0, 4})}
+    plan, ahorro = simulate_dedupe(df, near=members)
+    assert plan["Nombre"].tolist() == ["informe (copia).docx"] and ahorro == 1000
+
+
+def test_unverified_member_is_not_deleted():
+    df = pd.DataFrame({"Nombre": ["video promo.mp4", "video promo (copia).mp4"], "Extension": "mp4",
+                       "TamanoBytes": [50_000_000, 50_400_000], "Hash": ["a", "b"], "CarpetaPadre": "V",
+                       "RutaCompleta": ["V/a", "V/b"]})
+    members, clusters = near_duplicates(df)
+    assert len(members) == 2 and members["Verificado"].sum() == 1  # solo el representante
+    assert clusters["bytes_recuperables"].sum() == 0
+    assert simulate_dedupe(df, near=members)[0].empty
+
+
+def test_empty_and_missing_names():
+    assert near_duplicates(pd.DataFrame({"Nombre": pd.Series(dtype=str)}))[0].empty
+    df = pd.DataFrame({"Nombre": [None, np.nan, ""], "TamanoBytes": [1, 1, 1], "Extension": "x"})
+    assert near_duplicates(df)[0].empty
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import multiprocessing as mp
+
+import pandas as pd
+import pytest
+
+from ANALYTICS_ULT import parallel
+from ANALYTICS_ULT.pipeline import normalize_inventory
+from ANALYTICS_ULT.synth import generate_inventory
+
+
+@pytest.fixture(scope="module")
+def inventory():
+    return normalize_inventory(generate_inventory(3000, seed=11))
+
+
+def _assert_same(a, b):
+    assert a.keys() == b.keys()
+    for k in a:
+        pd.testing.assert_frame_equal(a[k].reset_index(drop=True), b[k].reset_index(drop=True), obj=k)
+
+
+@pytest.mark.parametrize("fork", [True, False])
+def test_parallel_matches_single_process(inventory, monkeypatch, fork):
+    if fork and "fork" not in mp.get_all_start_methods():
+        pytest.skip("sin fork en esta plataforma")
+    if not fork:  # spawn: los conteos por Hash viajan una vez por worker (initializer)
+        monkeypatch.setattr(parallel.mp, "get_all_start_methods", lambda: ["spawn"])
+    # mismos fragmentos en ambas corridas: los empates del top-N dependen del reparto
+    shards = parallel.shard_indices
+    monkeypatch.setattr(parallel, "shard_indices", lambda df, n_shards, by="auto": shards(df, 4, by))
+    seq = parallel.parallel_report(inventory, workers=1)
+    par = parallel.parallel_report(inventory, workers=2)
+    _assert_same(seq, par)
+    assert parallel._DF is None and parallel._HASH_COUNTS is None
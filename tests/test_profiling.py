@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import sys
+import tracemalloc
+
+import pytest
+
+from ANALYTICS_ULT.profiling import Profiler
+
+
+def test_deep_profiler_stops_when_step_raises():
+    prof = Profiler(deep=True)
+
+    def boom():
+        with prof.step("interno"):
+            [0] * 1000
+        raise RuntimeError("falla")
+
+    with pytest.raises(RuntimeError):
+        prof.call("externo", boom)
+    assert not tracemalloc.is_tracing() and sys.getprofile() is None
+    assert [r["paso"] for r in prof.records] == ["interno", "externo"]
+    prof.call("otro", sum, [1, 2])
+    assert not tracemalloc.is_tracing()
+    assert "boom" in prof.hotspots(20)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from ANALYTICS_ULT.shared import content_key, dataset_path, prune
+
+
+def test_prune_only_removes_own_files(tmp_path):
+    key = content_key(b"inventario")
+    own = [dataset_path(str(tmp_path), key), dataset_path(str(tmp_path), key) + ".123.tmp"]
+    foreign = [tmp_path / "informe.arrow", tmp_path / "notas.tmp", tmp_path / "datos.csv"]
+    old = time.time() - 30 * 86400
+    for p in own + [str(f) for f in foreign]:
+        open(p, "wb").close()
+        os.utime(p, (old, old))
+    assert sorted(prune(str(tmp_path))) == sorted(own)
+    assert all(f.exists() for f in foreign)
+
+
+def test_prune_keep_and_missing_dir(tmp_path):
+    key = content_key(b"x")
+    p = dataset_path(str(tmp_path), key)
+    open(p, "wb").close()
+    os.utime(p, (0, 0))
+    assert prune(str(tmp_path), keep=(key,)) == [] and os.path.exists(p)
+    assert prune(str(tmp_path / "no_existe")) == []
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from ANALYTICS_ULT.anomalies import anomalies_size_grouped, anomalies_size_stream
+from ANALYTICS_ULT.pipeline import add_derived_columns, iter_inventory_chunks, normalize_inventory
+from ANALYTICS_ULT.sketches import KLLSketch
+from ANALYTICS_ULT.synth import generate_inventory
+
+
+def _within_capacity(sk):
+    return sum(len(x) for x in sk.levels) <= sum(sk._capacity(h) for h in range(len(sk.levels)))
+
+
+def test_kll_ranks_and_capacity():
+    rng = np.random.default_rng(0)
+    data = rng.lognormal(10, 2, size=200_000)
+    sk = KLLSketch(k=200)
+    for part in np.array_split(data, 37):
+        sk.update(part)
+        assert _within_capacity(sk)
+    exact = np.sort(data)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert abs(np.searchsorted(exact, sk.quantile(q), side="right") / len(data) - q) < 0.02
+
+
+def test_kll_compacts_first_full_level():
+    sk = KLLSketch(k=8)
+    sk.levels = [np.arange(3.0), np.arange(20.0), np.empty(0)]  # el nivel 1 está lleno, el último no
+    sk.n = 3 + 20 * 2
+    sk._compress()
+    assert _within_capacity(sk) and len(sk.levels[1]) < 20
+    assert sum(len(lv) * 2 ** h for h, lv in enumerate(sk.levels)) == sk.n  # el peso total se conserva
+
+
+def test_streaming_anomalies_by_derived_column(tmp_path):
+    src = tmp_path / "inv.csv"
+    generate_inventory(4000, seed=2).to_csv(src, index=False)  # sin Categoria: se deriva por chunk
+    full = add_derived_columns(normalize_inventory(pd.read_csv(src)), ["Categoria"])
+    _, exact = anomalies_size_grouped(full, by="Categoria", min_count=5)
+    rows, fences = anomalies_size_stream(lambda: iter_inventory_chunks(str(src), chunksize=700, derived=["Categoria"]),
+                                         by="Categoria", min_count=5)
+    assert set(fences["Grupo"]) == set(exact["Grupo"]) and "<NA>" not in set(fences["Grupo"])
+    assert (fences.set_index("Grupo")["n"] == exact.set_index("Grupo")["n"]).all()
+    assert len(rows) and rows["Categoria"].notna().all()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+
+from ANALYTICS_ULT.analyzers import freq_table
+from ANALYTICS_ULT.sqlstore import InventoryDB, ingest
+from ANALYTICS_ULT.synth import generate_inventory
+
+
+def test_inventory_db_connection_per_thread(tmp_path):
+    src = tmp_path / "inv.csv"
+    generate_inventory(3000, seed=5).to_csv(src, index=False)
+    db_path = str(tmp_path / "inv.sqlite")
+    ingest(str(src), db_path)
+    with InventoryDB(db_path) as db:
+        expected = freq_table(db, "Extension", n=10)
+        with ThreadPoolExecutor(8) as ex:
+            results = list(ex.map(lambda _: (freq_table(db, "Extension", n=10), id(db.con)), range(32)))
+            # con los hilos vivos sus conexiones también lo están: ids distintos a la del hilo principal
+            assert id(db.con) not in {c for _, c in results}
+        assert all(r.equals(expected) for r, _ in results)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from ANALYTICS_ULT.subtrees import duplicate_subtrees, folder_hashes
+
+
+def _reference(df, min_files=2, min_bytes=0):
+    """Misma semántica por fuerza bruta: forma canónica recursiva de cada carpeta (sin hashes)."""
+    files, folders = {}, {""}
+    for i, (path, h, size) in enumerate(zip(df["RutaCompleta"], df["Hash"], df["TamanoBytes"])):
+        d, _, name = path.rpartition("/")
+        files.setdefault(d, []).append((name, h if isinstance(h, str) else f"unico-{i}", size))
+        while d:
+            folders.add(d)
+            d = d.rpartition("/")[0]
+    children = {}
+    for f in folders - {""}:
+        children.setdefault(f.rpartition("/")[0], []).append(f)
+    canon, nfiles, nbytes = {}, {}, {}
+
+    def walk(f):
+        if f not in canon:
+            subs = sorted((c.rpartition("/")[2], walk(c)) for c in children.get(f, []))
+            canon[f] = (tuple(sorted(files.get(f, []))), tuple(subs))
+            nfiles[f] = len(files.get(f, [])) + sum(nfiles[c] for c in children.get(f, []))
+            nbytes[f] = sum(s for _, _, s in files.get(f, [])) + sum(nbytes[c] for c in children.get(f, []))
+        return canon[f]
+
+    walk("")
+    cand = [f for f in folders if f and nfiles[f] >= min_files and nbytes[f] >= min_bytes]
+    by = {}
+    for f in cand:
+        by.setdefault(canon[f], []).append(f)
+    dup = {f for fs in by.values() if len(fs) > 1 for f in fs}
+    kept = {min(fs, key=lambda p: p.split("/")) for fs in by.values() if len(fs) > 1}
+
+    def covered(f):
+        d = f.rpartition("/")[0]
+        while d:
+            if d in dup and d not in kept:
+                return True
+            d = d.rpartition("/")[0]
+        return False
+
+    groups = {}
+    for fs in by.values():
+        active = [f for f in fs if not covered(f)]
+        if len(fs) > 1 and len(active) > 1:
+            groups[frozenset(active)] = nbytes[fs[0]] * (len(active) - 1)
+    return groups
+
+
+def _groups(df, **kw):
+    grupos, carpetas = duplicate_subtrees(df, **kw)
+    if grupos.empty:
+        return {}
+    active = carpetas[~carpetas["Anidada"]].groupby("GrupoId")["Carpeta"].agg(frozenset)
+    return {active[g]: b for g, b in zip(grupos["GrupoId"], grupos["bytes_recuperables"])}
+
+
+def _tree(rows, root, spec):
+    for name, content in spec.items():
+        if isinstance(content, dict):
+            _tree(rows, f"{root}/{name}", content)
+        else:
+            rows.append({"RutaCompleta": f"{root}/{name}", "Hash": content[0], "TamanoBytes": content[1]})
+    return rows
+
+
+def test_nested_duplicates_inside_kept_copy():
+    x = {"a.txt": ("h1", 100), "b.txt": ("h2", 200)}
+    p = {"X": x, "Xc": dict(x), "c.txt": ("h3", 50)}
+    df = pd.DataFrame(_tree([], "P", {"P1": p, "P2": p}))
+    got = _groups(df)
+    assert got == _reference(df)
+    assert got == {frozenset({"P/P1", "P/P2"}): 650, frozenset({"P/P1/X", "P/P1/Xc"}): 300}
+
+
+def test_fully_covered_group_is_not_reported():
+    x = {"a.txt": ("h1", 100), "b.txt": ("h2", 200)}
+    df = pd.DataFrame(_tree([], "R", {"A": {"X": x, "d.txt": ("h4", 5)}, "B": {"X": x, "d.txt": ("h4", 5)}}))
+    assert _groups(df) == {frozenset({"R/A", "R/B"}): 305}
+
+
+def test_matches_reference_on_random_trees():
+    rng = np.random.default_rng(7)
+    contents = [(f"h{i}", int(s)) for i, s in enumerate(rng.integers(1, 1000, 12))]
+    for _ in range(20):
+        lib = [{f"f{j}.txt": contents[rng.integers(len(contents))] for j in range(rng.integers(1, 3))} for _ in range(4)]
+        specs = []
+        for _ in range(3):
+            spec = {f"s{k}": lib[rng.integers(len(lib))] for k in range(rng.integers(1, 4))}
+            if rng.random() < 0.5:
+                spec["n"] = {f"s{k}": lib[rng.integers(len(lib))] for k in range(2)}
+            specs.append(spec)
+        rows = []
+        for top in range(rng.integers(2, 6)):  # carpetas de primer nivel repetidas: grupos anidados
+            _tree(rows, f"raiz/t{top % 2}/d{top}", specs[rng.integers(len(specs))])
+        df = pd.DataFrame(rows)
+        df.loc[rng.random(len(df)) < 0.05, "Hash"] = np.nan  # sin hash: carpeta no duplicable
+        assert _groups(df, min_files=1) == _reference(df, min_files=1)
+
+
+def test_empty_and_missing_paths():
+    assert duplicate_subtrees(pd.DataFrame({"RutaCompleta": pd.Series(dtype=str)}))[0].empty
+    assert folder_hashes(pd.DataFrame({"Nombre": ["a"]})).empty
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+
+from ANALYTICS_ULT.io_utils import load_table
+from ANALYTICS_ULT.synth import generate_inventory, write_inventory
+
+
+def test_xlsx_round_trip(tmp_path):
+    path = write_inventory(str(tmp_path / "inv.xlsx"), 1500, chunksize=400, seed=3, end="2024-06-30")
+    got = load_table(path)
+    exp = generate_inventory(1500, chunksize=400, seed=3, end="2024-06-30").reset_index(drop=True)
+    assert list(got.columns) == list(exp.columns) and len(got) == len(exp)
+    assert (got.notna().sum() == exp.notna().sum()).all()  # todas las columnas con datos, no solo Nombre
+    for c in exp.columns:
+        a, b = got[c], exp[c]
+        if b.dtype.kind == "M":
+            a, b = pd.to_datetime(a).dt.round("s"), b.dt.round("s")
+        assert a.astype(str).tolist() == b.astype(str).tolist(), c
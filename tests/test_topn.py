@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from ANALYTICS_ULT.topn import top_n, top_n_per_group
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    size = rng.choice([0, 5, 5, 5, 100, 2048, np.nan], size=n)  # muchos empates y NaN
+    return pd.DataFrame({
+        "TamanoBytes": size,
+        "RiskScore": rng.integers(0, 4, size=n),
+        "Propietario": pd.Series(rng.choice(["ana", "luis", "eva", None], size=n), dtype=object),
+        "Fecha": pd.Series(pd.to_datetime("2021-01-01") + pd.to_timedelta(rng.integers(0, 5, size=n), unit="D"))
+                 .where(rng.random(n) > 0.1),
+        "Banda": pd.Categorical(rng.choice(["Bajo", "Medio", "Alto"], size=n), categories=["Bajo", "Medio", "Alto"], ordered=True),
+    }, index=rng.permutation(n) * 3)
+
+
+CASES = [
+    ("TamanoBytes", False), ("TamanoBytes", True), (["RiskScore", "TamanoBytes"], False),
+    (["Propietario", "TamanoBytes"], [True, False]), ("Fecha", False), (["Banda", "Fecha"], [False, True]),
+]
+
+
+@pytest.mark.parametrize("by,asc", CASES)
+@pytest.mark.parametrize("n", [0, 1, 7, 50, 400, 1000])
+def test_top_n_matches_sort_values(by, asc, n):
+    df = _frame(400, 7)
+    expected = df.sort_values(by, ascending=asc, kind="stable").head(n)
+    pd.testing.assert_frame_equal(top_n(df, n, by, ascending=asc), expected)
+
+
+def test_top_n_series_and_empty():
+    s = pd.Series([3, 1, 3, np.nan, 2, 3], index=list("abcdef"))
+    pd.testing.assert_series_equal(top_n(s, 3), s.sort_values(ascending=False, kind="stable").head(3))
+    empty = _frame(0, 1)
+    assert top_n(empty, 5, "TamanoBytes").empty and top_n_per_group(empty, 5, "TamanoBytes", "Propietario").empty
+
+
+@pytest.mark.parametrize("group", ["Propietario", ["Banda", "Propietario"]])
+@pytest.mark.parametrize("n", [1, 3, 500])
+def test_top_n_per_group_matches_groupby_head(group, n):
+    df = _frame(400, 9)
+    keys = [group] if isinstance(group, str) else group
+    ordered = df.sort_values(keys + ["TamanoBytes", "RiskScore"], ascending=[True] * len(keys) + [False, False],
+                             kind="stable", na_position="last")
+    expected = ordered.groupby(keys, dropna=False, sort=False, observed=True).head(n)
+    got = top_n_per_group(df, n, ["TamanoBytes", "RiskScore"], group=group, rank_col="Rango")
+    pd.testing.assert_frame_equal(got.drop(columns="Rango"), expected)
+    assert (got.groupby(keys, dropna=False, observed=True)["Rango"].agg(lambda r: list(r) == list(range(1, len(r) + 1)))).all()
+
+
+def test_top_n_per_group_sorts_only_candidates(monkeypatch):
+    rng = np.random.default_rng(3)
+    n_rows = 60_000
+    df = pd.DataFrame({"TamanoBytes": rng.lognormal(10, 2, n_rows).round(), "RiskScore": rng.integers(0, 4, n_rows),
+                       "Carpeta": rng.integers(0, 6_000, n_rows)})
+    expected = (df.sort_values(["Carpeta", "TamanoBytes", "RiskScore"], ascending=[True, False, False], kind="stable")
+                .groupby("Carpeta", sort=False).head(2))
+    sizes, lexsort = [], np.lexsort
+    monkeypatch.setattr(np, "lexsort", lambda keys: sizes.append(len(keys[0])) or lexsort(keys))
+    got = top_n_per_group(df, 2, ["TamanoBytes", "RiskScore"], group="Carpeta")
+    pd.testing.assert_frame_equal(got, expected)
+    assert sizes and max(sizes) < len(expected) * 1.1  # ~2 filas por carpeta llegan al ordenamiento, no las 60 000
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from ANALYTICS_ULT.validators import DEFAULT_RULES, MAX_RULES, bits_key, check_rules, validate
+
+
+DF = pd.DataFrame({"TamanoBytes": [10, 2000, None], "Extension": ["pdf", None, "txt"]})
+
+
+def test_check_rules_skips_bad_rules():
+    rules = [
+        {"id": "grande", "regla": "Grande", "expr": "TamanoBytes > 1000"},
+        {"id": "sintaxis", "regla": "x", "expr": "TamanoBytes >"},
+        {"id": "numerica", "regla": "x", "expr": "TamanoBytes + 1"},
+        {"id": "grande", "regla": "otra", "expr": "TamanoBytes > 1"},
+        {"id": "incompleta"},
+        {"id": "ausente", "regla": "Columna ausente", "expr": "Foo > 1"},
+    ]
+    ok, bad = check_rules(rules, DF)
+    assert [r["id"] for r in ok] == ["grande", "ausente"]
+    assert [b[0] for b in bad] == ["sintaxis", "numerica", "grande", "incompleta"]
+    bits, counts = validate(DF, DEFAULT_RULES + ok)
+    c = counts.set_index("id")
+    assert c.loc["grande", "conteo"] == 1 and not c.loc["ausente", "aplica"]
+
+
+def test_check_rules_cap_and_type():
+    cap = MAX_RULES - len(DEFAULT_RULES)
+    rules = [{"id": f"r{i}", "regla": "x", "expr": "TamanoBytes > 1"} for i in range(cap + 3)]
+    ok, bad = check_rules(rules, DF)
+    assert len(ok) == cap and len(bad) == 3
+    validate(DF, DEFAULT_RULES + ok)
+    assert check_rules({"id": "x"}, DF) == ([], [("validation_rules", "debe ser una lista de reglas")])
+
+
+def test_validate_reports_rule_id_on_bad_expr():
+    with pytest.raises(ValueError, match="numerica"):
+        validate(DF, [{"id": "numerica", "regla": "x", "expr": "TamanoBytes + 1"}])
+
+
+def test_bits_key_follows_rule_params():
+    df = pd.DataFrame({"TamanoBytes": [1, 2, 3, 4, 5, 6, 7, 8, 12, 18, 1000]})
+    k = {p: bits_key(validate(df, iqr_k=p)[0]) for p in (0.5, 1.5, 1.5001, 3.0)}
+    assert k[0.5] != k[1.5]                      # otro k marca otras filas
+    assert k[1.5] == k[1.5001]                   # mismas filas marcadas: mismo resultado
+    rules = DEFAULT_RULES + [{"id": "x", "regla": "X", "expr": "TamanoBytes > 100"}]
+    assert bits_key(validate(df)[0]) != bits_key(validate(df, rules)[0], rules)
+
+
+def test_validate_cli_streaming_matches_memory(tmp_path, monkeypatch):
+    import sys
+    import cli_ultimate
+    from ANALYTICS_ULT.synth import generate_inventory
+    src = tmp_path / "inv.csv"
+    generate_inventory(3000, seed=4, end="2020-01-01").to_csv(src, index=False)
+    monkeypatch.setattr(sys, "argv", ["cli_ultimate.py", "validate", "--input", str(src), "--chunksize", "700",
+                                      "--output", str(tmp_path / "out")])
+    cli_ultimate.main()
+    hojas = pd.read_excel(tmp_path / "out" / "Validaciones_ULTIMATE.xlsx", sheet_name=None)
+    lim = hojas["Limites_IQR"].iloc[0]
+    # mismos límites IQR (los del sketch) en memoria: conteos por regla y archivos marcados iguales
+    bits, exp = validate(cli_ultimate._prep(str(src)), iqr_fences=(lim["inferior"], lim["superior"]))
+    assert hojas["Reglas"]["conteo"].tolist() == exp["conteo"].tolist()
+    assert exp.set_index("id").loc["tamano_iqr", "conteo"] > 0
+    assert len(hojas["Violaciones"]) == int((bits != 0).sum())